@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 扫描性能基准
+
+在临时目录中生成合成目录树，对比旧的 os.walk + isfile/getsize/getmtime
+逐文件检查方式与新的scandir遍历在stat系统调用次数和耗时上的差异；
+并对比遍历引擎按规划顺序提交与按以往耗时最长任务优先（含并行遍历）时的
+整体完成时间（makespan），以及单个目录树串行遍历与ParallelWalker并行遍历的耗时
+（两者的结果顺序必须一致），以及逐文件线性检查安全路径与按目录查询编译后的
+路径策略的耗时。
+
+最先检查冷启动预算：新进程中导入命令行模块并构造CleanerLogic的耗时（多次测量
+的中位数）不能超过STARTUP_BUDGET，并且不能加载PyQt5、tkinter、sqlite3或提前探测
+磁盘、读取排除列表；任何一项不满足时以退出码1结束，不再运行其余基准。
+--startup-only 时只做这项检查，build_exe.py 打包前会先运行它；同样的检查也由
+tests/test_startup.py 执行。
+
+用法: python benchmark.py [--dirs N] [--files N] [--workers N] [--io-latency 毫秒]
+                         [--startup-only] [--startup-budget 毫秒]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from path_policy import PathPolicy
+from scan_engine import ParallelWalker, TraversalEngine, WalkStats, walk_entries
+from scan_history import ScanHistory
+
+# 冷启动预算（秒）：新进程中导入cli并构造CleanerLogic，不含解释器本身的启动时间。
+# 开发机上实测约30~50毫秒，预算留出数倍余量，较慢的打包机器上也不会误报
+STARTUP_BUDGET = 0.2
+# 冷启动测量次数，取中位数
+STARTUP_RUNS = 7
+# 冷启动时不应加载的模块：图形界面库，以及只在扫描时才需要的sqlite3
+STARTUP_FORBIDDEN_MODULES = ('PyQt5', 'tkinter', 'sqlite3')
+
+_STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+import cli, cleaner_logic
+cleaner = cleaner_logic.CleanerLogic()
+elapsed = time.perf_counter() - start
+loaded = [name for name in {forbidden!r} if name in sys.modules]
+eager = [name for name in ('_backup_dir', '_exclusions', '_path_policy') if getattr(cleaner, name) is not None]
+print(elapsed, ','.join(loaded), ','.join(eager), sep='|')
+"""
+
+
+def make_tree(root, dir_count, files_per_dir):
+    """生成合成目录树：dir_count个目录（每层最多10个子目录），每个目录files_per_dir个文件"""
+    dirs = [root]
+    for i in range(1, dir_count):
+        parent = dirs[(i - 1) // 10]
+        path = os.path.join(parent, f"d{i}")
+        os.makedirs(path, exist_ok=True)
+        dirs.append(path)
+
+    for d in dirs:
+        for j in range(files_per_dir):
+            with open(os.path.join(d, f"f{j}.tmp"), 'wb') as f:
+                f.write(b'x' * (j * 37 % 4096))
+    return len(dirs), len(dirs) * files_per_dir
+
+
+def legacy_walk(root):
+    """旧方式：os.walk后对每个文件调用isfile/getsize/getmtime，返回 (总大小, stat次数)"""
+    calls = [0]
+    real_stat = os.stat
+
+    def counting_stat(*args, **kwargs):
+        calls[0] += 1
+        return real_stat(*args, **kwargs)
+
+    os.stat = counting_stat
+    try:
+        total = 0
+        for dir_path, _, files in os.walk(root):
+            for file in files:
+                file_path = os.path.join(dir_path, file)
+                if os.path.isfile(file_path):
+                    total += os.path.getsize(file_path)
+                    os.path.getmtime(file_path)
+    finally:
+        os.stat = real_stat
+    return total, calls[0]
+
+
+def scandir_walk(root):
+    """新方式：walk_entries直接使用DirEntry的stat数据，返回 (总大小, 统计)"""
+    stats = WalkStats()
+    total = 0
+    for _, _, files in walk_entries(root, stats):
+        for entry in files:
+            total += entry.size
+            entry.mtime
+    return total, stats
+
+
+def policy_benchmark(root, protected):
+    """对比逐文件startswith检查受保护目录与按目录查询PathPolicy，返回 (旧方式秒数, 新方式秒数, 结果是否一致)"""
+    listing = [(dir_path, [entry.path for entry in files]) for dir_path, _, files in walk_entries(root)]
+
+    # 旧方式按字符串前缀比较，加上分隔符以免 d1 误匹配 d10
+    prefixes = [path + os.sep for path in protected]
+    start = time.perf_counter()
+    legacy = 0
+    for _, paths in listing:
+        for path in paths:
+            if not any(path.startswith(prefix) for prefix in prefixes):
+                legacy += 1
+    legacy_time = time.perf_counter() - start
+
+    policy = PathPolicy(deny=protected)
+    start = time.perf_counter()
+    allowed = 0
+    for dir_path, paths in listing:
+        if policy.allows_files(dir_path):
+            allowed += len(paths)
+    policy_time = time.perf_counter() - start
+    return legacy_time, policy_time, legacy == allowed
+
+
+def startup_benchmark(runs=STARTUP_RUNS):
+    """在新进程中测量冷启动，返回 (耗时中位数秒数, 加载了的禁止模块, 提前初始化的属性)
+
+    导入或构造失败时抛出subprocess.CalledProcessError。
+    """
+    code = _STARTUP_PROBE.format(forbidden=STARTUP_FORBIDDEN_MODULES)
+    here = os.path.dirname(os.path.abspath(__file__))
+    times, loaded, eager = [], set(), set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=here, stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True).stdout.strip()
+        elapsed, modules, attributes = output.split('|')
+        times.append(float(elapsed))
+        loaded.update(filter(None, modules.split(',')))
+        eager.update(filter(None, attributes.split(',')))
+    return statistics.median(times), sorted(loaded), sorted(eager)
+
+
+def check_startup(budget=STARTUP_BUDGET):
+    """检查冷启动预算，输出耗时，返回不满足的各项说明（满足时为空列表）"""
+    try:
+        startup_time, loaded, eager = startup_benchmark()
+    except subprocess.CalledProcessError as e:
+        return [f"导入cli或构造CleanerLogic失败（退出码 {e.returncode}）"]
+    print(f"冷启动 (导入cli并构造CleanerLogic): {startup_time * 1000:.1f} 毫秒, 预算 {budget * 1000:.0f} 毫秒")
+    errors = []
+    if loaded:
+        errors.append(f"冷启动时加载了 {', '.join(loaded)}")
+    if eager:
+        errors.append(f"构造CleanerLogic时提前初始化了 {', '.join(eager)}")
+    if startup_time > budget:
+        errors.append("冷启动超出预算")
+    return errors
+
+
+def make_uneven_roots(root, dir_count, files_per_dir):
+    """生成大小悬殊的多个扫描根目录：8个小目录和1个按规划顺序排在最后的大目录"""
+    roots = []
+    for i in range(8):
+        path = os.path.join(root, f"a{i}")
+        os.makedirs(path)
+        make_tree(path, max(1, dir_count // 40), files_per_dir)
+        roots.append(path)
+    path = os.path.join(root, "z_big")
+    os.makedirs(path)
+    make_tree(path, dir_count, files_per_dir)
+    roots.append(path)
+    return roots
+
+
+def timed_run(roots, workers, history=None):
+    """遍历所有根目录，返回 (makespan秒数, 引擎)"""
+    engine = TraversalEngine(history=history)
+    # 合成目录树较小，降低并行遍历的门槛，使耗时最长的组也能并行遍历
+    engine.split_min_seconds = 0.0
+    for path in roots:
+        engine.add_rule('bench', path, lambda entry: None)
+    start = time.perf_counter()
+    engine.run(max_workers=workers)
+    return time.perf_counter() - start, engine
+
+
+def simulated_latency(io_latency):
+    """在每次目录枚举前等待io_latency秒，返回恢复原os.scandir的函数
+
+    合成目录树都在文件系统缓存中，不加延迟时遍历受GIL限制，体现不出磁盘排队的效果。
+    """
+    real_scandir = os.scandir
+
+    def slow_scandir(*args, **kwargs):
+        time.sleep(io_latency)
+        return real_scandir(*args, **kwargs)
+
+    if io_latency:
+        os.scandir = slow_scandir
+
+    def restore():
+        os.scandir = real_scandir
+    return restore
+
+
+def parallel_walk_benchmark(root, workers, io_latency=0.0):
+    """对比walk_entries与ParallelWalker遍历同一目录树，返回 (串行秒数, 并行秒数, 顺序是否一致, 窃取次数)"""
+    restore = simulated_latency(io_latency)
+    try:
+        start = time.perf_counter()
+        serial = [(path, [entry.name for entry in files]) for path, _, files in walk_entries(root)]
+        serial_time = time.perf_counter() - start
+
+        walker = ParallelWalker(root, workers)
+        start = time.perf_counter()
+        parallel = [(path, [entry.name for entry in files]) for path, _, files, _ in walker]
+        parallel_time = time.perf_counter() - start
+    finally:
+        restore()
+    return serial_time, parallel_time, serial == parallel, walker.steals
+
+
+def makespan_benchmark(root, dir_count, files_per_dir, workers, io_latency=0.0):
+    """对比规划顺序与最长任务优先（以第一次遍历的耗时为依据）的整体完成时间
+
+    io_latency（秒）模拟每次目录枚举的磁盘延迟（见simulated_latency）。
+    """
+    roots = make_uneven_roots(root, dir_count, files_per_dir)
+    history = ScanHistory(os.path.join(root, 'scan_history.json'))
+
+    restore = simulated_latency(io_latency)
+    try:
+        # 预热文件系统缓存，避免第一次遍历吃亏
+        timed_run(roots, workers)
+        fifo_time, engine = timed_run(roots, workers)
+        for key, seconds in engine.task_durations.items():
+            history.record_task(key, seconds)
+        ljf_time, engine = timed_run(roots, workers, history)
+    finally:
+        restore()
+    return fifo_time, ljf_time, engine.concurrency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="扫描性能基准")
+    parser.add_argument('--dirs', type=int, default=500, help="目录数量")
+    parser.add_argument('--files', type=int, default=40, help="每个目录的文件数量")
+    parser.add_argument('--workers', type=int, default=4, help="makespan对比使用的固定并发数")
+    parser.add_argument('--io-latency', type=float, default=1.0, help="makespan对比中每次目录枚举模拟的磁盘延迟（毫秒）")
+    parser.add_argument('--startup-only', action='store_true', help="只检查冷启动预算")
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET * 1000,
+                        help="冷启动预算（毫秒）")
+    args = parser.parse_args()
+
+    errors = check_startup(args.startup_budget / 1000)
+    for error in errors:
+        print(f"错误: {error}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+    if args.startup_only:
+        return 0
+
+    root = tempfile.mkdtemp(prefix='ccleaner_bench_')
+    try:
+        dir_count, file_count = make_tree(root, args.dirs, args.files)
+        print(f"合成目录树: {dir_count} 个目录, {file_count} 个文件")
+
+        start = time.perf_counter()
+        legacy_total, legacy_calls = legacy_walk(root)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_total, stats = scandir_walk(root)
+        new_time = time.perf_counter() - start
+
+        if legacy_total != new_total:
+            print(f"错误: 两种方式统计的大小不一致 ({legacy_total} != {new_total})")
+            return 1
+
+        print(f"旧方式 (os.walk + isfile/getsize/getmtime): stat调用 {legacy_calls} 次, "
+              f"每文件 {legacy_calls / file_count:.2f} 次, 耗时 {legacy_time:.3f} 秒")
+        print(f"新方式 (scandir遍历): stat调用 {stats.stat_calls} 次, "
+              f"每文件 {stats.stat_calls / file_count:.2f} 次, 目录枚举 {stats.scandir_calls} 次, "
+              f"耗时 {new_time:.3f} 秒")
+
+        # 与CleanerLogic.safe_paths规模相当的受保护目录，外加合成目录树中的一个子树
+        protected = [os.path.join(root, 'protected', str(i)) for i in range(8)] + [os.path.join(root, 'd1')]
+        legacy_check, policy_check, same_result = policy_benchmark(root, protected)
+        if not same_result:
+            print("错误: 路径策略与逐文件检查的结果不一致")
+            return 1
+        print(f"安全路径检查: 逐文件线性比较 {legacy_check:.4f} 秒, 按目录查询路径策略 {policy_check:.4f} 秒")
+
+        serial_time, parallel_time, same_order, steals = parallel_walk_benchmark(root, args.workers,
+                                                                                 args.io_latency / 1000)
+        if not same_order:
+            print("错误: 并行遍历的结果顺序与串行遍历不一致")
+            return 1
+        print(f"单个目录树 ({args.workers} 个线程, 目录枚举延迟 {args.io_latency} 毫秒): 串行 {serial_time:.3f} 秒, "
+              f"并行 {parallel_time:.3f} 秒 (窃取 {steals} 次, 结果顺序一致)")
+
+        makespan_root = os.path.join(root, 'makespan')
+        fifo_time, ljf_time, concurrency = makespan_benchmark(makespan_root, args.dirs, args.files, args.workers,
+                                                              args.io_latency / 1000)
+        print(f"整体完成时间 ({args.workers} 个并发, 目录枚举延迟 {args.io_latency} 毫秒): 规划顺序 {fifo_time:.3f} 秒, "
+              f"最长任务优先 {ljf_time:.3f} 秒 (并行遍历组 {concurrency['split_groups']} 个, "
+              f"任务 {concurrency['tasks']} 个)")
+        return 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,6 +10,12 @@ import sys
 def build_exe():
     """使用PyInstaller打包应用为EXE文件"""
     print("开始打包C盘清理工具为EXE文件...")
+
+    # 打包前检查冷启动预算（见benchmark.py），不满足时不打包
+    benchmark = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark.py')
+    if subprocess.call([sys.executable, benchmark, '--startup-only']) != 0:
+        print("冷启动检查未通过，已停止打包")
+        sys.exit(1)
     
     # 创建输出目录
     if not os.path.exists('dist'):
@@ -6,22 +6,100 @@ C盘清理工具 - 核心清理逻辑
 """
 
 import os
+import glob
+import json
+import stat
 import shutil
-import tempfile
 import time
-import glob
+import heapq
 import logging
 import datetime
-import concurrent.futures
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename='cleaner.log'
-)
+import threading
+import itertools
+
+from config import CLEANABLE_FILE_TYPES, DEFAULT_CONFIG, LARGE_FILE_EXCLUDED_TYPES, SCAN_PROFILES
+from exclusions import ExclusionList
+from file_rules import FileTypeMatcher
+from path_policy import PathPolicy
+from glob_planner import GlobPlanner
+from scan_engine import CancelToken, DirSizes, FileEntry, TraversalEngine, canonical_path, stat_path, walk_entries
+from scan_history import ScanHistory
+from scan_index import ScanIndex
+from scan_item import ScanItem, as_scan_item
+from scan_rules import CATEGORIES, ITEM_DIR_TOTAL, ITEM_FILES, enabled_rules, expand_path
+from scan_snapshot import load_snapshot, save_snapshot
+from watcher import POLL_INTERVAL, Watcher, WatchRoot, default_backend, name_filter
+
+# 日志由程序入口（main.main、cli.main）配置，导入本模块不产生任何副作用
 logger = logging.getLogger('CCleaner')
 
+
+class ScanResults(dict):
+    """扫描结果字典，某个类别的全部遍历规则完成后立即通过update_callback推送该类别
+
+    扫描器在规划阶段通过new_part()为每条遍历规则领取一个完成回调；
+    close_planning()之后，没有未完成部分的类别即被推送，不必等待其他扫描器。
+    各部分的结果按登记顺序（而不是遍历完成的顺序）排列，并发遍历时结果顺序也是确定的。
+    """
+
+    def __init__(self, categories, update_callback=None):
+        super().__init__((category, []) for category in categories)
+        self._update_callback = update_callback
+        self._pending = {category: 0 for category in categories}
+        self._parts = {category: [] for category in categories}   # 各部分的结果，按登记顺序
+        self.truncated = set()   # 因超时或取消只包含部分结果的类别
+        self._planning = True
+        self._published = set()
+        self._lock = threading.Lock()
+
+    def new_part(self, category):
+        """登记该类别的一个待完成部分，返回完成时以该部分的结果调用的回调 done(items)"""
+        part = []
+        with self._lock:
+            self._pending[category] += 1
+            self._parts[category].append(part)
+
+        def done(items=()):
+            with self._lock:
+                part.extend(items)
+                self._pending[category] -= 1
+                ready = not self._planning and self._pending[category] == 0
+            if ready:
+                self._publish(category)
+
+        return done
+
+    def mark_truncated(self, category):
+        """标记该类别只包含部分结果"""
+        with self._lock:
+            self.truncated.add(category)
+
+    def close_planning(self):
+        """规划阶段结束，推送所有没有待完成部分的类别"""
+        with self._lock:
+            self._planning = False
+            ready = [category for category, count in self._pending.items() if count == 0]
+        for category in ready:
+            self._publish(category)
+
+    def finish(self):
+        """推送所有尚未推送的类别（汇总回调出错时兜底）"""
+        for category in list(self):
+            self._publish(category)
+
+    def _publish(self, category):
+        with self._lock:
+            for part in self._parts[category]:
+                self[category].extend(part)
+            self._parts[category] = []
+            if category in self._published:
+                return
+            self._published.add(category)
+        items = self[category]
+        if self._update_callback and items:
+            self._update_callback.emit({category: list(items)})
+
+
 class CleanerLogic:
     """清理逻辑核心类"""
 
@@ -29,7 +107,18 @@ class CleanerLogic:
         """初始化清理器"""
         self.options = {
             'simulate': True,  # 默认为模拟模式
-            'backup': True     # 默认备份文件
+            'backup': True,    # 默认备份文件
+            'scan_index': True, # 使用持久化扫描索引：未变化的目录不再枚举，其中的文件取自索引（见scan_index）
+            'scan_time_budget': None,  # 每个扫描器的时间预算（秒），None表示不限
+            'scanner_time_budgets': {}, # 按扫描器名称单独设置的时间预算，如 {'large_files': 60}
+            'large_file_min_size': DEFAULT_CONFIG['large_file_min_size'], # 大文件的最小大小（字节）
+            'large_file_top_k': DEFAULT_CONFIG['large_file_top_k'],       # 只保留最大的前K个大文件
+            'scan_profile': 'full',    # 扫描配置档：'full'（不限深度）或 'quick'（见config.SCAN_PROFILES）
+            'scan_depth': None,        # 覆盖配置档的目录层数限制
+            'min_file_size': None,     # 覆盖配置档的最小文件大小（字节）
+            'scan_workers': None,      # 遍历并发数，None表示按磁盘类型自适应
+            'scan_history': True,      # 记录各遍历任务的耗时，下次扫描时最长任务优先
+            'watch_interval': POLL_INTERVAL  # 监视模式轮询目录变化的间隔（秒），使用系统通知时不需要
         }
 
         # 安全路径列表 - 这些路径不会被扫描或清理
@@ -40,7 +129,75 @@ class CleanerLogic:
             os.path.join('C:', os.sep, 'Program Files (x86)'),
         ]
 
-        # 默认备份目录
+        # 系统目录 - 目录本身不能清理，其中的内容（如 C:\Windows\Temp）不受影响
+        self.system_dirs = [
+            os.path.join('C:', os.sep, 'Windows'),
+            os.path.join('C:', os.sep, 'Program Files'),
+            os.path.join('C:', os.sep, 'Program Files (x86)'),
+            os.path.join('C:', os.sep, 'ProgramData')
+        ]
+
+        # 用户排除项（持久化保存，首次使用时读取），见 exclusions
+        self._exclusions = None
+
+        # 编译后的路径策略（首次使用时编译），修改以上列表后调用update_path_policy()
+        self._path_policy = None
+
+        # 备份目录，首次使用时确定，见backup_dir
+        self._backup_dir = None
+
+        # 最近一次扫描的遍历统计
+        self.last_walk_stats = None
+        # 最近一次扫描是否被取消，以及只返回了部分结果的类别
+        self.last_scan_cancelled = False
+        self.last_scan_truncated = []
+        # 最近一次扫描的统计报告，见get_scan_report()
+        self.last_scan_report = None
+        # 扫描时汇总的目录子树大小，本次扫描/清理会话中复用
+        self.dir_sizes = DirSizes()
+        # 通配符路径的目录列表缓存，按父目录修改时间校验后跨扫描复用
+        self.glob_planner = GlobPlanner()
+        # 后台监视模式，见start_watch()
+        self.watcher = None
+
+        # 各类别的文件类型规则编译成一个匹配器，每个文件名只匹配一次
+        self.file_types = FileTypeMatcher(CLEANABLE_FILE_TYPES)
+        self.file_types.add('large_file_excluded', LARGE_FILE_EXCLUDED_TYPES)
+
+        # 备份限制
+        self.max_backups = 5  # 最多保留几个备份
+        self.max_backup_size = 1024 * 1024 * 1024  # 1GB
+
+    @property
+    def exclusions(self):
+        """用户排除项，首次使用时从磁盘读取"""
+        if self._exclusions is None:
+            self._exclusions = ExclusionList()
+        return self._exclusions
+
+    @property
+    def path_policy(self):
+        """编译后的路径策略，首次使用时编译"""
+        if self._path_policy is None:
+            self.update_path_policy()
+        return self._path_policy
+
+    @property
+    def backup_dir(self):
+        """备份目录：未设置时首次使用时确定默认位置；目录在第一次备份时才创建"""
+        if self._backup_dir is None:
+            self._backup_dir = self._default_backup_dir()
+        return self._backup_dir
+
+    @backup_dir.setter
+    def backup_dir(self, path):
+        self._backup_dir = path
+
+    @staticmethod
+    def _default_backup_dir():
+        """默认备份位置：第一个非C盘下的 CCleaner_Backup，没有时使用临时目录"""
+        import tempfile
+
         default_backup_dir = os.path.join(tempfile.gettempdir(), 'CCleaner_Backup')
 
         # 尝试找到非C盘的默认备份位置
@@ -64,39 +221,15 @@ class CleanerLogic:
         except Exception as e:
             logger.warning(f"无法获取非C盘作为备份位置: {e}")
 
-        # 设置备份目录
-        self.backup_dir = default_backup_dir
-
-        # 备份限制
-        self.max_backups = 5  # 最多保留几个备份
-        self.max_backup_size = 1024 * 1024 * 1024  # 1GB
-
-        # 确保备份目录存在
-        if not os.path.exists(self.backup_dir):
-            os.makedirs(self.backup_dir, exist_ok=True)
+        return default_backup_dir
 
     def set_options(self, options):
         """设置选项"""
         self.options.update(options)
 
-        # 如果设置了自定义备份目录
+        # 如果设置了自定义备份目录（第一次备份时才创建）
         if 'backup_dir' in options and options['backup_dir']:
             self.backup_dir = options['backup_dir']
-            # 确保备份目录存在
-            if not os.path.exists(self.backup_dir):
-                os.makedirs(self.backup_dir, exist_ok=True)
-
-        # 如果设置了备份限制
-        if 'max_backups' in options:
-            self.max_backups = options['max_backups']
-        if 'max_backup_size' in options:
-            self.max_backup_size = options['max_backup_size']
-
-        # 如果设置了自定义备份目录
-        if 'backup_dir' in options and options['backup_dir']:
-            # 确保备份目录存在
-            if not os.path.exists(self.backup_dir):
-                os.makedirs(self.backup_dir, exist_ok=True)
 
         # 如果设置了备份限制
         if 'max_backups' in options:
@@ -161,14 +294,8 @@ class CleanerLogic:
                 if os.path.isdir(item_path):
                     # 计算备份大小
                     backup_size = 0
-                    for root, _, files in os.walk(item_path):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    backup_size += os.path.getsize(file_path)
-                            except (PermissionError, FileNotFoundError):
-                                pass
+                    for _, _, files in walk_entries(item_path):
+                        backup_size += sum(entry.size for entry in files)
 
                     # 尝试从文件夹名解析时间
                     try:
@@ -281,1370 +408,470 @@ class CleanerLogic:
             logger.error(f"恢复备份失败: {e}")
             return False
 
-    def scan_system(self):
-        """扫描系统中可清理的文件"""
-        logger.info("开始扫描系统")
-        results = {
-            # 基本清理
-            'temp': [],          # 临时文件
-            'recycle': [],       # 回收站
-            'cache': [],         # 浏览器缓存
-            'logs': [],          # 系统日志
-            'updates': [],       # Windows更新缓存
-            'thumbnails': [],    # 缩略图缓存
-
-            # 扩展清理
-            'prefetch': [],      # 预读取文件
-            'old_windows': [],   # 旧Windows文件
-            'error_reports': [], # 错误报告
-            'service_packs': [], # 服务包备份
-            'memory_dumps': [],  # 内存转储文件
-            'font_cache': [],    # 字体缓存
-            'disk_cleanup': [],  # 磁盘清理备份
-
-            # 新增安全清理项
-            'app_cache': [],     # 应用程序缓存
-            'media_cache': [],   # 媒体播放器缓存
-            'search_index': [],  # 搜索索引临时文件
-            'backup_temp': [],   # 备份临时文件
-            'update_temp': [],   # 更新临时文件
-            'driver_backup': [], # 驱动备份
-            'app_crash': [],     # 应用程序崩溃转储
-            'app_logs': [],      # 应用程序日志
-            'recent_items': [],  # 最近使用的文件列表缓存
-            'notification': [],  # Windows通知缓存
-            'dns_cache': [],     # DNS缓存
-            'printer_temp': [],  # 打印机临时文件
-            'device_temp': [],   # 设备临时文件
-            'windows_defender': [], # Windows Defender缓存
-            'store_cache': [],   # Windows Store缓存
-            'onedrive_cache': [], # OneDrive缓存
-
-            # 新增用户请求的清理项
-            'downloads': [],     # 下载文件夹(安全版)
-            'installer_cache': [], # 安装程序缓存(安全版)
-            'delivery_opt': [],  # Windows传递优化缓存
-
-            # 大文件扫描
-            'large_files': []    # 大文件
-        }
-
-        # 定义扫描任务
-        scan_tasks = [
-            self._scan_temp_files,
-            self._scan_recycle_bin,
-            self._scan_browser_cache,
-            self._scan_system_logs,
-            self._scan_windows_updates,
-            self._scan_thumbnails_cache,
-            self._scan_prefetch,
-            self._scan_old_windows,
-            self._scan_error_reports,
-            self._scan_service_packs,
-            self._scan_memory_dumps,
-            self._scan_font_cache,
-            self._scan_disk_cleanup_backup,
-            self._scan_app_cache,
-            self._scan_media_cache,
-            self._scan_search_index,
-            self._scan_backup_temp,
-            self._scan_update_temp,
-            self._scan_driver_backup,
-            self._scan_app_crash,
-            self._scan_app_logs,
-            self._scan_recent_items,
-            self._scan_notification_cache,
-            self._scan_dns_cache,
-            self._scan_printer_temp,
-            self._scan_device_temp,
-            self._scan_windows_defender,
-            self._scan_store_cache,
-            self._scan_onedrive_cache,
-            self._scan_downloads_immediate,
-            self._scan_installer_cache_safe,
-            self._scan_delivery_optimization, # Ensure this is the correct one
-            self._scan_large_files
-        ]
-
-        # 使用ThreadPoolExecutor并发运行扫描任务
-        # 根据测试调整max_workers，None通常默认为os.cpu_count（）*5
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            # 提交所有任务
-            future_to_task = {executor.submit(task, results): task for task in scan_tasks}
-
-            # 等待所有任务完成并处理潜在的异常
-            for future in concurrent.futures.as_completed(future_to_task):
-                task_func = future_to_task[future]
-                try:
-                    future.result()  # 任务期间发生的任何异常
-                    logger.info(f"Task {task_func.__name__} completed successfully.")
-                except Exception as exc:
-                    logger.error(f'Task {task_func.__name__} generated an exception: {exc}')
-
-        # 结果字典由任务直接填充
-
-        logger.info(f"扫描完成，找到 {sum(len(items) for items in results.values())} 个可清理项目")
-        return results
-
-    def _scan_temp_files(self, results):
-        """扫描临时文件"""
-        # 扫描Windows临时文件夹
-        temp_dirs = [
-            os.environ.get('TEMP', os.path.join('C:', os.sep, 'Windows', 'Temp')),
-            os.path.join('C:', os.sep, 'Windows', 'Temp')
-        ]
-
-        for temp_dir in temp_dirs:
-            if os.path.exists(temp_dir) and self._is_safe_path(temp_dir):
-                for root, _, files in os.walk(temp_dir):
-                    for file in files:
-                        try:
-                            file_path = os.path.join(root, file)
-                            if os.path.isfile(file_path):
-                                file_size = os.path.getsize(file_path)
-                                results['temp'].append({
-                                    'path': file_path,
-                                    'size': file_size,
-                                    'type': 'temp'
-                                })
-                        except (PermissionError, FileNotFoundError) as e:
-                            logger.warning(f"无法访问文件 {file_path}: {e}")
-
-    def _scan_recycle_bin(self, results):
-        """扫描回收站"""
-        recycle_bin = os.path.join('C:', os.sep, '$Recycle.Bin')
-        if os.path.exists(recycle_bin):
-            total_size = 0
-            try:
-                for root, _, files in os.walk(recycle_bin):
-                    for file in files:
-                        try:
-                            file_path = os.path.join(root, file)
-                            if os.path.isfile(file_path):
-                                file_size = os.path.getsize(file_path)
-                                total_size += file_size
-                        except (PermissionError, FileNotFoundError):
-                            pass
-
-                if total_size > 0:
-                    results['recycle'].append({
-                        'path': recycle_bin,
-                        'size': total_size,
-                        'type': 'recycle'
-                    })
-            except (PermissionError, FileNotFoundError) as e:
-                logger.warning(f"无法访问回收站: {e}")
-
-    def _scan_browser_cache(self, results):
-        """扫描浏览器缓存"""
-        # Chrome缓存
-        chrome_cache = os.path.join(os.environ.get('LOCALAPPDATA', ''),
-                                   'Google', 'Chrome', 'User Data', 'Default', 'Cache')
-
-        # Edge缓存
-        edge_cache = os.path.join(os.environ.get('LOCALAPPDATA', ''),
-                                 'Microsoft', 'Edge', 'User Data', 'Default', 'Cache')
-
-        # Firefox缓存
-        firefox_profiles = os.path.join(os.environ.get('APPDATA', ''),
-                                      'Mozilla', 'Firefox', 'Profiles')
-
-        cache_dirs = [chrome_cache, edge_cache]
-
-        # 添加Firefox配置文件缓存
-        if os.path.exists(firefox_profiles):
-            try:
-                for profile in os.listdir(firefox_profiles):
-                    profile_cache = os.path.join(firefox_profiles, profile, 'cache2')
-                    if os.path.exists(profile_cache):
-                        cache_dirs.append(profile_cache)
-            except (PermissionError, FileNotFoundError) as e:
-                logger.warning(f"无法访问Firefox配置文件: {e}")
-
-        # 扫描所有缓存目录
-        for cache_dir in cache_dirs:
-            if os.path.exists(cache_dir) and self._is_safe_path(cache_dir):
-                total_size = 0
-                try:
-                    for root, _, files in os.walk(cache_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['cache'].append({
-                            'path': cache_dir,
-                            'size': total_size,
-                            'type': 'cache'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问缓存目录 {cache_dir}: {e}")
-
-    def _scan_system_logs(self, results):
-        """扫描系统日志"""
-        log_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'Logs'),
-            os.path.join('C:', os.sep, 'Windows', 'debug')
-        ]
+    def scan_system(self, update_callback=None, cancel=None, max_workers=None):
+        """扫描系统中可清理的文件
 
-        for log_dir in log_dirs:
-            if os.path.exists(log_dir) and self._is_safe_path(log_dir):
-                try:
-                    for root, _, files in os.walk(log_dir):
-                        for file in files:
-                            if file.endswith('.log') or file.endswith('.etl') or file.endswith('.dmp'):
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        file_size = os.path.getsize(file_path)
-                                        results['logs'].append({
-                                            'path': file_path,
-                                            'size': file_size,
-                                            'type': 'logs'
-                                        })
-                                except (PermissionError, FileNotFoundError):
-                                    pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问日志目录 {log_dir}: {e}")
-
-    def _scan_windows_updates(self, results):
-        """扫描Windows更新缓存"""
-        update_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'SoftwareDistribution', 'Download'),
-            os.path.join('C:', os.sep, 'Windows', 'SoftwareDistribution', 'DataStore')
-        ]
-
-        for update_dir in update_dirs:
-            if os.path.exists(update_dir) and self._is_safe_path(update_dir):
-                total_size = 0
-                try:
-                    for root, _, files in os.walk(update_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['updates'].append({
-                            'path': update_dir,
-                            'size': total_size,
-                            'type': 'updates'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问Windows更新缓存 {update_dir}: {e}")
-
-    def _scan_thumbnails_cache(self, results):
-        """扫描缩略图缓存"""
-        thumbnail_dirs = [
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'Explorer'),
-            os.path.join('C:', os.sep, 'Users', os.environ.get('USERNAME', ''), 'AppData', 'Local', 'Microsoft', 'Windows', 'Explorer'),
-        ]
-
-        for thumb_dir in thumbnail_dirs:
-            if os.path.exists(thumb_dir) and self._is_safe_path(thumb_dir):
-                try:
-                    thumb_db = os.path.join(thumb_dir, 'thumbcache_*.db')
-                    for thumb_file in glob.glob(thumb_db):
-                        try:
-                            if os.path.isfile(thumb_file):
-                                file_size = os.path.getsize(thumb_file)
-                                results['thumbnails'].append({
-                                    'path': thumb_file,
-                                    'size': file_size,
-                                    'type': 'thumbnails'
-                                })
-                        except (PermissionError, FileNotFoundError):
-                            pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问缩略图缓存 {thumb_dir}: {e}")
-
-    def _scan_prefetch(self, results):
-        """扫描预读取文件"""
-        prefetch_dir = os.path.join('C:', os.sep, 'Windows', 'Prefetch')
-
-        if os.path.exists(prefetch_dir) and self._is_safe_path(prefetch_dir):
-            try:
-                for root, _, files in os.walk(prefetch_dir):
-                    for file in files:
-                        if file.endswith('.pf'):
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    results['prefetch'].append({
-                                        'path': file_path,
-                                        'size': file_size,
-                                        'type': 'prefetch'
-                                    })
-                            except (PermissionError, FileNotFoundError):
-                                pass
-            except (PermissionError, FileNotFoundError) as e:
-                logger.warning(f"无法访问预读取文件夹 {prefetch_dir}: {e}")
-
-    def _scan_downloads(self, results):
-        """扫描下载文件夹"""
-        # 获取当前用户的下载文件夹
-        download_dirs = [
-            os.path.join('C:', os.sep, 'Users', os.environ.get('USERNAME', ''), 'Downloads'),
-            os.path.join(os.path.expanduser('~'), 'Downloads')
-        ]
-
-        # 添加一些常见的临时下载文件类型
-        temp_extensions = ['.tmp', '.temp', '.part', '.crdownload', '.download']
-        old_threshold = datetime.datetime.now() - datetime.timedelta(days=30)  # 30天前的文件
-
-        for download_dir in download_dirs:
-            if os.path.exists(download_dir) and self._is_safe_path(download_dir):
-                try:
-                    for root, _, files in os.walk(download_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    # 检查是否是临时下载文件或者超过30天的旧文件
-                                    is_temp = any(file.endswith(ext) for ext in temp_extensions)
-
-                                    # 获取文件修改时间
-                                    mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                                    is_old = mod_time < old_threshold
-
-                                    if is_temp or is_old:
-                                        file_size = os.path.getsize(file_path)
-                                        results['downloads'].append({
-                                            'path': file_path,
-                                            'size': file_size,
-                                            'type': 'downloads'
-                                        })
-                            except (PermissionError, FileNotFoundError):
-                                pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问下载文件夹 {download_dir}: {e}")
-
-    def _scan_old_windows(self, results):
-        """扫描旧Windows文件"""
-        old_windows_dirs = [
-            os.path.join('C:', os.sep, 'Windows.old'),
-            os.path.join('C:', os.sep, '$Windows.~BT'),
-            os.path.join('C:', os.sep, '$Windows.~WS')
-        ]
-
-        for old_dir in old_windows_dirs:
-            if os.path.exists(old_dir) and self._is_safe_path(old_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(old_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    total_size += os.path.getsize(file_path)
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['old_windows'].append({
-                            'path': old_dir,
-                            'size': total_size,
-                            'type': 'old_windows'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问旧Windows文件夹 {old_dir}: {e}")
-
-    def _scan_error_reports(self, results):
-        """扫描错误报告"""
-        error_report_dirs = [
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Windows', 'WER'),
-            os.path.join('C:', os.sep, 'Users', os.environ.get('USERNAME', ''), 'AppData', 'Local', 'Microsoft', 'Windows', 'WER'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'WER')
-        ]
-
-        for error_dir in error_report_dirs:
-            if os.path.exists(error_dir) and self._is_safe_path(error_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(error_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    total_size += os.path.getsize(file_path)
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['error_reports'].append({
-                            'path': error_dir,
-                            'size': total_size,
-                            'type': 'error_reports'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问错误报告文件夹 {error_dir}: {e}")
-
-    def _scan_service_packs(self, results):
-        """扫描服务包备份"""
-        service_pack_dirs = [
-            os.path.join('C:', os.sep, 'Windows', '$NtServicePackUninstall$'),
-            os.path.join('C:', os.sep, 'Windows', '$hf_mig$')
-        ]
-
-        for sp_dir in service_pack_dirs:
-            if os.path.exists(sp_dir) and self._is_safe_path(sp_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(sp_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    total_size += os.path.getsize(file_path)
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['service_packs'].append({
-                            'path': sp_dir,
-                            'size': total_size,
-                            'type': 'service_packs'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问服务包备份文件夹 {sp_dir}: {e}")
-
-    def _scan_hibernation_file(self, results):
-        """扫描休眠文件"""
-        hibernation_file = os.path.join('C:', os.sep, 'hiberfil.sys')
-
-        if os.path.exists(hibernation_file) and self._is_safe_path(hibernation_file):
+        update_callback（如pyqtSignal）不为空时，每个类别扫描完成后立即
+        emit({类别: 项目列表})，最终仍返回完整的结果字典。
+        cancel（CancelToken）取消后扫描尽快结束，返回已收集到的部分结果。
+        max_workers为遍历并发数，None时使用scan_workers选项。
+        """
+        logger.info("开始扫描系统")
+        scan_start = time.perf_counter()
+        # 结果中的类别及各类别的清理规则见 scan_rules
+        results = ScanResults({category: [] for category, _ in CATEGORIES}, update_callback)
+        rules = enabled_rules()
+
+        # 规划阶段：各规则向遍历引擎登记要遍历的根目录，
+        # 单个文件/通配符之类的轻量检查在这里直接完成
+        if cancel is None:
+            cancel = CancelToken()
+        index = self._open_scan_index()
+        self.dir_sizes = DirSizes()
+        history = self._open_scan_history()
+        max_depth, min_size = self._scan_limits()
+        engine = TraversalEngine(index=index, cancel=cancel, budgets=self._scan_budgets(rules),
+                                 sizes=self.dir_sizes, max_depth=max_depth, min_size=min_size,
+                                 history=history, policy=self.path_policy)
+        now = time.time()
+        expansions = self._expand_patterns(rules, engine)
+        for rule in rules:
+            if cancel.is_cancelled():
+                break
+            rule_start = time.perf_counter()
+            before = engine.stats.copy()
             try:
-                file_size = os.path.getsize(hibernation_file)
-                if file_size > 0:
-                    results['hibernation'].append({
-                        'path': hibernation_file,
-                        'size': file_size,
-                        'type': 'hibernation'
-                    })
-            except (PermissionError, FileNotFoundError) as e:
-                logger.warning(f"无法访问休眠文件 {hibernation_file}: {e}")
-
-    def _scan_memory_dumps(self, results):
-        """扫描内存转储文件"""
-        memory_dump_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'Minidump'),
-            os.path.join('C:', os.sep, 'Windows', 'MEMORY.DMP'),
-            os.path.join('C:', os.sep, 'Windows', 'memory.dmp')
-        ]
-
-        for dump_dir in memory_dump_dirs:
-            if os.path.exists(dump_dir) and self._is_safe_path(dump_dir):
-                try:
-                    if os.path.isfile(dump_dir):
-                        # 如果是文件
-                        file_size = os.path.getsize(dump_dir)
-                        if file_size > 0:
-                            results['memory_dumps'].append({
-                                'path': dump_dir,
-                                'size': file_size,
-                                'type': 'memory_dumps'
-                            })
-                    else:
-                        # 如果是目录
-                        total_size = 0
-                        for root, _, files in os.walk(dump_dir):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        total_size += os.path.getsize(file_path)
-                                except (PermissionError, FileNotFoundError):
-                                    pass
-
-                        if total_size > 0:
-                            results['memory_dumps'].append({
-                                'path': dump_dir,
-                                'size': total_size,
-                                'type': 'memory_dumps'
-                            })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问内存转储文件 {dump_dir}: {e}")
-
-    def _scan_delivery_optimization(self, results):
-        """扫描Windows传递优化缓存"""
-        delivery_opt_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'ServiceProfiles', 'NetworkService', 'AppData', 'Local', 'Microsoft', 'Windows', 'DeliveryOptimization', 'Cache'),
-            os.path.join('C:', os.sep, 'Windows', 'SoftwareDistribution', 'DeliveryOptimization', 'Cache')
-        ]
-
-        for opt_dir in delivery_opt_dirs:
-            if os.path.exists(opt_dir) and self._is_safe_path(opt_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(opt_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['delivery_opt'].append({
-                            'path': opt_dir,
-                            'size': total_size,
-                            'type': 'delivery_opt'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问Windows传递优化缓存 {opt_dir}: {e}")
-
-    def _scan_font_cache(self, results):
-        """扫描字体缓存"""
-        font_cache_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'ServiceProfiles', 'LocalService', 'AppData', 'Local', 'FontCache'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'FNTCACHE.DAT')
-        ]
-
-        for font_dir in font_cache_dirs:
-            if os.path.exists(font_dir) and self._is_safe_path(font_dir):
-                try:
-                    if os.path.isfile(font_dir):
-                        # 如果是文件
-                        file_size = os.path.getsize(font_dir)
-                        if file_size > 0:
-                            results['font_cache'].append({
-                                'path': font_dir,
-                                'size': file_size,
-                                'type': 'font_cache'
-                            })
-                    else:
-                        # 如果是目录
-                        total_size = 0
-                        for root, _, files in os.walk(font_dir):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        total_size += os.path.getsize(file_path)
-                                except (PermissionError, FileNotFoundError):
-                                    pass
-
-                        if total_size > 0:
-                            results['font_cache'].append({
-                                'path': font_dir,
-                                'size': total_size,
-                                'type': 'font_cache'
-                            })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问字体缓存 {font_dir}: {e}")
-
-    def _scan_installer_cache(self, results):
-        """扫描安装程序缓存"""
-        installer_cache_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'Installer'),
-            os.path.join('C:', os.sep, 'ProgramData', 'Package Cache'),
-            os.path.join('C:', os.sep, 'Windows', 'Downloaded Program Files')
-        ]
-
-        # 超过90天的安装程序缓存
-        old_threshold = datetime.datetime.now() - datetime.timedelta(days=90)
-
-        for installer_dir in installer_cache_dirs:
-            if os.path.exists(installer_dir) and self._is_safe_path(installer_dir):
-                try:
-                    for root, _, files in os.walk(installer_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    # 检查文件是否超过90天未修改
-                                    mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                                    if mod_time < old_threshold:
-                                        file_size = os.path.getsize(file_path)
-                                        results['installer_cache'].append({
-                                            'path': file_path,
-                                            'size': file_size,
-                                            'type': 'installer_cache'
-                                        })
-                            except (PermissionError, FileNotFoundError):
-                                pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问安装程序缓存 {installer_dir}: {e}")
-
-    def _scan_disk_cleanup_backup(self, results):
-        """扫描磁盘清理备份"""
-        cleanup_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'LogFiles', 'setupapi'),
-            os.path.join('C:', os.sep, 'Windows', 'Temp', 'CheckSur'),
-            os.path.join('C:', os.sep, 'Windows', 'Logs', 'CBS')
-        ]
-
-        for cleanup_dir in cleanup_dirs:
-            if os.path.exists(cleanup_dir) and self._is_safe_path(cleanup_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(cleanup_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    total_size += os.path.getsize(file_path)
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['disk_cleanup'].append({
-                            'path': cleanup_dir,
-                            'size': total_size,
-                            'type': 'disk_cleanup'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问磁盘清理备份 {cleanup_dir}: {e}")
-
-    def _scan_app_cache(self, results):
-        """扫描应用程序缓存"""
-        # 常见应用程序缓存目录
-        app_cache_dirs = [
-            # Adobe缓存
-            os.path.join(os.environ.get('APPDATA', ''), 'Adobe', 'Common'),
-            # Office缓存
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Office', 'Recent'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Office', 'OTele'),
-            # 其他常见应用缓存
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Google', 'DriveFS'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Teams', 'Cache'),
-            os.path.join(os.environ.get('APPDATA', ''), 'Slack', 'Cache'),
-            os.path.join(os.environ.get('APPDATA', ''), 'discord', 'Cache'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'INetCache', 'IE')
-        ]
-
-        for cache_dir in app_cache_dirs:
-            if os.path.exists(cache_dir) and self._is_safe_path(cache_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(cache_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    total_size += os.path.getsize(file_path)
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['app_cache'].append({
-                            'path': cache_dir,
-                            'size': total_size,
-                            'type': 'app_cache'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问应用程序缓存 {cache_dir}: {e}")
-
-    def _scan_media_cache(self, results):
-        """扫描媒体播放器缓存"""
-        # 媒体播放器缓存目录
-        media_cache_dirs = [
-            # Windows Media Player
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Media Player'),
-            # VLC
-            os.path.join(os.environ.get('APPDATA', ''), 'vlc', 'art'),
-            # Spotify
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Spotify', 'Storage'),
-            os.path.join(os.environ.get('APPDATA', ''), 'Spotify', 'cache'),
-            # 其他媒体应用
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'Explorer', 'iconcache*')
-        ]
-
-        for cache_dir in media_cache_dirs:
-            # 处理通配符模式
-            if '*' in cache_dir:
+                if rule.planner:
+                    getattr(self, rule.planner)(results, engine)
+                else:
+                    self._plan_rule(rule, results, engine, now, expansions)
+            except Exception as exc:
+                logger.error(f'Rule {rule.name} generated an exception: {exc}')
+            scanner_stats = engine.scanner(rule.name)
+            scanner_stats.planning_time = time.perf_counter() - rule_start
+            scanner_stats.add_walk(engine.stats.delta(before))
+        results.close_planning()
+
+        # 遍历阶段：重叠的根目录合并，每个目录只遍历一次，
+        # 文件分发给所有相关规则，结果由各规则汇总到结果字典中
+        try:
+            engine.run(max_workers=max_workers if max_workers is not None else self.options.get('scan_workers'))
+        finally:
+            if index is not None:
                 try:
-                    for matched_path in glob.glob(cache_dir):
-                        if os.path.exists(matched_path) and self._is_safe_path(matched_path):
-                            try:
-                                if os.path.isfile(matched_path):
-                                    file_size = os.path.getsize(matched_path)
-                                    if file_size > 0:
-                                        results['media_cache'].append({
-                                            'path': matched_path,
-                                            'size': file_size,
-                                            'type': 'media_cache'
-                                        })
-                            except (PermissionError, FileNotFoundError) as e:
-                                logger.warning(f"无法访问媒体缓存文件 {matched_path}: {e}")
+                    index.close()
                 except Exception as e:
-                    logger.warning(f"处理通配符模式时出错 {cache_dir}: {e}")
-                continue
+                    logger.warning(f"保存扫描索引失败: {e}")
+        results.finish()
+
+        # 遍历统计（目录数、文件数、stat系统调用次数等）
+        self.last_walk_stats = engine.stats
+        logger.info(f"遍历统计: {engine.stats.to_dict()}")
+
+        self.last_scan_cancelled = cancel.is_cancelled()
+        self.last_scan_truncated = sorted(results.truncated)
+        if self.last_scan_cancelled:
+            logger.info("扫描已取消，返回部分结果")
+        elif self.last_scan_truncated:
+            logger.info(f"以下类别超出时间预算，只返回部分结果: {self.last_scan_truncated}")
+
+        # 各扫描器统计，按耗时降序
+        scanners = sorted(engine.scanner_report().items(), key=lambda kv: kv[1].wall_time, reverse=True)
+
+        # 完整扫描的耗时留作下次调度的依据（取消或超时的扫描耗时偏短，不记录）
+        if history is not None and not self.last_scan_cancelled and not self.last_scan_truncated:
+            for key, seconds in engine.task_durations.items():
+                history.record_task(key, seconds)
+            for name, scanner_stats in scanners:
+                history.record_scanner(name, scanner_stats.wall_time)
+            history.save()
+        self.last_scan_report = {
+            'wall_time': time.perf_counter() - scan_start,
+            'cancelled': self.last_scan_cancelled,
+            'truncated': self.last_scan_truncated,
+            'walk': engine.stats.to_dict(),
+            'concurrency': engine.concurrency,
+            'scanners': {name: scanner_stats.to_dict() for name, scanner_stats in scanners}
+        }
+        for name, scanner_stats in scanners[:5]:
+            logger.info(f"扫描器 {name} 耗时 {scanner_stats.wall_time:.3f} 秒, "
+                        f"目录 {scanner_stats.dirs} 个, 文件 {scanner_stats.files} 个")
 
-            # 处理普通目录
-            if os.path.exists(cache_dir) and self._is_safe_path(cache_dir):
+        logger.info(f"扫描完成，找到 {sum(len(items) for items in results.values())} 个可清理项目")
+        return dict(results)
+
+    async def scan_system_async(self, max_workers=None):
+        """异步扫描，按类别完成的先后顺序产生 (类别, 项目列表)
+
+            async with contextlib.aclosing(cleaner.scan_system_async()) as scan:
+                async for category, items in scan:
+                    ...
+
+        扫描在一个专用线程中进行，目录遍历的并发数不超过max_workers（None时
+        按scan_workers选项）。迭代被关闭（如上用aclosing在break后关闭）或所在
+        任务被取消时，扫描随之取消，并且等所有遍历线程退出后才返回。
+        扫描出错时异常在迭代中抛出。需要Python 3.7+（contextlib.aclosing为3.10+）。
+        """
+        import asyncio
+        import concurrent.futures
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancel = CancelToken()
+        done = object()
+
+        class _Emitter:
+            # scan_system在遍历线程中推送结果，转交给事件循环
+            @staticmethod
+            def emit(partial):
+                loop.call_soon_threadsafe(queue.put_nowait, partial)
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='scan')
+        future = loop.run_in_executor(executor, self.scan_system, _Emitter, cancel, max_workers)
+        future.add_done_callback(lambda _: queue.put_nowait(done))
+        try:
+            while True:
+                partial = await queue.get()
+                if partial is done:
+                    break
+                for category, items in partial.items():
+                    yield category, items
+            await future
+        finally:
+            if not future.done():
+                cancel.cancel()
                 try:
-                    total_size = 0
-                    for root, _, files in os.walk(cache_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    total_size += os.path.getsize(file_path)
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['media_cache'].append({
-                            'path': cache_dir,
-                            'size': total_size,
-                            'type': 'media_cache'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问媒体缓存 {cache_dir}: {e}")
-
-    def _scan_search_index(self, results):
-        """扫描搜索索引临时文件"""
-        # Windows搜索索引临时文件目录
-        search_index_dirs = [
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Search', 'Data', 'Temp'),
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Search', 'Data', 'Applications', 'Windows'),
-            os.path.join('C:', os.sep, 'Windows', 'ServiceProfiles', 'LocalService', 'AppData', 'Local', 'Microsoft', 'Windows', 'Search')
-        ]
-
-        # 只清理临时文件和旧索引文件
-        temp_extensions = ['.tmp', '.old', '.bak', '.log']
+                    await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # 再次被取消时仍等待扫描线程退出，保证不在后台继续运行
+                    await asyncio.wait([future])
+                    raise
+                except Exception:
+                    pass
+            executor.shutdown(wait=True)
+
+    def get_scan_report(self):
+        """返回最近一次扫描的统计报告，尚未扫描时返回None
+
+        报告包含总耗时、是否取消、超出时间预算的类别、总遍历统计(walk)、
+        遍历并发调度(concurrency: 磁盘类型、初始/最终/最高并发数、调整记录、
+        任务数、并行遍历组数)，以及
+        scanners: {扫描器名称: {wall_time, planning_time, dirs, files, bytes,
+        errors, stat_calls, scandir_calls}}（按耗时降序）。多个扫描器共享的目录
+        开销计入每个相关扫描器。
+        """
+        return self.last_scan_report
+
+    def save_scan_report(self, path):
+        """把最近一次扫描的统计报告保存为JSON文件"""
+        if self.last_scan_report is None:
+            return False
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.last_scan_report, f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            logger.error(f"保存扫描统计失败: {e}")
+            return False
 
-        for index_dir in search_index_dirs:
-            if os.path.exists(index_dir) and self._is_safe_path(index_dir):
-                try:
-                    for root, _, files in os.walk(index_dir):
-                        for file in files:
-                            try:
-                                # 只清理临时文件和旧索引文件
-                                if any(file.endswith(ext) for ext in temp_extensions):
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        file_size = os.path.getsize(file_path)
-                                        results['search_index'].append({
-                                            'path': file_path,
-                                            'size': file_size,
-                                            'type': 'search_index'
-                                        })
-                            except (PermissionError, FileNotFoundError):
-                                pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问搜索索引目录 {index_dir}: {e}")
-
-    def _scan_backup_temp(self, results):
-        """扫描备份临时文件"""
-        # Windows备份临时文件目录
-        backup_temp_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'Temp', 'WindowsBackup'),
-            os.path.join('C:', os.sep, 'Windows', 'Logs', 'WindowsBackup'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'WindowsBackup')
-        ]
+    def export_scan(self, path, results):
+        """把扫描结果保存为快照文件（见scan_snapshot），返回写入的项目数，失败时返回None
 
-        for backup_dir in backup_temp_dirs:
-            if os.path.exists(backup_dir) and self._is_safe_path(backup_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(backup_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    # 检查是否是旧文件（超过30天）
-                                    mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                                    if (datetime.datetime.now() - mod_time).days > 30:
-                                        file_size = os.path.getsize(file_path)
-                                        total_size += file_size
-                                        results['backup_temp'].append({
-                                            'path': file_path,
-                                            'size': file_size,
-                                            'type': 'backup_temp'
-                                        })
-                            except (PermissionError, FileNotFoundError):
-                                pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问备份临时文件目录 {backup_dir}: {e}")
-
-    def _scan_update_temp(self, results):
-        """扫描更新临时文件"""
-        # Windows更新临时文件目录
-        update_temp_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'SoftwareDistribution', 'PostRebootEventCache'),
-            os.path.join('C:', os.sep, 'Windows', 'SoftwareDistribution', 'Temp'),
-            os.path.join('C:', os.sep, 'Windows', 'WinSxS', 'Temp'),
-            os.path.join('C:', os.sep, 'Windows', 'Temp', 'TrustedInstaller')
-        ]
+        之后可以用import_scan载入，不必重新扫描即可交给clean_selected清理。
+        """
+        info = {
+            'categories': list(results),
+            'cancelled': self.last_scan_cancelled,
+            'truncated': self.last_scan_truncated
+        }
+        try:
+            count = save_snapshot(path, results, info)
+        except Exception as e:
+            logger.error(f"保存扫描结果失败: {e}")
+            return None
+        logger.info(f"已保存扫描结果: {path}，共 {count} 个项目")
+        return count
 
-        for update_dir in update_temp_dirs:
-            if os.path.exists(update_dir) and self._is_safe_path(update_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(update_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['update_temp'].append({
-                            'path': update_dir,
-                            'size': total_size,
-                            'type': 'update_temp'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问更新临时文件目录 {update_dir}: {e}")
-
-    def _scan_driver_backup(self, results):
-        """扫描驱动备份"""
-        # 驱动备份目录
-        driver_backup_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'inf', 'OLD'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'DriverStore', 'Temp')
-        ]
+    def import_scan(self, path):
+        """载入扫描结果快照，返回 {类别: 项目列表}，文件无效或不完整时返回None
 
-        for driver_dir in driver_backup_dirs:
-            if os.path.exists(driver_dir) and self._is_safe_path(driver_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(driver_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['driver_backup'].append({
-                            'path': driver_dir,
-                            'size': total_size,
-                            'type': 'driver_backup'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问驱动备份目录 {driver_dir}: {e}")
-
-    def _scan_app_crash(self, results):
-        """扫描应用程序崩溃转储"""
-        # 应用程序崩溃转储目录
-        app_crash_dirs = [
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Windows', 'WER', 'ReportArchive'),
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Windows', 'WER', 'ReportQueue'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'CrashDumps'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'WER', 'ReportArchive'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'WER', 'ReportQueue')
-        ]
+        扫描时的取消、部分结果状态一并恢复到last_scan_cancelled、last_scan_truncated；
+        清理前仍按当前的路径策略逐项检查安全性。
+        """
+        try:
+            header, results = load_snapshot(path)
+        except (OSError, ValueError) as e:
+            logger.error(f"载入扫描结果失败: {e}")
+            return None
+        self.last_scan_cancelled = bool(header.get('cancelled', False))
+        self.last_scan_truncated = list(header.get('truncated', []))
+        self.last_scan_report = None
+        created = header.get('created')
+        scanned_at = (datetime.datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M:%S')
+                      if isinstance(created, (int, float)) else '未知时间')
+        logger.info(f"已载入扫描结果: {path}，扫描于 {scanned_at}")
+        return results
 
-        for crash_dir in app_crash_dirs:
-            if os.path.exists(crash_dir) and self._is_safe_path(crash_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(crash_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['app_crash'].append({
-                            'path': crash_dir,
-                            'size': total_size,
-                            'type': 'app_crash'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问应用程序崩溃转储目录 {crash_dir}: {e}")
-
-    def _scan_app_logs(self, results):
-        """扫描应用程序日志"""
-        # 常见应用程序日志目录
-        app_log_dirs = [
-            os.path.join(os.environ.get('APPDATA', ''), 'Microsoft', 'Teams', 'logs.txt'),
-            os.path.join(os.environ.get('APPDATA', ''), 'Microsoft', 'Teams', 'logs'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Office', '*.log'),
-            os.path.join(os.environ.get('APPDATA', ''), 'Slack', 'logs'),
-            os.path.join(os.environ.get('APPDATA', ''), 'discord', 'logs')
-        ]
+    def start_watch(self, callback=None, backend=None):
+        """启动后台监视模式，实时维护各类别可清理空间的合计（见watcher）
+
+        初始遍历在后台线程中进行；callback（如pyqtSignal）不为空时，初始遍历完成
+        及之后每次合计变化时 emit({类别: {'size': 字节数, 'count': 文件数}})。
+        backend为变化来源，None时按平台选择。修改排除项后需要重新启动才生效。
+        """
+        self.stop_watch()
+        if backend is None:
+            backend = default_backend(self.options.get('watch_interval', POLL_INTERVAL))
+        self.watcher = Watcher(self._watch_roots(), backend, self.path_policy, callback)
+        self.watcher.start()
+        logger.info(f"已启动后台监视（{backend.name}），监视 {len(self.watcher.roots)} 个目录")
+        return self.watcher
+
+    def stop_watch(self):
+        """停止后台监视"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            logger.info("已停止后台监视")
+
+    def get_watch_totals(self):
+        """监视模式下各类别当前的合计，未启动监视时返回None"""
+        if self.watcher is None:
+            return None
+        return self.watcher.totals()
+
+    def _watch_roots(self):
+        """监视模式的根目录：与扫描相同的规则、安全检查和按真实路径的归属
+
+        大文件只保留最大的前K个，不是可以累加的合计，不监视；监视时不受快速扫描的
+        目录层数和最小文件大小限制。
+        """
+        now = time.time()
+        rules = [rule for rule in enabled_rules() if not rule.planner]
+        expansions = self.glob_planner.expand([pattern for rule in rules for pattern in rule.patterns()])
+        roots = {}  # 比较键 -> WatchRoot
+
+        def add(path, category, accept, recursive):
+            real, key = canonical_path(path)
+            if not (self._is_safe_path(real) if recursive else self.path_policy.allows_files(real)):
+                return
+            root = roots.get(key)
+            if root is None:
+                root = roots[key] = WatchRoot(real)
+            elif recursive and root.recursive:
+                return  # 与扫描时一样，同一目录只归属最先登记的规则
+            root.add(category, accept, recursive)
+
+        for rule in rules:
+            make_item = self._rule_item_factory(rule, now)
+            accept = None if make_item is None else (lambda entry, make_item=make_item: make_item(entry) is not None)
+            for template in rule.paths:
+                path = expand_path(template)
+                if path is None:
+                    continue
+                parent, pattern = os.path.split(path)
+                if glob.has_magic(pattern) and not glob.has_magic(parent):
+                    # 只有最后一部分含通配符（如 thumbcache_*.db）：之后新建的匹配文件也计入
+                    add(parent, rule.category, name_filter(pattern, accept), False)
+                    continue
+                for match in (expansions.get(path, []) if glob.has_magic(path) else [path]):
+                    if not self._is_safe_path(match):
+                        continue
+                    st = stat_path(match)
+                    if st is None:
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        add(match, rule.category, accept if rule.item == ITEM_FILES else None, True)
+                    elif stat.S_ISREG(st.st_mode) and rule.item != ITEM_DIR_TOTAL:
+                        add(os.path.dirname(match), rule.category,
+                            name_filter(os.path.basename(match), accept), False)
+        return list(roots.values())
+
+    def _scan_budgets(self, rules):
+        """按规则名称整理时间预算，未设置预算的规则不限时"""
+        default = self.options.get('scan_time_budget')
+        overrides = self.options.get('scanner_time_budgets') or {}
+        budgets = {}
+        for rule in rules:
+            budget = overrides.get(rule.name, default)
+            if budget is not None:
+                budgets[rule.name] = budget
+        return budgets
+
+    def _scan_limits(self):
+        """按扫描配置档和覆盖选项返回 (目录层数限制, 最小文件大小)"""
+        profile = SCAN_PROFILES.get(self.options.get('scan_profile'), SCAN_PROFILES['full'])
+        max_depth = self.options.get('scan_depth')
+        if max_depth is None:
+            max_depth = profile['scan_depth']
+        min_size = self.options.get('min_file_size')
+        if min_size is None:
+            min_size = profile['min_file_size']
+        return max_depth, min_size
+
+    def _open_scan_history(self):
+        """加载以往的扫描耗时记录，未启用时返回None（按规划顺序扫描）"""
+        if not self.options.get('scan_history'):
+            return None
+        return ScanHistory()
+
+    def _open_scan_index(self):
+        """打开持久化扫描索引，未启用或打开失败时返回None（退回完整扫描）"""
+        if not self.options.get('scan_index'):
+            return None
+        try:
+            return ScanIndex()
+        except Exception as e:
+            logger.warning(f"无法打开扫描索引，将进行完整扫描: {e}")
+            return None
 
-        # 超过30天的日志文件
-        old_threshold = datetime.datetime.now() - datetime.timedelta(days=30)
+    def clear_scan_index(self):
+        """清空扫描索引，下次扫描重新枚举所有目录"""
+        try:
+            index = ScanIndex()
+            index.clear()
+            index.close()
+            return True
+        except Exception as e:
+            logger.error(f"清空扫描索引失败: {e}")
+            return False
 
-        for log_dir in app_log_dirs:
-            # 处理通配符模式
-            if '*' in log_dir:
-                try:
-                    for matched_path in glob.glob(log_dir):
-                        if os.path.exists(matched_path) and self._is_safe_path(matched_path):
-                            try:
-                                if os.path.isfile(matched_path):
-                                    # 检查是否是旧文件
-                                    mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(matched_path))
-                                    if mod_time < old_threshold:
-                                        file_size = os.path.getsize(matched_path)
-                                        if file_size > 0:
-                                            results['app_logs'].append({
-                                                'path': matched_path,
-                                                'size': file_size,
-                                                'type': 'app_logs'
-                                            })
-                            except (PermissionError, FileNotFoundError) as e:
-                                logger.warning(f"无法访问应用程序日志文件 {matched_path}: {e}")
-                except Exception as e:
-                    logger.warning(f"处理通配符模式时出错 {log_dir}: {e}")
+    def _expand_patterns(self, rules, engine):
+        """一次展开所有规则中的通配符路径，同一父目录只枚举一次"""
+        start = time.perf_counter()
+        before = engine.stats.copy()
+        patterns = [pattern for rule in rules for pattern in rule.patterns()]
+        expansions = self.glob_planner.expand(patterns, engine.stats)
+        scanner_stats = engine.scanner('glob_planner')
+        scanner_stats.planning_time = time.perf_counter() - start
+        scanner_stats.add_walk(engine.stats.delta(before))
+        return expansions
+
+    def _plan_rule(self, rule, results, engine, now, expansions=None):
+        """按声明式规则登记扫描：每个路径只stat一次，文件直接计入，目录交给遍历引擎
+
+        路径解析为真实路径后向引擎登记（engine.claim），与本规则或其他规则
+        已登记的路径相同时跳过，同一位置不会出现在两个结果中。
+        """
+        make_item = self._rule_item_factory(rule, now)
+        for path in rule.expand_paths(expansions):
+            if not self._is_safe_path(path):
                 continue
-
-            # 处理普通目录
-            if os.path.exists(log_dir) and self._is_safe_path(log_dir):
-                try:
-                    if os.path.isfile(log_dir):
-                        # 如果是文件
-                        mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(log_dir))
-                        if mod_time < old_threshold:
-                            file_size = os.path.getsize(log_dir)
-                            if file_size > 0:
-                                results['app_logs'].append({
-                                    'path': log_dir,
-                                    'size': file_size,
-                                    'type': 'app_logs'
-                                })
-                    else:
-                        # 如果是目录
-                        for root, _, files in os.walk(log_dir):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        # 检查是否是旧文件
-                                        mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                                        if mod_time < old_threshold:
-                                            file_size = os.path.getsize(file_path)
-                                            results['app_logs'].append({
-                                                'path': file_path,
-                                                'size': file_size,
-                                                'type': 'app_logs'
-                                            })
-                                except (PermissionError, FileNotFoundError):
-                                    pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问应用程序日志 {log_dir}: {e}")
-
-    def _scan_recent_items(self, results):
-        """扫描最近使用的文件列表缓存"""
-        # 最近使用的文件列表缓存目录
-        recent_dirs = [
-            os.path.join(os.environ.get('APPDATA', ''), 'Microsoft', 'Windows', 'Recent'),
-            os.path.join(os.environ.get('APPDATA', ''), 'Microsoft', 'Office', 'Recent')
-        ]
-
-        for recent_dir in recent_dirs:
-            if os.path.exists(recent_dir) and self._is_safe_path(recent_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(recent_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['recent_items'].append({
-                            'path': recent_dir,
-                            'size': total_size,
-                            'type': 'recent_items'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问最近使用的文件列表缓存 {recent_dir}: {e}")
-
-    def _scan_notification_cache(self, results):
-        """扫描Windows通知缓存"""
-        # Windows通知缓存目录
-        notification_dirs = [
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'Notifications'),
-            os.path.join('C:', os.sep, 'Users', os.environ.get('USERNAME', ''), 'AppData', 'Local', 'Microsoft', 'Windows', 'ActionCenterCache')
-        ]
-
-        for notification_dir in notification_dirs:
-            if os.path.exists(notification_dir) and self._is_safe_path(notification_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(notification_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['notification'].append({
-                            'path': notification_dir,
-                            'size': total_size,
-                            'type': 'notification'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问Windows通知缓存 {notification_dir}: {e}")
-
-    def _scan_dns_cache(self, results):
-        """扫描DNS缓存"""
-        # DNS缓存目录
-        dns_cache_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'dnsrslvr.log'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'dns', 'cache.dns')
-        ]
-
-        for dns_dir in dns_cache_dirs:
-            if os.path.exists(dns_dir) and self._is_safe_path(dns_dir):
-                try:
-                    if os.path.isfile(dns_dir):
-                        file_size = os.path.getsize(dns_dir)
-                        if file_size > 0:
-                            results['dns_cache'].append({
-                                'path': dns_dir,
-                                'size': file_size,
-                                'type': 'dns_cache'
-                            })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问DNS缓存 {dns_dir}: {e}")
-
-    def _scan_network_cache(self, results):
-        """扫描网络缓存"""
-        # 网络缓存目录
-        network_cache_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'drivers', 'etc', 'hosts.ics'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'drivers', 'etc', 'networks'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'wbem', 'Repository', 'FS', 'INDEX.BTR')
-        ]
-
-        for network_dir in network_cache_dirs:
-            if os.path.exists(network_dir) and self._is_safe_path(network_dir):
-                try:
-                    if os.path.isfile(network_dir):
-                        file_size = os.path.getsize(network_dir)
-                        if file_size > 0:
-                            results['network_cache'].append({
-                                'path': network_dir,
-                                'size': file_size,
-                                'type': 'network_cache'
-                            })
-                    else:
-                        total_size = 0
-                        for root, _, files in os.walk(network_dir):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        file_size = os.path.getsize(file_path)
-                                        total_size += file_size
-                                except (PermissionError, FileNotFoundError):
-                                    pass
-
-                        if total_size > 0:
-                            results['network_cache'].append({
-                                'path': network_dir,
-                                'size': total_size,
-                                'type': 'network_cache'
-                            })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问网络缓存 {network_dir}: {e}")
-
-    def _scan_printer_temp(self, results):
-        """扫描打印机临时文件"""
-        # 打印机临时文件目录
-        printer_temp_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'spool', 'PRINTERS'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'spool', 'SERVERS'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'spool', 'drivers', 'color')
-        ]
-
-        for printer_dir in printer_temp_dirs:
-            if os.path.exists(printer_dir) and self._is_safe_path(printer_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(printer_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['printer_temp'].append({
-                            'path': printer_dir,
-                            'size': total_size,
-                            'type': 'printer_temp'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问打印机临时文件目录 {printer_dir}: {e}")
-
-    def _scan_device_temp(self, results):
-        """扫描设备临时文件"""
-        # 设备临时文件目录
-        device_temp_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'INF', 'setupapi.dev.log'),
-            os.path.join('C:', os.sep, 'Windows', 'INF', 'setupapi.log'),
-            os.path.join('C:', os.sep, 'Windows', 'System32', 'LogFiles', 'setupapi')
-        ]
-
-        for device_dir in device_temp_dirs:
-            if os.path.exists(device_dir) and self._is_safe_path(device_dir):
-                try:
-                    if os.path.isfile(device_dir):
-                        file_size = os.path.getsize(device_dir)
-                        if file_size > 0:
-                            results['device_temp'].append({
-                                'path': device_dir,
-                                'size': file_size,
-                                'type': 'device_temp'
-                            })
-                    else:
-                        total_size = 0
-                        for root, _, files in os.walk(device_dir):
-                            for file in files:
-                                try:
-                                    file_path = os.path.join(root, file)
-                                    if os.path.isfile(file_path):
-                                        file_size = os.path.getsize(file_path)
-                                        total_size += file_size
-                                except (PermissionError, FileNotFoundError):
-                                    pass
-
-                        if total_size > 0:
-                            results['device_temp'].append({
-                                'path': device_dir,
-                                'size': total_size,
-                                'type': 'device_temp'
-                            })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问设备临时文件目录 {device_dir}: {e}")
-
-    def _scan_windows_defender(self, results):
-        """扫描Windows Defender缓存"""
-        # Windows Defender缓存目录
-        defender_dirs = [
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Windows Defender', 'Scans', 'History'),
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Windows Defender', 'Quarantine'),
-            os.path.join('C:', os.sep, 'ProgramData', 'Microsoft', 'Windows Defender', 'Support')
-        ]
-
-        for defender_dir in defender_dirs:
-            if os.path.exists(defender_dir) and self._is_safe_path(defender_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(defender_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['windows_defender'].append({
-                            'path': defender_dir,
-                            'size': total_size,
-                            'type': 'windows_defender'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问Windows Defender缓存目录 {defender_dir}: {e}")
-
-    def _scan_store_cache(self, results):
-        """扫描Windows Store缓存"""
-        # Windows Store缓存目录
-        store_cache_dirs = [
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Packages', 'Microsoft.WindowsStore_8wekyb3d8bbwe', 'LocalCache'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Packages', 'Microsoft.WindowsStore_8wekyb3d8bbwe', 'LocalState'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Packages', 'Microsoft.WindowsStore_8wekyb3d8bbwe', 'TempState')
-        ]
-
-        for store_dir in store_cache_dirs:
-            if os.path.exists(store_dir) and self._is_safe_path(store_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(store_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['store_cache'].append({
-                            'path': store_dir,
-                            'size': total_size,
-                            'type': 'store_cache'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问Windows Store缓存目录 {store_dir}: {e}")
-
-    def _scan_onedrive_cache(self, results):
-        """扫描OneDrive缓存"""
-        # OneDrive缓存目录
-        onedrive_cache_dirs = [
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'OneDrive', 'logs'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'OneDrive', 'settings', 'Personal', 'logs')
-        ]
-
-        for onedrive_dir in onedrive_cache_dirs:
-            if os.path.exists(onedrive_dir) and self._is_safe_path(onedrive_dir):
-                try:
-                    total_size = 0
-                    for root, _, files in os.walk(onedrive_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['onedrive_cache'].append({
-                            'path': onedrive_dir,
-                            'size': total_size,
-                            'type': 'onedrive_cache'
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问OneDrive缓存目录 {onedrive_dir}: {e}")
-
-    def _scan_downloads_immediate(self, results):
-        """扫描下载文件夹(立即清理)"""
-        # 获取当前用户的下载文件夹
-        download_dirs = [
-            os.path.join('C:', os.sep, 'Users', os.environ.get('USERNAME', ''), 'Downloads'),
-            os.path.join(os.path.expanduser('~'), 'Downloads')
-        ]
-
-        for download_dir in download_dirs:
-            if os.path.exists(download_dir) and self._is_safe_path(download_dir):
-                try:
-                    total_size = 0
-                    file_count = 0
-
-                    for root, _, files in os.walk(download_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    total_size += file_size
-                                    file_count += 1
-                            except (PermissionError, FileNotFoundError):
-                                pass
-
-                    if total_size > 0:
-                        results['downloads'].append({
-                            'path': download_dir,
-                            'size': total_size,
-                            'type': 'downloads',
-                            'file_count': file_count
-                        })
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问下载文件夹 {download_dir}: {e}")
-
-    def _scan_installer_cache_safe(self, results):
-        """扫描安装程序缓存(安全版)"""
-        # 安装程序缓存目录
-        installer_cache_dirs = [
-            os.path.join('C:', os.sep, 'Windows', 'Installer', 'Temp'),
-            os.path.join('C:', os.sep, 'ProgramData', 'Package Cache', 'Temp'),
-            os.path.join('C:', os.sep, 'Windows', 'Downloaded Program Files', 'Temp'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Package Cache'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Temp', 'Downloaded Installations')
-        ]
-
-        # 安全可清理的文件类型
-        safe_extensions = ['.tmp', '.temp', '.msi.cache', '.exe.cache', '.log', '.old']
-
-        # 超过30天的安装程序缓存
-        very_old_threshold = datetime.datetime.now() - datetime.timedelta(days=30)  # 30天前的文件
-
-        for installer_dir in installer_cache_dirs:
-            if os.path.exists(installer_dir) and self._is_safe_path(installer_dir):
-                try:
-                    for root, _, files in os.walk(installer_dir):
-                        for file in files:
-                            try:
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    # 检查是否是安全可清理的文件
-                                    is_safe_temp = any(file.lower().endswith(ext) for ext in safe_extensions)
-
-                                    # 检查是否是超过365天的文件
-                                    is_very_old = False
-                                    if not is_safe_temp:  # 如果不是安全的临时文件，检查是否非常旧
-                                        mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                                        is_very_old = mod_time < very_old_threshold
-
-                                    if is_safe_temp or is_very_old:
-                                        file_size = os.path.getsize(file_path)
-                                        file_type = "temp_installer" if is_safe_temp else "very_old_installer"
-                                        results['installer_cache'].append({
-                                            'path': file_path,
-                                            'size': file_size,
-                                            'type': 'installer_cache',
-                                            'subtype': file_type
-                                        })
-                            except (PermissionError, FileNotFoundError):
-                                pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法访问安装程序缓存目录 {installer_dir}: {e}")
-
-        # 特殊处理Windows Installer目录
-        windows_installer = os.path.join('C:', os.sep, 'Windows', 'Installer')
-        if os.path.exists(windows_installer) and self._is_safe_path(windows_installer):
+            st = stat_path(path, engine.stats)
+            if st is None:
+                continue
+            real = engine.claim(path, rule.name, is_file=not stat.S_ISDIR(st.st_mode))
+            # 经由符号链接或目录联接指向受保护位置的路径同样跳过
+            if real is None or not self._is_safe_path(real):
+                continue
+            path = real
+            if stat.S_ISDIR(st.st_mode):
+                if rule.item == ITEM_FILES:
+                    self._add_file_walk(engine, results, rule.category, path, rule.name, make_item)
+                else:
+                    self._add_dir_total(engine, results, rule.category, path, rule.name,
+                                        count_files=rule.count_files, st=st)
+            elif stat.S_ISREG(st.st_mode) and rule.item != ITEM_DIR_TOTAL and st.st_size >= engine.min_size:
+                # 与遍历到的文件相同，只按最小文件大小过滤（full配置下0字节的文件同样列出）
+                entry = FileEntry(path, os.path.basename(path), st.st_size, st.st_mtime, st.st_ino)
+                if make_item is None:
+                    results[rule.category].append(ScanItem(path, entry.size, rule.category, entry.mtime,
+                                                           ino=entry.ino))
+                else:
+                    item = make_item(entry)
+                    if item is not None:
+                        results[rule.category].append(item)
+
+    def _rule_item_factory(self, rule, now):
+        """生成规则的逐文件判断函数，规则不需要逐文件判断时返回None"""
+        if not rule.filtered:
+            return None
+        category = rule.category
+        file_type = rule.file_type
+        threshold = now - rule.min_age_days * 86400 if rule.min_age_days is not None else None
+        if isinstance(rule.subtype, tuple):
+            type_subtype, age_subtype = rule.subtype
+        else:
+            type_subtype = age_subtype = rule.subtype
+        tags = self.file_types.tags
+
+        def make_item(entry):
+            # 文件类型和文件年龄满足任一条件即可
+            if file_type is None and threshold is None:
+                subtype = type_subtype
+            elif file_type is not None and file_type in tags(entry):
+                subtype = type_subtype
+            elif threshold is not None and entry.mtime < threshold:
+                subtype = age_subtype
+            else:
+                return None
+            return ScanItem(entry.path, entry.size, category, entry.mtime, subtype=subtype, ino=entry.ino)
+
+        return make_item
+
+    def _add_dir_total(self, engine, results, category, dir_path, scanner, count_files=False, st=None):
+        """登记一个按目录汇总大小的项目，遍历结束后总大小大于0才加入结果
+
+        目录大小由遍历引擎在遍历时累计（rule.size），不逐文件回调；
+        其中嵌套的其他规则根目录归属那些规则，不计入这里；清理时删除的却是整个子树，
+        完整遍历过的子树的实际大小（见DirSizes）另外记为tree_size。st为目录的stat结果，
+        其修改时间和文件ID随项目记录，清理前据此判断目录是否变化。
+        """
+        done = results.new_part(category)
+
+        def on_finish():
+            items = []
             try:
-                # 查找安全可清理的文件
-                for root, _, files in os.walk(windows_installer):
-                    for file in files:
-                        try:
-                            if file.lower().endswith(('.msp.cache', '.msi.cache', '.tmp', '.temp')):
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    results['installer_cache'].append({
-                                        'path': file_path,
-                                        'size': file_size,
-                                        'type': 'installer_cache',
-                                        'subtype': 'windows_installer_cache'
-                                    })
-                        except (PermissionError, FileNotFoundError):
-                            pass
-            except (PermissionError, FileNotFoundError) as e:
-                logger.warning(f"无法访问Windows Installer目录 {windows_installer}: {e}")
-
-    def _scan_large_files(self, results):
-        """扫描C盘中的大文件"""
-        # 大文件的最小大小（100MB）
-        min_size = 100 * 1024 * 1024
+                size, file_count = rule.size, rule.file_count
+                if size > 0:
+                    # 受目录层数限制未遍历完整的目录，大小只是部分统计
+                    partial = rule.max_depth is not None and not rule.complete
+                    totals = engine.sizes.get(dir_path)
+                    items.append(ScanItem(
+                        dir_path, size, category,
+                        st.st_mtime if st is not None else 0,
+                        file_count=file_count if count_files else None,
+                        truncated=rule.truncated or partial,
+                        ino=st.st_ino if st is not None else 0,
+                        tree_size=totals[0] if totals is not None and totals[2] else None
+                    ))
+                if rule.truncated:
+                    results.mark_truncated(category)
+            finally:
+                done(items)
+
+        rule = engine.add_rule(scanner, dir_path, None, on_finish)
+
+    def _add_file_walk(self, engine, results, category, dir_path, scanner, make_item=None, prune=None):
+        """登记一个逐文件收集的目录，make_item返回None表示本规则不收集该文件（交给外层目录的规则）"""
+        items = []
+        done = results.new_part(category)
+
+        def on_file(entry):
+            if make_item is None:
+                items.append(ScanItem(entry.path, entry.size, category, entry.mtime, ino=entry.ino))
+            else:
+                item = make_item(entry)
+                if item is None:
+                    return False    # 不满足本规则的条件，交给外层目录的规则
+                items.append(item)
+
+        def on_finish():
+            if rule.truncated:
+                results.mark_truncated(category)
+            done(items)
+
+        rule = engine.add_rule(scanner, dir_path, on_file, on_finish, prune)
+
+    def _scan_large_files(self, results, engine):
+        """扫描C盘中的大文件
+
+        每个根目录维护一个大小为K的最小堆，内存和开销与大文件总数无关；
+        修改时间等展示字段由ScanItem在显示时生成。
+        """
+        # 大文件的最小大小（默认100MB）和保留数量（默认100个）
+        min_size = self.options.get('large_file_min_size', DEFAULT_CONFIG['large_file_min_size'])
+        top_k = self.options.get('large_file_top_k', DEFAULT_CONFIG['large_file_top_k'])
 
         # 要扫描的目录
         scan_dirs = [
@@ -1662,68 +889,83 @@ class CleanerLogic:
             'C:\\$Recycle.Bin'
         ]
 
-        # 要排除的文件类型
-        exclude_extensions = [
-            '.sys', '.dll', '.exe', '.msi', '.mui', '.idx', '.cat', '.db'
-        ]
+        # 要排除的文件类型见 config.LARGE_FILE_EXCLUDED_TYPES
+
+        # 每个根目录一个最小堆，元素为 (大小, -根目录序号, -发现序号, 路径, 修改时间, 文件ID)，
+        # 大小相同时先发现的优先，与各遍历组的完成顺序无关；
+        # 各根目录分别在自己的遍历线程中更新，互不加锁
+        heaps = []
+
+        def make_on_file():
+            heap = []
+            heaps.append(heap)
+            root_order = -len(heaps)
+            order = itertools.count()
+
+            def on_file(entry):
+                size = entry.size
+                if size < min_size or top_k <= 0:
+                    return
+                # 堆已满且不大于堆中最小的文件时直接跳过
+                if len(heap) >= top_k and size <= heap[0][0]:
+                    return
+                # 跳过排除的文件类型（排除的目录和不安全的目录由路径策略按目录跳过）
+                if 'large_file_excluded' in self.file_types.tags(entry):
+                    return
+                record = (size, root_order, -next(order), entry.path, entry.mtime, entry.ino)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, record)
+                else:
+                    heapq.heappushpop(heap, record)
+
+            return on_file
+
+        def make_item(record):
+            size, _, _, path, mtime, ino = record
+            # 修改时间和文件类型在显示时由ScanItem生成
+            return ScanItem(path, size, 'large_files', mtime, ino=ino)
+
+        def on_finish():
+            # 合并各根目录的堆，按文件大小降序保留前K个，添加到结果中
+            largest = heapq.nlargest(top_k, itertools.chain.from_iterable(heaps))
+            if any(rule.truncated for rule in rules):
+                results.mark_truncated('large_files')
+            done([make_item(record) for record in largest])
 
-        # 大文件列表
-        large_files = []
+            logger.info(f"找到 {len(largest)} 个大文件")
 
-        # 扫描指定目录
+        # 跳过排除的目录：与安全路径一起编译成路径策略，整个子树都不进入
+        policy = self.path_policy.derive(deny=exclude_dirs)
+
+        # 扫描指定目录，所有目录遍历完成后统一汇总
+        done = results.new_part('large_files')
+        # 大文件是前K个的视图而不是按类别汇总的大小：嵌套在这些目录中的其他类别的
+        # 目录（下载、临时文件、浏览器缓存等）中的大文件同样列出，规则不参与归属
+        rules = []
         for scan_dir in scan_dirs:
             if os.path.exists(scan_dir) and self._is_safe_path(scan_dir):
-                try:
-                    for root, dirs, files in os.walk(scan_dir):
-                        # 跳过排除的目录
-                        dirs[:] = [d for d in dirs if os.path.join(root, d) not in exclude_dirs]
+                real = engine.claim(scan_dir, 'large_files')
+                if real is not None:
+                    rules.append(engine.add_rule('large_files', real, make_on_file(), policy=policy, shared=True))
 
-                        for file in files:
-                            try:
-                                # 跳过排除的文件类型
-                                if any(file.lower().endswith(ext) for ext in exclude_extensions):
-                                    continue
-
-                                file_path = os.path.join(root, file)
-                                if os.path.isfile(file_path) and self._is_safe_path(file_path):
-                                    file_size = os.path.getsize(file_path)
-                                    if file_size >= min_size:
-                                        # 获取文件修改时间
-                                        mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                                        # 获取文件类型
-                                        _, ext = os.path.splitext(file_path)
-
-                                        large_files.append({
-                                            'path': file_path,
-                                            'size': file_size,
-                                            'type': 'large_files',
-                                            'modified': mod_time.strftime('%Y-%m-%d %H:%M:%S'),
-                                            'extension': ext.lower() if ext else ''
-                                        })
-                            except (PermissionError, FileNotFoundError):
-                                pass
-                except (PermissionError, FileNotFoundError) as e:
-                    logger.warning(f"无法扫描目录 {scan_dir}: {e}")
-
-        # 按文件大小降序排序
-        large_files.sort(key=lambda x: x['size'], reverse=True)
-
-        # 只保留前100个最大的文件
-        large_files = large_files[:100]
-
-        # 添加到结果中
-        results['large_files'].extend(large_files)
-
-        logger.info(f"找到 {len(large_files)} 个大文件")
+        engine.add_finisher('large_files', on_finish, rules)
 
     def clean_selected(self, items, progress_callback=None):
-        """清理选中的项目"""
+        """清理选中的项目（ScanItem，或同样键名的字典）
+
+        清理前先批量stat一遍，与扫描时记录的 (大小, 修改时间, 文件ID) 比较（见
+        ScanItem.matches）：已不存在的项目跳过；有变化的文件按当前大小计算，有变化
+        的目录重新统计；未变化的目录在模拟模式下直接使用扫描时统计的子树大小
+        （ScanItem.tree_size，含嵌套的其他类别），不再遍历。
+        """
         logger.info(f"开始清理 {len(items)} 个项目")
 
         results = {
             'cleaned_items': [],
             'errors': [],
-            'freed_space': 0
+            'freed_space': 0,
+            'skipped_items': [],    # 扫描后已不存在（或无法访问）的项目
+            'changed_items': []     # 扫描后有变化、按当前状态重新计算的项目
         }
 
         # 创建当前备份目录
@@ -1737,15 +979,25 @@ class CleanerLogic:
             # 清理旧备份
             self.clean_old_backups()
 
+        covered = self._covered_items(items)
+        states = self._item_states(items, covered)
+        backup_dir = current_backup_dir if self.options['backup'] else None
+
         for i, item in enumerate(items):
             try:
-                path = item['path']
-                item_type = item.get('type', 'unknown')
+                item = as_scan_item(item)
+                path = item.path
+                item_type = item.type
 
                 # 更新进度
                 if progress_callback:
                     progress_callback.emit(path, i + 1)
 
+                # 已包含在其他选中目录中的项目随该目录一起清理
+                if i in covered:
+                    logger.info(f"跳过已包含在其他选中项目中的路径: {path}")
+                    continue
+
                 # 检查路径安全性
                 if not self._is_safe_path(path):
                     logger.warning(f"跳过不安全路径: {path}")
@@ -1760,22 +1012,33 @@ class CleanerLogic:
                     # 清空回收站
                     if not self.options['simulate']:
                         self._empty_recycle_bin()
-                    results['freed_space'] += item['size']
-                    results['cleaned_items'].append(path)
-                elif os.path.isdir(path):
-                    # 清理目录
-                    freed = self._clean_directory(path, current_backup_dir if self.options['backup'] else None)
-                    results['freed_space'] += freed
-                    results['cleaned_items'].append(path)
-                elif os.path.isfile(path):
-                    # 清理文件
-                    freed = self._clean_file(path, current_backup_dir if self.options['backup'] else None)
-                    results['freed_space'] += freed
+                    results['freed_space'] += item.size
                     results['cleaned_items'].append(path)
+                    continue
 
-                # 模拟模式下，添加项目大小
-                if self.options['simulate']:
-                    results['freed_space'] += item['size']
+                st, unchanged = states[i]
+                if st is None:
+                    logger.info(f"跳过扫描后已不存在的项目: {path}")
+                    results['skipped_items'].append(path)
+                    continue
+                if not unchanged:
+                    logger.info(f"项目在扫描后有变化，按当前状态计算: {path}")
+                    results['changed_items'].append(path)
+
+                if stat.S_ISDIR(st.st_mode):
+                    # 清理目录：有变化时缓存的子树大小也不再可信
+                    if not unchanged:
+                        self.dir_sizes.invalidate(path)
+                    # 项目大小只是本类别独占的部分，删除的却是整个子树，只能使用子树大小
+                    known_size = item.tree_size if unchanged and not item.truncated else None
+                    freed = self._clean_directory(path, backup_dir, known_size)
+                elif stat.S_ISREG(st.st_mode):
+                    # 清理文件：大小取自刚才的stat
+                    freed = self._clean_file(path, backup_dir, st.st_size)
+                else:
+                    continue
+                results['freed_space'] += freed
+                results['cleaned_items'].append(path)
 
             except Exception as e:
                 logger.error(f"清理项目 {item['path']} 时出错: {e}")
@@ -1784,16 +1047,65 @@ class CleanerLogic:
                     'error': str(e)
                 })
 
-        logger.info(f"清理完成，释放空间: {results['freed_space']} 字节，错误: {len(results['errors'])}")
+        logger.info(f"清理完成，释放空间: {results['freed_space']} 字节，错误: {len(results['errors'])}，"
+                    f"已不存在: {len(results['skipped_items'])}，有变化: {len(results['changed_items'])}")
         return results
 
-    def _clean_file(self, file_path, backup_dir=None):
-        """清理单个文件"""
-        try:
-            if not os.path.exists(file_path):
-                return 0
+    @staticmethod
+    def _item_states(items, skip):
+        """清理前的批量校验：每个项目stat一次，返回 {下标: (stat结果, 是否与扫描时一致)}
+
+        不存在或无法访问的项目stat结果为None；回收站项目和skip中的下标不校验。
+        """
+        states = {}
+        for i, item in enumerate(items):
+            if i in skip:
+                continue
+            try:
+                item = as_scan_item(item)
+            except Exception:
+                continue    # 清理时报告错误
+            if item.type == 'recycle':
+                continue
+            st = stat_path(item.path)
+            states[i] = (st, st is not None and item.matches(st))
+        return states
 
-            file_size = os.path.getsize(file_path)
+    @staticmethod
+    def _covered_items(items):
+        """返回与前面的项目重复、或位于其他选中目录之内的项目下标
+
+        路径按真实路径比较（见canonical_path），同一位置的不同写法视为重复。
+        """
+        keys = []
+        for i, item in enumerate(items):
+            try:
+                keys.append((canonical_path(as_scan_item(item).path)[1], i))
+            except Exception:
+                continue
+        covered = set()
+        selected = set()
+        # 按路径排序后，上级目录总在其子路径之前
+        for key, i in sorted(keys):
+            parent = key
+            while True:
+                if parent in selected:
+                    covered.add(i)
+                    break
+                parent, child = os.path.dirname(parent), parent
+                if parent == child:
+                    break
+            if i not in covered:
+                selected.add(key)
+        return covered
+
+    def _clean_file(self, file_path, backup_dir=None, file_size=None):
+        """清理单个文件，file_size为调用方刚stat得到的大小（未给出时重新获取）"""
+        try:
+            if file_size is None:
+                if not os.path.exists(file_path):
+                    return 0
+                file_size = os.path.getsize(file_path)
 
             # 模拟模式下不实际删除
             if self.options['simulate']:
@@ -1862,13 +1174,18 @@ class CleanerLogic:
                 os.remove(file_path)
                 logger.info(f"已直接删除文件: {file_path}")
 
+            self.dir_sizes.invalidate(file_path)
             return file_size
         except Exception as e:
             logger.error(f"清理文件 {file_path} 失败: {e}")
             raise
 
-    def _clean_directory(self, dir_path, backup_dir=None):
-        """清理目录"""
+    def _clean_directory(self, dir_path, backup_dir=None, known_size=None):
+        """清理目录
+
+        known_size为扫描后确认未变化的目录在扫描时统计的子树大小，模拟模式下没有
+        本会话的子树大小缓存时直接使用，不再遍历。
+        """
         try:
             if not os.path.exists(dir_path):
                 return 0
@@ -1878,8 +1195,22 @@ class CleanerLogic:
             # 模拟模式下不实际删除
             if self.options['simulate']:
                 logger.info(f"模拟清理目录: {dir_path}")
-                for root, _, files in os.walk(dir_path):
+                # 扫描时已完整汇总过的目录直接使用其大小，不再遍历
+                # （汇总的是实际大小，有按名称排除的文件时不能直接使用）
+                policy = self.path_policy
+                cached_size = None if policy.filters_names else self.dir_sizes.complete_size(dir_path)
+                if cached_size is None and not policy.filters_names:
+                    cached_size = known_size
+                if cached_size is not None:
+                    return cached_size
+                for root, dirs, files in os.walk(dir_path):
+                    # 受保护和被排除的子目录不会被清理，不计入
+                    dirs[:] = [d for d in dirs if policy.enters(os.path.join(root, d))]
+                    if not policy.allows_files(root):
+                        continue
                     for file in files:
+                        if not policy.allows_file_name(file):
+                            continue
                         try:
                             file_path = os.path.join(root, file)
                             if os.path.isfile(file_path):
@@ -1888,9 +1219,18 @@ class CleanerLogic:
                             pass
                 return total_freed
 
-            # 实际清理目录
-            for root, dirs, files in os.walk(dir_path, topdown=False):
+            # 实际清理目录：受保护和被排除的子目录整个跳过，不枚举；
+            # 其他目录中的文件删除后，再自底向上删除空目录
+            policy = self.path_policy
+            visited = []
+            for root, dirs, files in os.walk(dir_path):
+                dirs[:] = [d for d in dirs if policy.enters(os.path.join(root, d))]
+                visited.append((root, list(dirs)))
+                if not policy.allows_files(root):
+                    continue
                 for file in files:
+                    if not policy.allows_file_name(file):
+                        continue
                     try:
                         file_path = os.path.join(root, file)
 
@@ -1913,7 +1253,8 @@ class CleanerLogic:
                     except (PermissionError, FileNotFoundError) as e:
                         logger.warning(f"删除文件 {os.path.join(root, file)} 失败: {e}")
 
-                # 删除空目录
+            # 删除空目录（先序遍历的逆序中子目录总在上级目录之前）
+            for root, dirs in reversed(visited):
                 for dir_name in dirs:
                     try:
                         dir_to_remove = os.path.join(root, dir_name)
@@ -1923,6 +1264,8 @@ class CleanerLogic:
                     except (PermissionError, FileNotFoundError) as e:
                         logger.warning(f"删除目录 {os.path.join(root, dir_name)} 失败: {e}")
 
+            # 目录内容已变化，缓存的大小失效
+            self.dir_sizes.invalidate(dir_path)
             return total_freed
         except Exception as e:
             logger.error(f"清理目录 {dir_path} 失败: {e}")
@@ -1943,24 +1286,35 @@ class CleanerLogic:
             logger.error(f"清空回收站失败: {e}")
             return False
 
-    def _is_safe_path(self, path):
-        """检查路径是否安全（不在系统关键目录中）"""
-        # 检查路径是否在安全路径列表中
-        for safe_path in self.safe_paths:
-            if path.startswith(safe_path):
-                # 如果是系统目录的子目录，需要特别小心
-                return False
+    def update_path_policy(self):
+        """按safe_paths（整个子树受保护）、system_dirs（只保护目录本身）和用户排除项重新编译路径策略"""
+        policy = PathPolicy(deny=self.safe_paths, deny_exact=self.system_dirs)
+        self._path_policy = self.exclusions.apply(policy)
 
-        # 检查是否是系统目录
-        system_dirs = [
-            os.path.join('C:', os.sep, 'Windows'),
-            os.path.join('C:', os.sep, 'Program Files'),
-            os.path.join('C:', os.sep, 'Program Files (x86)'),
-            os.path.join('C:', os.sep, 'ProgramData')
-        ]
+    def get_exclusions(self):
+        """用户排除项列表"""
+        return list(self.exclusions.patterns)
 
-        for sys_dir in system_dirs:
-            if path == sys_dir:
-                return False
+    def set_exclusions(self, patterns):
+        """替换用户排除项并保存，之后的扫描和清理立即生效"""
+        self.exclusions.replace(patterns)
+        self.update_path_policy()
+        return self.exclusions.save()
+
+    def add_exclusion(self, pattern):
+        """添加一个用户排除项并保存"""
+        if not self.exclusions.add(pattern):
+            return False
+        self.update_path_policy()
+        return self.exclusions.save()
+
+    def remove_exclusion(self, pattern):
+        """删除一个用户排除项并保存"""
+        if not self.exclusions.remove(pattern):
+            return False
+        self.update_path_policy()
+        return self.exclusions.save()
 
-        return True
+    def _is_safe_path(self, path):
+        """检查路径是否安全（不在系统关键目录中，不区分大小写）"""
+        return self.path_policy.allows(path)
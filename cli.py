@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 命令行界面
+
+不加载任何图形界面库（PyQt5、tkinter），适合计划任务和批量部署：
+
+    c-drive-cleaner scan [--jsonl] [--items] [--quick] [--save 扫描结果.jsonl]
+    c-drive-cleaner clean [--categories temp,cache] [--execute] [--no-backup] [--from 扫描结果.jsonl]
+    c-drive-cleaner backups list
+    c-drive-cleaner backups restore <备份名称或路径>
+    c-drive-cleaner backups prune [--max-backups N] [--max-size 字节数]
+    c-drive-cleaner watch [--duration 秒]
+
+结果以JSON输出到标准输出（非ASCII字符转义，不受控制台代码页影响）；
+--jsonl 时每行一个JSON对象，扫描时每个类别完成即输出一行，最后一行为汇总。
+日志仍写入 cleaner.log。
+
+scan --save 把扫描结果保存为快照（见scan_snapshot），clean --from 载入快照直接清理，
+不重新扫描，例如在空闲时段扫描、审阅后再清理。
+
+退出码：0 成功；1 部分操作失败（如清理或恢复出错）；2 参数错误；130 被中断。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INTERRUPTED = 130
+
+
+class _Output:
+    """把结果写到标准输出：JSON模式下汇总为一个对象，JSONL模式下逐行输出"""
+
+    def __init__(self, jsonl, stream=None):
+        self.jsonl = jsonl
+        self.stream = stream or sys.stdout
+
+    def line(self, record):
+        """JSONL模式下立即输出一行"""
+        if self.jsonl:
+            self.stream.write(json.dumps(record, default=str) + '\n')
+            self.stream.flush()
+
+    def result(self, record):
+        """输出最终结果：JSONL模式下为最后一行，否则为缩进的JSON文档"""
+        if self.jsonl:
+            self.line(record)
+        else:
+            self.stream.write(json.dumps(record, indent=2, default=str) + '\n')
+            self.stream.flush()
+
+
+def _category_record(items, with_items):
+    record = {
+        'size': sum(item.size for item in items),
+        'count': len(items)
+    }
+    if with_items:
+        record['items'] = [item.to_dict() for item in items]
+    return record
+
+
+def _parse_categories(value):
+    """逗号分隔的类别列表，未给出时返回None"""
+    if not value:
+        return None
+    return [category.strip() for category in value.split(',') if category.strip()]
+
+
+def _make_cleaner(args):
+    from cleaner_logic import CleanerLogic
+
+    cleaner = CleanerLogic()
+    options = {}
+    if getattr(args, 'backup_dir', None):
+        options['backup_dir'] = args.backup_dir
+    if getattr(args, 'quick', False):
+        options['scan_profile'] = 'quick'
+    if getattr(args, 'no_index', False):
+        options['scan_index'] = False
+    if getattr(args, 'workers', None):
+        options['scan_workers'] = args.workers
+    cleaner.set_options(options)
+    return cleaner
+
+
+def _scan(cleaner, args, output, categories=None):
+    """扫描并在JSONL模式下按类别完成的顺序逐行输出，返回结果字典"""
+    with_items = getattr(args, 'items', False)
+
+    class _Emitter:
+        # scan_system在遍历线程中按类别推送结果
+        @staticmethod
+        def emit(partial):
+            for category, items in partial.items():
+                if categories is None or category in categories:
+                    output.line(dict({'type': 'category', 'category': category}, **_category_record(items, with_items)))
+
+    return cleaner.scan_system(_Emitter if output.jsonl else None)
+
+
+def _scan_summary(cleaner, results, categories, with_items):
+    selected = {category: items for category, items in results.items()
+                if items and (categories is None or category in categories)}
+    summary = {
+        'type': 'summary',
+        'command': 'scan',
+        'total_size': sum(item.size for items in selected.values() for item in items),
+        'item_count': sum(len(items) for items in selected.values()),
+        'cancelled': cleaner.last_scan_cancelled,
+        'truncated': cleaner.last_scan_truncated,
+        'wall_time': round(cleaner.last_scan_report['wall_time'], 3) if cleaner.last_scan_report else None,
+        'categories': {category: _category_record(items, with_items) for category, items in selected.items()}
+    }
+    return summary
+
+
+def cmd_scan(args, output):
+    cleaner = _make_cleaner(args)
+    categories = _parse_categories(args.categories)
+    results = _scan(cleaner, args, output, categories)
+    summary = _scan_summary(cleaner, results, categories, args.items and not output.jsonl)
+    if args.save:
+        if categories is not None:
+            results = {category: items for category, items in results.items() if category in categories}
+        summary['saved'] = cleaner.export_scan(args.save, results)
+    output.result(summary)
+    return EXIT_FAILED if args.save and summary['saved'] is None else EXIT_OK
+
+
+def cmd_clean(args, output):
+    from scan_rules import DEFAULT_SELECTION
+
+    cleaner = _make_cleaner(args)
+    cleaner.set_options({'simulate': not args.execute, 'backup': not args.no_backup})
+    categories = _parse_categories(args.categories)
+    if categories is None:
+        categories = [category for category, selected in DEFAULT_SELECTION.items() if selected]
+
+    if args.snapshot:
+        results = cleaner.import_scan(args.snapshot)
+        if results is None:
+            output.result({'type': 'error', 'command': 'clean', 'error': f"无法载入扫描结果: {args.snapshot}"})
+            return EXIT_FAILED
+    else:
+        results = _scan(cleaner, args, output, categories)
+    items = [item for category in categories for item in results.get(category, [])]
+
+    class _Progress:
+        @staticmethod
+        def emit(path, index):
+            output.line({'type': 'progress', 'path': path, 'index': index, 'total': len(items)})
+
+    cleaned = cleaner.clean_selected(items, _Progress if output.jsonl else None)
+    output.result({
+        'type': 'summary',
+        'command': 'clean',
+        'simulate': not args.execute,
+        'categories': categories,
+        'selected_items': len(items),
+        'cleaned_count': len(cleaned['cleaned_items']),
+        'skipped_count': len(cleaned['skipped_items']),
+        'changed_count': len(cleaned['changed_items']),
+        'freed_space': cleaned['freed_space'],
+        'errors': cleaned['errors'],
+        'scan_cancelled': cleaner.last_scan_cancelled
+    })
+    return EXIT_FAILED if cleaned['errors'] else EXIT_OK
+
+
+def cmd_backups_list(args, output):
+    info = _make_cleaner(args).get_backup_info()
+    for backup in info['backups']:
+        output.line(dict({'type': 'backup'}, **backup))
+    info = dict({'type': 'summary', 'command': 'backups list'}, **info)
+    if output.jsonl:
+        info.pop('backups')
+    output.result(info)
+    return EXIT_OK
+
+
+def cmd_backups_restore(args, output):
+    cleaner = _make_cleaner(args)
+    backup_path = args.backup
+    # 只给出名称时在备份目录中查找
+    if not os.path.isdir(backup_path):
+        backup_path = os.path.join(cleaner.backup_dir, args.backup)
+    ok = cleaner.restore_backup(backup_path)
+    output.result({'type': 'summary', 'command': 'backups restore', 'backup': backup_path, 'restored': ok})
+    return EXIT_OK if ok else EXIT_FAILED
+
+
+def cmd_backups_prune(args, output):
+    cleaner = _make_cleaner(args)
+    options = {}
+    if args.max_backups is not None:
+        options['max_backups'] = args.max_backups
+    if args.max_size is not None:
+        options['max_backup_size'] = args.max_size
+    cleaner.set_options(options)
+    before = cleaner.get_backup_info()
+    ok = cleaner.clean_old_backups()
+    after = cleaner.get_backup_info()
+    remaining = {backup['path'] for backup in after['backups']}
+    output.result({
+        'type': 'summary',
+        'command': 'backups prune',
+        'pruned': ok,
+        'removed': [backup['name'] for backup in before['backups'] if backup['path'] not in remaining],
+        'backup_count': after['backup_count'],
+        'total_size': after['total_size']
+    })
+    return EXIT_OK if ok else EXIT_FAILED
+
+
+def cmd_watch(args, output):
+    """后台监视并逐行输出各类别的合计（总是JSONL），到达--duration或被中断时结束"""
+    cleaner = _make_cleaner(args)
+    if args.interval is not None:
+        cleaner.set_options({'watch_interval': args.interval})
+    output.jsonl = True
+
+    class _Emitter:
+        @staticmethod
+        def emit(totals):
+            output.line({'type': 'totals', 'time': round(time.time(), 3), 'categories': totals,
+                         'total_size': sum(total['size'] for total in totals.values())})
+
+    watcher = cleaner.start_watch(_Emitter)
+    try:
+        deadline = time.monotonic() + args.duration if args.duration is not None else None
+        while watcher.running and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.2)
+    finally:
+        cleaner.stop_watch()
+    if watcher.error is not None:
+        output.line({'type': 'error', 'error': str(watcher.error)})
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def build_parser():
+    # 通用选项写在子命令前后都可以；子命令中未给出时不覆盖写在前面的值
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--jsonl', action='store_true', default=argparse.SUPPRESS,
+                        help="每行输出一个JSON对象（逐个类别/进度输出）")
+    common.add_argument('--backup-dir', default=argparse.SUPPRESS, help="备份目录")
+
+    parser = argparse.ArgumentParser(prog='c-drive-cleaner', description="C盘清理工具（命令行）", parents=[common])
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    def add_parser(commands, name, help):
+        return commands.add_parser(name, help=help, parents=[common])
+
+    def add_scan_options(sub):
+        sub.add_argument('--categories', help="只处理这些类别（逗号分隔）")
+        sub.add_argument('--quick', action='store_true', help="快速扫描：限制目录深度并忽略过小的文件")
+        sub.add_argument('--no-index', action='store_true',
+                         help="不使用持久化扫描索引（结果与完整扫描完全一致，见scan_index）")
+        sub.add_argument('--workers', type=int, help="遍历并发数（默认按磁盘类型自适应）")
+
+    scan = add_parser(subparsers, 'scan', "扫描可清理的文件")
+    add_scan_options(scan)
+    scan.add_argument('--items', action='store_true', help="输出每个可清理项目")
+    scan.add_argument('--save', metavar='FILE', help="把扫描结果保存为快照文件（.gz结尾时压缩），供clean --from使用")
+    scan.set_defaults(handler=cmd_scan)
+
+    clean = add_parser(subparsers, 'clean', "扫描并清理（默认只模拟，不删除文件）")
+    add_scan_options(clean)
+    clean.add_argument('--execute', action='store_true', help="实际删除文件（默认为模拟模式）")
+    clean.add_argument('--no-backup', action='store_true', help="删除前不备份文件")
+    clean.add_argument('--from', dest='snapshot', metavar='FILE', help="清理scan --save保存的扫描结果，不重新扫描")
+    clean.set_defaults(handler=cmd_clean)
+
+    backups = subparsers.add_parser('backups', help="管理清理前的备份")
+    backup_commands = backups.add_subparsers(dest='backup_command', metavar='action')
+    backup_commands.required = True
+    add_parser(backup_commands, 'list', "列出备份").set_defaults(handler=cmd_backups_list)
+    restore = add_parser(backup_commands, 'restore', "恢复一个备份")
+    restore.add_argument('backup', help="备份名称（如 20240101_120000）或路径")
+    restore.set_defaults(handler=cmd_backups_restore)
+    prune = add_parser(backup_commands, 'prune', "按数量和总大小限制删除旧备份")
+    prune.add_argument('--max-backups', type=int, help="最多保留的备份数")
+    prune.add_argument('--max-size', type=int, help="备份总大小上限（字节）")
+    prune.set_defaults(handler=cmd_backups_prune)
+
+    watch = add_parser(subparsers, 'watch', "后台监视，各类别合计变化时输出一行")
+    watch.add_argument('--duration', type=float, help="监视多少秒后退出（默认一直监视直到中断）")
+    watch.add_argument('--interval', type=float, help="轮询目录变化的间隔（秒）")
+    watch.set_defaults(handler=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    import logging
+
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        filename='cleaner.log'
+    )
+    output = _Output(getattr(args, 'jsonl', False))
+    try:
+        return args.handler(args, output)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+
+if __name__ == '__main__':
+    sys.exit(main())
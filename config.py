@@ -32,10 +32,19 @@ DEFAULT_CONFIG = {
     # 高级选项
     "scan_depth": 3,            # 扫描深度（目录层级）
     "min_file_size": 1024,      # 最小文件大小（字节）
+    "large_file_min_size": 104857600, # 大文件扫描的最小文件大小（100MB）
+    "large_file_top_k": 100,    # 大文件扫描只保留最大的前K个文件
     "max_backup_size": 1073741824, # 最大备份大小（1GB）
     "max_backups": 5            # 保留的最大备份数量
 }
 
+# 扫描配置档：scan_depth为遍历的目录层数（根目录为第1层），None表示不限；
+# min_file_size以下的文件不计入扫描结果（按目录汇总的大小仍包含所有文件）
+SCAN_PROFILES = {
+    "full": {"scan_depth": None, "min_file_size": 0},
+    "quick": {"scan_depth": DEFAULT_CONFIG["scan_depth"], "min_file_size": DEFAULT_CONFIG["min_file_size"]}
+}
+
 # 安全路径列表 - 这些路径不会被扫描或清理
 SAFE_PATHS = [
     "C:\\Windows\\System32",
@@ -50,9 +59,17 @@ CLEANABLE_FILE_TYPES = {
     "logs": [".log", ".etl", ".dmp"],
     "cache": [".cache", ".dat"],
     "thumbnails": [".db", ".thumbcache"],
-    "updates": [".cab", ".msu", ".msp"]
+    "updates": [".cab", ".msu", ".msp"],
+    "download_temp": [".tmp", ".temp", ".part", ".crdownload", ".download"],
+    "prefetch": [".pf"],
+    "search_index_temp": [".tmp", ".old", ".bak", ".log"],
+    "installer_temp": [".tmp", ".temp", ".msi.cache", ".exe.cache", ".log", ".old"],
+    "windows_installer_temp": [".msp.cache", ".msi.cache", ".tmp", ".temp"]
 }
 
+# 大文件扫描中排除的文件类型（系统文件、程序文件等）
+LARGE_FILE_EXCLUDED_TYPES = [".sys", ".dll", ".exe", ".msi", ".mui", ".idx", ".cat", ".db"]
+
 # 临时文件路径
 TEMP_PATHS = [
     "%TEMP%",
@@ -83,3 +100,217 @@ WINDOWS_UPDATE_PATHS = [
 THUMBNAIL_CACHE_PATHS = [
     "%LOCALAPPDATA%\\Microsoft\\Windows\\Explorer\\thumbcache_*.db"
 ]
+
+# 回收站路径
+RECYCLE_BIN_PATHS = [
+    "C:\\$Recycle.Bin"
+]
+
+# 预读取文件路径
+PREFETCH_PATHS = [
+    "C:\\Windows\\Prefetch"
+]
+
+# 旧Windows文件路径
+OLD_WINDOWS_PATHS = [
+    "C:\\Windows.old",
+    "C:\\$Windows.~BT",
+    "C:\\$Windows.~WS"
+]
+
+# 错误报告路径
+ERROR_REPORT_PATHS = [
+    "C:\\ProgramData\\Microsoft\\Windows\\WER",
+    "C:\\Users\\%USERNAME%\\AppData\\Local\\Microsoft\\Windows\\WER",
+    "%LOCALAPPDATA%\\Microsoft\\Windows\\WER"
+]
+
+# 服务包备份路径
+SERVICE_PACK_PATHS = [
+    "C:\\Windows\\$NtServicePackUninstall$",
+    "C:\\Windows\\$hf_mig$"
+]
+
+# 休眠文件路径
+HIBERNATION_PATHS = [
+    "C:\\hiberfil.sys"
+]
+
+# 内存转储文件路径
+MEMORY_DUMP_PATHS = [
+    "C:\\Windows\\Minidump",
+    "C:\\Windows\\MEMORY.DMP",
+    "C:\\Windows\\memory.dmp"
+]
+
+# 字体缓存路径
+FONT_CACHE_PATHS = [
+    "C:\\Windows\\ServiceProfiles\\LocalService\\AppData\\Local\\FontCache",
+    "C:\\Windows\\System32\\FNTCACHE.DAT"
+]
+
+# 磁盘清理备份路径
+DISK_CLEANUP_PATHS = [
+    "C:\\Windows\\System32\\LogFiles\\setupapi",
+    "C:\\Windows\\Temp\\CheckSur",
+    "C:\\Windows\\Logs\\CBS"
+]
+
+# 应用程序缓存路径
+APP_CACHE_PATHS = [
+    "%APPDATA%\\Adobe\\Common",
+    "%LOCALAPPDATA%\\Microsoft\\Office\\Recent",
+    "%LOCALAPPDATA%\\Microsoft\\Office\\OTele",
+    "%LOCALAPPDATA%\\Google\\DriveFS",
+    "%LOCALAPPDATA%\\Microsoft\\Teams\\Cache",
+    "%APPDATA%\\Slack\\Cache",
+    "%APPDATA%\\discord\\Cache",
+    "%LOCALAPPDATA%\\Microsoft\\Windows\\INetCache\\IE"
+]
+
+# 媒体播放器缓存路径
+MEDIA_CACHE_PATHS = [
+    "%LOCALAPPDATA%\\Microsoft\\Media Player",
+    "%APPDATA%\\vlc\\art",
+    "%LOCALAPPDATA%\\Spotify\\Storage",
+    "%APPDATA%\\Spotify\\cache",
+    "%LOCALAPPDATA%\\Microsoft\\Windows\\Explorer\\iconcache*"
+]
+
+# 搜索索引临时文件路径
+SEARCH_INDEX_PATHS = [
+    "C:\\ProgramData\\Microsoft\\Search\\Data\\Temp",
+    "C:\\ProgramData\\Microsoft\\Search\\Data\\Applications\\Windows",
+    "C:\\Windows\\ServiceProfiles\\LocalService\\AppData\\Local\\Microsoft\\Windows\\Search"
+]
+
+# 备份临时文件路径
+BACKUP_TEMP_PATHS = [
+    "C:\\Windows\\Temp\\WindowsBackup",
+    "C:\\Windows\\Logs\\WindowsBackup",
+    "%LOCALAPPDATA%\\Microsoft\\Windows\\WindowsBackup"
+]
+
+# 更新临时文件路径
+UPDATE_TEMP_PATHS = [
+    "C:\\Windows\\SoftwareDistribution\\PostRebootEventCache",
+    "C:\\Windows\\SoftwareDistribution\\Temp",
+    "C:\\Windows\\WinSxS\\Temp",
+    "C:\\Windows\\Temp\\TrustedInstaller"
+]
+
+# 驱动备份路径
+DRIVER_BACKUP_PATHS = [
+    "C:\\Windows\\inf\\OLD",
+    "C:\\Windows\\System32\\DriverStore\\Temp"
+]
+
+# 应用程序崩溃转储路径
+APP_CRASH_PATHS = [
+    "C:\\ProgramData\\Microsoft\\Windows\\WER\\ReportArchive",
+    "C:\\ProgramData\\Microsoft\\Windows\\WER\\ReportQueue",
+    "%LOCALAPPDATA%\\CrashDumps",
+    "%LOCALAPPDATA%\\Microsoft\\Windows\\WER\\ReportArchive",
+    "%LOCALAPPDATA%\\Microsoft\\Windows\\WER\\ReportQueue"
+]
+
+# 应用程序日志路径
+APP_LOG_PATHS = [
+    "%APPDATA%\\Microsoft\\Teams\\logs.txt",
+    "%APPDATA%\\Microsoft\\Teams\\logs",
+    "%LOCALAPPDATA%\\Microsoft\\Office\\*.log",
+    "%APPDATA%\\Slack\\logs",
+    "%APPDATA%\\discord\\logs"
+]
+
+# 最近使用的文件列表缓存路径
+RECENT_ITEMS_PATHS = [
+    "%APPDATA%\\Microsoft\\Windows\\Recent",
+    "%APPDATA%\\Microsoft\\Office\\Recent"
+]
+
+# Windows通知缓存路径
+NOTIFICATION_PATHS = [
+    "%LOCALAPPDATA%\\Microsoft\\Windows\\Notifications",
+    "C:\\Users\\%USERNAME%\\AppData\\Local\\Microsoft\\Windows\\ActionCenterCache"
+]
+
+# DNS缓存路径
+DNS_CACHE_PATHS = [
+    "C:\\Windows\\System32\\dnsrslvr.log",
+    "C:\\Windows\\System32\\dns\\cache.dns"
+]
+
+# 网络缓存路径
+NETWORK_CACHE_PATHS = [
+    "C:\\Windows\\System32\\drivers\\etc\\hosts.ics",
+    "C:\\Windows\\System32\\drivers\\etc\\networks",
+    "C:\\Windows\\System32\\wbem\\Repository\\FS\\INDEX.BTR"
+]
+
+# 打印机临时文件路径
+PRINTER_TEMP_PATHS = [
+    "C:\\Windows\\System32\\spool\\PRINTERS",
+    "C:\\Windows\\System32\\spool\\SERVERS",
+    "C:\\Windows\\System32\\spool\\drivers\\color"
+]
+
+# 设备临时文件路径
+DEVICE_TEMP_PATHS = [
+    "C:\\Windows\\INF\\setupapi.dev.log",
+    "C:\\Windows\\INF\\setupapi.log",
+    "C:\\Windows\\System32\\LogFiles\\setupapi"
+]
+
+# Windows Defender缓存路径
+WINDOWS_DEFENDER_PATHS = [
+    "C:\\ProgramData\\Microsoft\\Windows Defender\\Scans\\History",
+    "C:\\ProgramData\\Microsoft\\Windows Defender\\Quarantine",
+    "C:\\ProgramData\\Microsoft\\Windows Defender\\Support"
+]
+
+# Windows Store缓存路径
+STORE_CACHE_PATHS = [
+    "%LOCALAPPDATA%\\Packages\\Microsoft.WindowsStore_8wekyb3d8bbwe\\LocalCache",
+    "%LOCALAPPDATA%\\Packages\\Microsoft.WindowsStore_8wekyb3d8bbwe\\LocalState",
+    "%LOCALAPPDATA%\\Packages\\Microsoft.WindowsStore_8wekyb3d8bbwe\\TempState"
+]
+
+# OneDrive缓存路径
+ONEDRIVE_CACHE_PATHS = [
+    "%LOCALAPPDATA%\\Microsoft\\OneDrive\\logs",
+    "%LOCALAPPDATA%\\Microsoft\\OneDrive\\settings\\Personal\\logs"
+]
+
+# 下载文件夹路径
+DOWNLOADS_PATHS = [
+    "C:\\Users\\%USERNAME%\\Downloads",
+    "~\\Downloads"
+]
+
+# 安装程序缓存路径（按修改时间清理）
+INSTALLER_CACHE_PATHS = [
+    "C:\\Windows\\Installer",
+    "C:\\ProgramData\\Package Cache",
+    "C:\\Windows\\Downloaded Program Files"
+]
+
+# 安装程序缓存路径（安全版，只清理临时文件和旧文件）
+SAFE_INSTALLER_CACHE_PATHS = [
+    "C:\\Windows\\Installer\\Temp",
+    "C:\\ProgramData\\Package Cache\\Temp",
+    "C:\\Windows\\Downloaded Program Files\\Temp",
+    "%LOCALAPPDATA%\\Package Cache",
+    "%LOCALAPPDATA%\\Temp\\Downloaded Installations"
+]
+
+# Windows Installer目录
+WINDOWS_INSTALLER_PATHS = [
+    "C:\\Windows\\Installer"
+]
+
+# Windows传递优化缓存路径
+DELIVERY_OPTIMIZATION_PATHS = [
+    "C:\\Windows\\ServiceProfiles\\NetworkService\\AppData\\Local\\Microsoft\\Windows\\DeliveryOptimization\\Cache",
+    "C:\\Windows\\SoftwareDistribution\\DeliveryOptimization\\Cache"
+]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 用户排除列表
+
+用户可以排除不希望扫描和清理的位置，例如虚拟机镜像、游戏库、源码目录：
+
+- 路径（含路径分隔符，可以使用 %VAR% 和通配符）：
+  D:\\VMs、%USERPROFILE%\\source、C:\\Users\\*\\VirtualBox VMs
+- 名称（不含路径分隔符）：node_modules、.git、*.vhdx，
+  匹配任意位置上的同名目录（整个子树）或文件
+
+排除列表保存在与扫描索引同目录下的 exclusions.json 中。扫描时与安全路径
+一起编译进路径策略（见path_policy），被排除的目录在遍历时直接跳过，
+整个子树都不枚举。
+"""
+
+import os
+import glob
+import json
+import logging
+
+from scan_index import default_index_path
+from scan_rules import expand_path
+
+logger = logging.getLogger('CCleaner')
+
+
+def default_exclusions_path():
+    """默认位置：与扫描索引同目录下的 exclusions.json"""
+    return os.path.join(os.path.dirname(default_index_path()), 'exclusions.json')
+
+
+def is_name_pattern(pattern):
+    """不含路径分隔符的排除项按名称匹配"""
+    return '\\' not in pattern and '/' not in pattern
+
+
+class ExclusionList:
+    """用户排除项列表（按添加顺序保存）"""
+
+    def __init__(self, path=None):
+        self.path = path or default_exclusions_path()
+        self.patterns = []
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.patterns = [pattern for pattern in data.get('patterns', []) if isinstance(pattern, str)]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"无法读取排除列表，将不排除任何位置: {e}")
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'patterns': self.patterns}, f, ensure_ascii=False, indent=2)
+            return True
+        except OSError as e:
+            logger.error(f"保存排除列表失败: {e}")
+            return False
+
+    def add(self, pattern):
+        """添加一个排除项，已存在或为空时返回False"""
+        pattern = pattern.strip()
+        if not pattern or pattern in self.patterns:
+            return False
+        self.patterns.append(pattern)
+        return True
+
+    def remove(self, pattern):
+        """删除一个排除项，不存在时返回False"""
+        if pattern not in self.patterns:
+            return False
+        self.patterns.remove(pattern)
+        return True
+
+    def replace(self, patterns):
+        """用新的排除项替换整个列表（去掉空行和重复项）"""
+        self.patterns = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def split(self):
+        """返回 (展开后的路径列表, 名称列表)；引用了未设置的环境变量的路径忽略"""
+        paths, names = [], []
+        for pattern in self.patterns:
+            if is_name_pattern(pattern):
+                names.append(pattern)
+                continue
+            path = expand_path(pattern)
+            if path is None:
+                logger.warning(f"排除项 {pattern} 中的环境变量未设置，忽略")
+                continue
+            paths.append(path)
+            # 扫描根目录都是解析后的真实路径（见scan_engine.canonical_path），两种写法都排除
+            if not glob.has_magic(path) and os.path.realpath(path) != path:
+                paths.append(os.path.realpath(path))
+        return paths, names
+
+    def apply(self, policy):
+        """返回在policy基础上禁止所有排除项的新路径策略"""
+        paths, names = self.split()
+        return policy.derive(deny=paths, deny_names=names)
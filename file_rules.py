@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 文件类型规则
+
+把各清理类别的扩展名、前缀和通配符规则编译成一个匹配器。扩展名规则放在
+后缀哈希表中：对每个文件名只按其中的各个点号切出后缀查表（如
+"setup.msi.cache" 查 ".cache" 和 ".msi.cache"），开销与规则数量无关。
+前缀规则同样放在哈希表中，按已登记的几种前缀长度切出文件名开头查表。
+少量无法表示为后缀或前缀的通配符规则合并成一个正则表达式，每个文件名只
+匹配一次；只有命中的文件名再用按类型标签分组的正则（每个标签一个可选的
+先行断言分组）一次取出所有命中的标签，不再逐个通配符确认。
+
+匹配不区分大小写（与Windows文件系统一致）。每个文件名只计算一次，结果
+缓存在FileEntry上，供同一文件上生效的所有类别共用。
+"""
+
+import re
+import fnmatch
+
+
+class FileTypeMatcher:
+    """编译后的文件类型匹配器，match(name) 返回文件名命中的类型标签集合"""
+
+    def __init__(self, file_types=None):
+        self._suffix_tags = {} # 小写后缀 -> 类型标签集合（登记用）
+        self._suffixes = {}    # 编译后的后缀表：小写后缀 -> frozenset(类型标签)
+        self._prefix_tags = {} # 小写前缀 -> 类型标签集合（登记用）
+        self._prefixes = {}    # 编译后的前缀表：小写前缀 -> frozenset(类型标签)
+        self._prefix_lengths = ()   # 前缀表中出现的各种前缀长度
+        self._globs = {}       # 类型标签 -> [通配符]
+        self._glob_re = None   # 所有通配符合并的正则，判断是否命中任一通配符
+        self._glob_tag_re = None    # 按类型标签分组的正则，取出所有命中的标签
+        self._glob_tags = []   # [(正则分组名, 类型标签)]
+        self._empty = frozenset()
+        if file_types:
+            for tag, patterns in file_types.items():
+                self.add(tag, patterns)
+
+    def add(self, tag, patterns):
+        """登记一个类型标签的规则：'.ext' 为扩展名，'prefix*' 为前缀，其余按通配符匹配"""
+        for pattern in patterns:
+            pattern = pattern.lower()
+            if pattern.startswith('.') and not any(c in pattern for c in '*?['):
+                self._suffix_tags.setdefault(pattern, set()).add(tag)
+            elif pattern.startswith('*.') and not any(c in pattern[1:] for c in '*?['):
+                self._suffix_tags.setdefault(pattern[1:], set()).add(tag)
+            elif pattern.endswith('*') and not any(c in pattern[:-1] for c in '*?['):
+                self._prefix_tags.setdefault(pattern[:-1], set()).add(tag)
+            else:
+                self._globs.setdefault(tag, []).append(pattern)
+        self._compile()
+
+    def _compile(self):
+        self._suffixes = {suffix: frozenset(tags) for suffix, tags in self._suffix_tags.items()}
+        self._prefixes = {prefix: frozenset(tags) for prefix, tags in self._prefix_tags.items()}
+        self._prefix_lengths = tuple(sorted({len(prefix) for prefix in self._prefixes}))
+        # 每个标签的通配符合并成一个可选的先行断言分组：断言不消耗字符，所有分组
+        # 都在文件名开头尝试，一次匹配后有值的分组即命中的标签。
+        # 分组名不用fnmatch.translate内部使用的g前缀
+        self._glob_tags = [(f"t{i}", tag) for i, tag in enumerate(self._globs)]
+        if self._glob_tags:
+            translated = {tag: '|'.join(fnmatch.translate(p) for p in patterns)
+                          for tag, patterns in self._globs.items()}
+            self._glob_re = re.compile('|'.join(translated.values()))
+            self._glob_tag_re = re.compile(''.join(
+                f"(?:(?=(?P<{group}>{translated[tag]})))?" for group, tag in self._glob_tags
+            ))
+        else:
+            self._glob_re = self._glob_tag_re = None
+
+    def match(self, name):
+        """返回文件名命中的类型标签集合（frozenset）"""
+        name = name.lower()
+        tags = None
+        suffixes = self._suffixes
+        dot = name.rfind('.')
+        while dot >= 0:
+            hit = suffixes.get(name[dot:])
+            if hit:
+                tags = hit if tags is None else tags | hit
+            dot = name.rfind('.', 0, dot)
+        prefixes = self._prefixes
+        for length in self._prefix_lengths:
+            if length > len(name):
+                break
+            hit = prefixes.get(name[:length])
+            if hit:
+                tags = hit if tags is None else tags | hit
+        if self._glob_re is not None and self._glob_re.match(name):
+            groups = self._glob_tag_re.match(name).groupdict()
+            extra = [tag for group, tag in self._glob_tags if groups[group] is not None]
+            tags = frozenset(extra) if tags is None else tags.union(extra)
+        return tags if tags is not None else self._empty
+
+    def tags(self, entry):
+        """返回FileEntry的类型标签集合，同一个文件只计算一次"""
+        tags = entry.tags
+        if tags is None:
+            tags = entry.tags = self.match(entry.name)
+        return tags
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 通配符规划
+
+扫描规则中的通配符路径（如 thumbcache_*.db、iconcache*、Office\\*.log、
+Firefox的 Profiles\\*\\cache2）按父目录分组：每个父目录只枚举一次，
+该目录下的所有通配符都与这一份列表匹配。
+
+目录列表在整个会话中缓存，以父目录的修改时间作为校验：目录中增删条目会
+改变其修改时间，此时重新枚举。
+"""
+
+import os
+import re
+import stat
+import glob
+import fnmatch
+
+from scan_engine import stat_path
+
+
+def _split_pattern(pattern):
+    """把通配符路径拆成 (第一个通配部分之前的父目录, 其后的路径组成部分列表)"""
+    parts = os.path.normpath(pattern).split(os.sep)
+    for i, part in enumerate(parts):
+        if glob.has_magic(part):
+            break
+    else:
+        return None, parts
+    parent = os.sep.join(parts[:i])
+    # 根目录（"/" 或 "C:\"）拆分后只剩 "" 或 "C:"，补回分隔符
+    if i > 0 and not os.path.splitdrive(parent)[1]:
+        parent += os.sep
+    return parent, parts[i:]
+
+
+def _compile(component):
+    """编译单个路径组成部分的通配符，大小写规则与文件系统一致（os.path.normcase）"""
+    return re.compile(fnmatch.translate(os.path.normcase(component)))
+
+
+class GlobPlanner:
+    """按父目录分组展开通配符路径，目录列表按修改时间校验后在会话内复用"""
+
+    def __init__(self):
+        self._listings = {}  # 规范化父目录 -> (修改时间ns, [(名称, 是否目录)])
+
+    def expand(self, patterns, stats=None):
+        """展开一组通配符路径，返回 {通配符路径: [匹配的路径（已排序）]}
+
+        与glob.glob一样不匹配以"."开头的隐藏条目（除非通配部分本身以"."开头）。
+        通配部分之后的非通配部分（如 cache2）只拼接不检查是否存在，
+        由调用方stat时确认，避免重复的系统调用。
+        """
+        results = {pattern: [] for pattern in patterns}
+        pending = []
+        for pattern in results:
+            parent, parts = _split_pattern(pattern)
+            if parent is None:
+                results[pattern].append(pattern)
+            else:
+                pending.append((pattern, parent, parts))
+
+        listings = {}  # 本次展开中已取得的目录列表
+        while pending:
+            groups = {}
+            for pattern, parent, parts in pending:
+                groups.setdefault(parent, []).append((pattern, parts))
+            pending = []
+            for parent, members in groups.items():
+                names = self._listing(parent, stats, listings)
+                if not names:
+                    continue
+                for pattern, parts in members:
+                    matcher = _compile(parts[0])
+                    hidden = parts[0].startswith('.')
+                    rest = parts[1:]
+                    for name, is_dir in names:
+                        if name.startswith('.') and not hidden:
+                            continue
+                        if not matcher.match(os.path.normcase(name)):
+                            continue
+                        path = os.path.join(parent, name)
+                        if not rest:
+                            results[pattern].append(path)
+                        elif is_dir:
+                            # 下一个通配部分之前的非通配部分直接拼接
+                            literal = 0
+                            while literal < len(rest) and not glob.has_magic(rest[literal]):
+                                literal += 1
+                            path = os.path.join(path, *rest[:literal])
+                            if literal == len(rest):
+                                results[pattern].append(path)
+                            else:
+                                pending.append((pattern, path, rest[literal:]))
+
+        for paths in results.values():
+            paths.sort()
+        return results
+
+    def glob(self, pattern, stats=None):
+        """展开单个通配符路径"""
+        return self.expand([pattern], stats)[pattern]
+
+    def clear(self):
+        self._listings.clear()
+
+    def _listing(self, parent, stats, listings):
+        """取得父目录的列表：修改时间与缓存一致时直接复用，否则重新枚举"""
+        key = os.path.normcase(os.path.normpath(parent or os.curdir))
+        if key in listings:
+            return listings[key]
+        names = None
+        st = stat_path(parent or os.curdir, stats)
+        if st is not None and stat.S_ISDIR(st.st_mode):
+            cached = self._listings.get(key)
+            if cached is not None and cached[0] == st.st_mtime_ns:
+                names = cached[1]
+                if stats is not None:
+                    stats.index_hits += 1
+            else:
+                names = self._scan(parent or os.curdir, stats)
+                if names is not None:
+                    self._listings[key] = (st.st_mtime_ns, names)
+        listings[key] = names
+        return names
+
+    @staticmethod
+    def _scan(parent, stats):
+        if stats is not None:
+            stats.scandir_calls += 1
+        names = []
+        try:
+            with os.scandir(parent) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    names.append((entry.name, is_dir))
+        except OSError:
+            if stats is not None:
+                stats.errors += 1
+            return None
+        return names
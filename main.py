@@ -7,12 +7,13 @@ C盘清理工具 - 用户界面
 
 import os
 
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QCheckBox,
     QFileDialog,
     QGroupBox,
     QHBoxLayout,
+    QInputDialog,
     QLabel,
     QLineEdit,
     QMainWindow,
@@ -27,6 +28,8 @@ from PyQt5.QtWidgets import (
 )
 
 from cleaner_logic import CleanerLogic
+from scan_engine import CancelToken
+from scan_rules import DEFAULT_SELECTION
 
 
 class ScanThread(QThread):
@@ -37,12 +40,17 @@ class ScanThread(QThread):
     def __init__(self, cleaner):
         super().__init__()
         self.cleaner = cleaner
+        self.cancel_token = CancelToken()
         
     def run(self):
         """运行扫描过程"""
-        results = self.cleaner.scan_system()
+        results = self.cleaner.scan_system(self.update_signal, self.cancel_token)
         self.finished_signal.emit(results)
 
+    def cancel(self):
+        """请求取消扫描，遍历线程在处理完当前目录后退出"""
+        self.cancel_token.cancel()
+
 
 class CleanThread(QThread):
     """清理线程，避免UI冻结"""
@@ -62,12 +70,17 @@ class CleanThread(QThread):
 
 class CleanerMainWindow(QMainWindow):
     """主窗口类"""
+
+    # 后台监视的合计在监视线程中推送，经信号转到界面线程
+    watch_signal = pyqtSignal(dict)
     
     def __init__(self):
         super().__init__()
         self.cleaner = CleanerLogic()
         self.scan_results = {}
         self.selected_items = []
+        self.scanning = False
+        self.scan_thread = None
         
         self.init_ui()
         
@@ -90,6 +103,22 @@ class CleanerMainWindow(QMainWindow):
         self.scan_button.clicked.connect(self.start_scan)
         button_layout.addWidget(self.scan_button)
 
+        self.quick_scan_checkbox = QCheckBox("快速扫描")
+        self.quick_scan_checkbox.setToolTip("限制目录深度并忽略过小的文件，缩短扫描时间")
+        button_layout.addWidget(self.quick_scan_checkbox)
+
+        self.watch_checkbox = QCheckBox("实时监视")
+        self.watch_checkbox.setToolTip("在后台跟踪文件的创建和删除，不必重新扫描即可显示当前可释放空间")
+        self.watch_checkbox.toggled.connect(self.toggle_watch)
+        self.watch_signal.connect(self.on_watch_update)
+        button_layout.addWidget(self.watch_checkbox)
+
+        self.cancel_scan_button = QPushButton("取消扫描")
+        self.cancel_scan_button.setMinimumHeight(40)
+        self.cancel_scan_button.setEnabled(False)
+        self.cancel_scan_button.clicked.connect(self.cancel_scan)
+        button_layout.addWidget(self.cancel_scan_button)
+
         self.clean_button = QPushButton("清理选中项")
         self.clean_button.setMinimumHeight(40)
         self.clean_button.setEnabled(False)
@@ -107,6 +136,23 @@ class CleanerMainWindow(QMainWindow):
         self.deselect_all_button.setEnabled(False)
         self.deselect_all_button.clicked.connect(self.deselect_all_items)
         button_layout.addWidget(self.deselect_all_button)
+
+        self.scan_report_button = QPushButton("扫描统计")
+        self.scan_report_button.setMinimumHeight(40)
+        self.scan_report_button.setEnabled(False)
+        self.scan_report_button.clicked.connect(self.show_scan_report)
+        button_layout.addWidget(self.scan_report_button)
+
+        self.save_scan_button = QPushButton("保存结果")
+        self.save_scan_button.setMinimumHeight(40)
+        self.save_scan_button.setEnabled(False)
+        self.save_scan_button.clicked.connect(self.save_scan_results)
+        button_layout.addWidget(self.save_scan_button)
+
+        self.load_scan_button = QPushButton("载入结果")
+        self.load_scan_button.setMinimumHeight(40)
+        self.load_scan_button.clicked.connect(self.load_scan_results)
+        button_layout.addWidget(self.load_scan_button)
         
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -165,52 +211,8 @@ class CleanerMainWindow(QMainWindow):
             'large_files': "大文件"
         }
 
-        # Define default selection state for categories
-        self.categories_default_selection = {
-            # 基本清理
-            'temp': True,
-            'recycle': True,
-            'cache': True,
-            'logs': True,
-            'updates': True,
-            'thumbnails': True,
-
-            # 扩展清理
-            'prefetch': True,
-            'old_windows': True,
-            'error_reports': True,
-            'service_packs': True,
-            'memory_dumps': True,
-            'font_cache': True,
-            'disk_cleanup': True,
-
-            # 新增安全清理项
-            'app_cache': True,
-            'media_cache': True,
-            'search_index': True,
-            'backup_temp': True,
-            'update_temp': True,
-            'driver_backup': True,
-            'app_crash': True,
-            'app_logs': True,
-            'recent_items': True,
-            'notification': True,
-            'dns_cache': True,
-            'network_cache': True, 
-            'printer_temp': True,
-            'device_temp': True,  
-            'windows_defender': True,
-            'store_cache': True, 
-            'onedrive_cache': True,
-
-            # 新增用户请求的清理项
-            'downloads': False, # Do not select by default
-            'installer_cache': True,
-            'delivery_opt': True,
-            
-            # 大文件扫描
-            'large_files': False # Do not select by default
-        }
+        # Define default selection state for categories (see scan_rules.CATEGORIES)
+        self.categories_default_selection = dict(DEFAULT_SELECTION)
         
         safety_group = QGroupBox("安全选项")
         safety_layout = QVBoxLayout(safety_group)
@@ -227,7 +229,9 @@ class CleanerMainWindow(QMainWindow):
         backup_dir_label = QLabel("备份目录:")
         backup_dir_layout.addWidget(backup_dir_label)
 
-        self.backup_dir_edit = QLineEdit(self.cleaner.backup_dir)
+        # 默认备份目录需要探测磁盘，窗口显示之后再填入（见fill_default_backup_dir）
+        self.backup_dir_edit = QLineEdit()
+        self.backup_dir_edit.setPlaceholderText("默认为第一个非C盘下的 CCleaner_Backup")
         backup_dir_layout.addWidget(self.backup_dir_edit)
 
         browse_backup_button = QPushButton("浏览...")
@@ -238,6 +242,10 @@ class CleanerMainWindow(QMainWindow):
         self.backup_manager_button = QPushButton("备份管理")
         self.backup_manager_button.clicked.connect(self.open_backup_manager)
         safety_layout.addWidget(self.backup_manager_button, 0, Qt.AlignLeft)
+
+        self.exclusions_button = QPushButton("排除列表")
+        self.exclusions_button.clicked.connect(self.edit_exclusions)
+        safety_layout.addWidget(self.exclusions_button, 0, Qt.AlignLeft)
         
         main_layout.addWidget(info_group)
         main_layout.addLayout(button_layout)
@@ -249,6 +257,12 @@ class CleanerMainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
         
         self.update_disk_info()
+        QTimer.singleShot(0, self.fill_default_backup_dir)
+
+    def fill_default_backup_dir(self):
+        """窗口显示后填入默认备份目录（首次访问时才探测磁盘）"""
+        if not self.backup_dir_edit.text():
+            self.backup_dir_edit.setText(self.cleaner.backup_dir)
     
     def update_disk_info(self):
         """更新磁盘信息"""
@@ -262,35 +276,82 @@ class CleanerMainWindow(QMainWindow):
     def start_scan(self):
         """开始扫描系统"""
         self.scan_button.setEnabled(False)
+        self.cancel_scan_button.setEnabled(True)
         self.clean_button.setEnabled(False)
         self.select_all_button.setEnabled(False)
         self.deselect_all_button.setEnabled(False)
+        self.save_scan_button.setEnabled(False)
+        self.load_scan_button.setEnabled(False)
         self.results_tree.clear()
+        self.scan_results = {}
+        self.scanning = True
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)
         self.status_label.setText("正在扫描系统，请稍候...")
+        self.cleaner.set_options({'scan_profile': 'quick' if self.quick_scan_checkbox.isChecked() else 'full'})
         
         self.scan_thread = ScanThread(self.cleaner)
+        self.scan_thread.update_signal.connect(self.on_scan_update)
         self.scan_thread.finished_signal.connect(self.on_scan_finished)
         self.scan_thread.start()
     
+    def cancel_scan(self):
+        """取消正在进行的扫描，已找到的结果保留"""
+        self.cancel_scan_button.setEnabled(False)
+        self.status_label.setText("正在取消扫描...")
+        self.scan_thread.cancel()
+
+    def on_scan_update(self, partial_results):
+        """某个类别扫描完成，立即加入结果树"""
+        self.merge_results(partial_results)
+
+        if self.scan_thread.cancel_token.is_cancelled():
+            return
+        total_size = sum(item.size for category_items in self.scan_results.values() for item in category_items)
+        self.status_label.setText(f"正在扫描系统，已发现可释放空间: {self.format_size(total_size)}")
+
+    def merge_results(self, partial_results):
+        """把结果树中还没有的类别加入结果树（已有的类别保持用户已做的勾选）"""
+        original_signals_blocked = self.results_tree.signalsBlocked()
+        self.results_tree.blockSignals(True)
+        try:
+            for category_key, items in partial_results.items():
+                if category_key in self.scan_results or not items:
+                    continue
+                self.scan_results[category_key] = items
+                self.add_category_to_tree(category_key, items)
+        finally:
+            self.results_tree.blockSignals(original_signals_blocked)
+
     def on_scan_finished(self, results):
         """扫描完成后的处理"""
-        self.scan_results = results
+        self.scanning = False
         self.progress_bar.setVisible(False)
         self.scan_button.setEnabled(True)
+        self.cancel_scan_button.setEnabled(False)
+        self.scan_report_button.setEnabled(self.cleaner.get_scan_report() is not None)
+        self.load_scan_button.setEnabled(True)
+        self.save_scan_button.setEnabled(bool(results) and any(results.values()))
+        status = "扫描已取消" if self.cleaner.last_scan_cancelled else "扫描完成"
         
         if not results or not any(results.values()): # Check if results dict itself is empty or all its lists are empty
-            self.status_label.setText("扫描完成，未发现可清理项目")
+            self.scan_results = results
+            self.status_label.setText(f"{status}，未发现可清理项目")
             self.select_all_button.setEnabled(False)
             self.deselect_all_button.setEnabled(False)
             self.results_tree.clear() # Clear tree if no results
             return
             
-        total_size = sum(item['size'] for category_items in results.values() for item in category_items)
-        self.status_label.setText(f"扫描完成，发现可释放空间: {self.format_size(total_size)}")
+        # 扫描过程中已推送的类别保留在结果树中（保持用户已做的勾选），只补充缺少的类别
+        self.merge_results(results)
+        self.scan_results = results
+
+        total_size = sum(item.size for category_items in results.values() for item in category_items)
+        message = f"{status}，发现可释放空间: {self.format_size(total_size)}"
+        if self.cleaner.last_scan_truncated and not self.cleaner.last_scan_cancelled:
+            message += f"（{len(self.cleaner.last_scan_truncated)} 个类别超出时间预算，仅为部分结果）"
+        self.status_label.setText(message)
         
-        self.populate_results_tree(results)
         self.update_selected_items() 
         self.select_all_button.setEnabled(True)
         self.deselect_all_button.setEnabled(True)
@@ -317,43 +378,47 @@ class CleanerMainWindow(QMainWindow):
             for category_key, items in results.items():
                 if not items:
                     continue
-                    
-                category_size = sum(item['size'] for item in items)
-                # Use the display name from our comprehensive dict, fallback to key if not found
-                category_display_name = self.categories_display_names.get(category_key, category_key.replace('_', ' ').title())
-                default_selected = self.categories_default_selection.get(category_key, True) # Default to True if key somehow missing
-                
-                category_item = QTreeWidgetItem(self.results_tree)
-                category_item.setText(0, category_display_name)
-                category_item.setText(1, self.format_size(category_size))
-                category_item.setFlags(category_item.flags() | Qt.ItemIsUserCheckable)
-                # Set check state based on default_selected for the category itself
-                category_item.setCheckState(0, Qt.Checked if default_selected else Qt.Unchecked)
-                category_item.setData(0, Qt.UserRole + 1, category_key) # Store category key for later use if needed
-                
-                for item_data in items:
-                    file_item = QTreeWidgetItem(category_item)
-                    base_name = os.path.basename(item_data['path'])
-                    display_text = base_name
-
-                    # Special handling for 'large_files' as in tkinter version
-                    if category_key == 'large_files':
-                        modified_time = item_data.get('modified', '未知')
-                        extension = item_data.get('extension', '未知')
-                        display_text = f"{base_name} [修改时间: {modified_time}] [类型: {extension}]"
-                    
-                    file_item.setText(0, display_text) # Column 0: Name (or enhanced name for large files)
-                    file_item.setText(1, self.format_size(item_data['size'])) # Column 1: Size
-                    file_item.setText(2, item_data['path']) # Column 2: Path
-                    file_item.setFlags(file_item.flags() | Qt.ItemIsUserCheckable)
-                    # Set child item's check state based on the parent category's default_selected status
-                    file_item.setCheckState(0, Qt.Checked if default_selected else Qt.Unchecked)
-                    file_item.setData(0, Qt.UserRole, item_data) # Store the original item dict
+                self.add_category_to_tree(category_key, items)
             
             self.results_tree.expandAll()
         finally:
             self.results_tree.blockSignals(original_signals_blocked)
     
+    def add_category_to_tree(self, category_key, items):
+        """在结果树中添加一个类别及其项目（调用方负责屏蔽itemChanged信号）"""
+        category_size = sum(item.size for item in items)
+        # Use the display name from our comprehensive dict, fallback to key if not found
+        category_display_name = self.categories_display_names.get(category_key, category_key.replace('_', ' ').title())
+        default_selected = self.categories_default_selection.get(category_key, True) # Default to True if key somehow missing
+        
+        category_item = QTreeWidgetItem(self.results_tree)
+        category_item.setText(0, category_display_name)
+        category_item.setText(1, self.format_size(category_size))
+        category_item.setFlags(category_item.flags() | Qt.ItemIsUserCheckable)
+        # Set check state based on default_selected for the category itself
+        category_item.setCheckState(0, Qt.Checked if default_selected else Qt.Unchecked)
+        category_item.setData(0, Qt.UserRole + 1, category_key) # Store category key for later use if needed
+        
+        for item_data in items:
+            file_item = QTreeWidgetItem(category_item)
+            base_name = os.path.basename(item_data.path)
+            display_text = base_name
+
+            # Special handling for 'large_files' as in tkinter version
+            if category_key == 'large_files':
+                modified_time = item_data.modified if item_data.mtime else '未知'
+                extension = item_data.extension or '未知'
+                display_text = f"{base_name} [修改时间: {modified_time}] [类型: {extension}]"
+            
+            file_item.setText(0, display_text) # Column 0: Name (or enhanced name for large files)
+            file_item.setText(1, self.format_size(item_data.size)) # Column 1: Size
+            file_item.setText(2, item_data.path) # Column 2: Path
+            file_item.setFlags(file_item.flags() | Qt.ItemIsUserCheckable)
+            # Set child item's check state based on the parent category's default_selected status
+            file_item.setCheckState(0, Qt.Checked if default_selected else Qt.Unchecked)
+            file_item.setData(0, Qt.UserRole, item_data) # Store the ScanItem itself (no copy into a QVariantMap)
+        category_item.setExpanded(True)
+
     def on_item_changed(self, item, column):
         """处理项目选择状态变化"""
         if column != 0:
@@ -414,19 +479,20 @@ class CleanerMainWindow(QMainWindow):
             item = iterator.value()
             # We are interested in actual file items (children of categories) that are checked
             if item.parent() is not None and item.checkState(0) == Qt.Checked:
-                item_data = item.data(0, Qt.UserRole) # This is the original dict for the file
-                if item_data: 
+                item_data = item.data(0, Qt.UserRole) # This is the ScanItem for the file
+                if item_data is not None:
                     self.selected_items.append(item_data)
             iterator += 1 # Move to the next item in the tree
             
-        self.clean_button.setEnabled(len(self.selected_items) > 0)
+        # 扫描过程中不允许清理
+        self.clean_button.setEnabled(len(self.selected_items) > 0 and not self.scanning)
     
     def start_clean(self):
         """开始清理选中的项目"""
         if not self.selected_items:
             return
             
-        total_size = sum(item['size'] for item in self.selected_items)
+        total_size = sum(item.size for item in self.selected_items)
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Warning)
         msg.setWindowTitle("确认清理")
@@ -449,6 +515,7 @@ class CleanerMainWindow(QMainWindow):
         self.cleaner.set_options(options)
         
         self.scan_button.setEnabled(False)
+        self.load_scan_button.setEnabled(False)
         self.clean_button.setEnabled(False)
         self.select_all_button.setEnabled(False)
         self.deselect_all_button.setEnabled(False)
@@ -472,6 +539,7 @@ class CleanerMainWindow(QMainWindow):
         """清理选中项完成后的处理"""
         self.progress_bar.setVisible(False)
         self.scan_button.setEnabled(True)
+        self.load_scan_button.setEnabled(True)
         # Enable buttons that should be active if scan results exist
         if self.scan_results:
             self.select_all_button.setEnabled(True)
@@ -485,6 +553,9 @@ class CleanerMainWindow(QMainWindow):
         else:
             message = f"清理完成，已释放空间: {self.format_size(freed_space)}"
         
+        skipped = results.get('skipped_items', [])
+        if skipped:
+            message += f"，{len(skipped)} 个项目在扫描后已不存在"
         if errors:
             message += f"，{len(errors)} 个错误"
         
@@ -551,6 +622,103 @@ class CleanerMainWindow(QMainWindow):
             # Optionally, update cleaner_logic immediately if desired, or just use the text field value at clean time
             # self.cleaner.set_options({'backup_dir': backup_dir}) 
 
+    def show_scan_report(self):
+        """显示最近一次扫描中各扫描器的耗时和遍历统计，可保存为JSON"""
+        report = self.cleaner.get_scan_report()
+        if report is None:
+            return
+
+        walk = report['walk']
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Information)
+        msg.setWindowTitle("扫描统计")
+        msg.setText(
+            f"总耗时: {report['wall_time']:.2f} 秒\n"
+            f"目录: {walk['dirs']} 个, 文件: {walk['files']} 个, "
+            f"stat调用: {walk['stat_calls']} 次, 错误: {walk['errors']} 个"
+        )
+        msg.setInformativeText("各扫描器按耗时降序排列，见详细信息")
+        lines = []
+        for name, scanner_stats in report['scanners'].items():
+            lines.append(
+                f"{name}: {scanner_stats['wall_time']:.2f} 秒, 目录 {scanner_stats['dirs']}, "
+                f"文件 {scanner_stats['files']}, {self.format_size(scanner_stats['bytes'])}, "
+                f"错误 {scanner_stats['errors']}, stat {scanner_stats['stat_calls']}"
+            )
+        msg.setDetailedText("\n".join(lines))
+        save_button = msg.addButton("保存为JSON...", QMessageBox.ActionRole)
+        msg.addButton(QMessageBox.Close)
+        msg.exec_()
+
+        if msg.clickedButton() == save_button:
+            path, _ = QFileDialog.getSaveFileName(self, "保存扫描统计", "scan_report.json", "JSON (*.json)")
+            if path and not self.cleaner.save_scan_report(path):
+                QMessageBox.warning(self, "错误", "保存扫描统计失败")
+
+    def save_scan_results(self):
+        """把当前扫描结果保存为快照文件，之后可以载入并清理，不必重新扫描"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "保存扫描结果", "scan_results.jsonl.gz", "扫描结果 (*.jsonl.gz *.jsonl)"
+        )
+        if not path:
+            return
+        count = self.cleaner.export_scan(path, self.scan_results)
+        if count is None:
+            QMessageBox.warning(self, "错误", "保存扫描结果失败")
+        else:
+            self.status_label.setText(f"已保存 {count} 个项目到 {os.path.basename(path)}")
+
+    def load_scan_results(self):
+        """载入之前保存的扫描结果，替换结果树中的内容"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "载入扫描结果", "", "扫描结果 (*.jsonl.gz *.jsonl);;所有文件 (*)"
+        )
+        if not path:
+            return
+        results = self.cleaner.import_scan(path)
+        if results is None:
+            QMessageBox.warning(self, "错误", "载入扫描结果失败，文件无效或不完整")
+            return
+        self.results_tree.clear()
+        self.scan_results = {}
+        self.on_scan_finished(results)
+        self.status_label.setText(f"已载入 {os.path.basename(path)}，{self.status_label.text()}")
+
+    def edit_exclusions(self):
+        """编辑不扫描、不清理的位置（每行一项），保存后下次扫描生效"""
+        text, ok = QInputDialog.getMultiLineText(
+            self,
+            "排除列表",
+            "每行一项。含路径分隔符的按路径排除整个目录（可用 %变量% 和通配符，\n"
+            "如 D:\\VMs、C:\\Users\\*\\VirtualBox VMs）；\n"
+            "不含分隔符的按名称排除任意位置的目录或文件（如 node_modules、*.vhdx）：",
+            "\n".join(self.cleaner.get_exclusions())
+        )
+        if not ok:
+            return
+        if not self.cleaner.set_exclusions(text.splitlines()):
+            QMessageBox.warning(self, "错误", "保存排除列表失败")
+
+    def toggle_watch(self, checked):
+        """启动或停止后台监视"""
+        if checked:
+            self.cleaner.start_watch(self.watch_signal)
+            self.status_label.setText("正在建立实时监视，请稍候...")
+        else:
+            self.cleaner.stop_watch()
+
+    def on_watch_update(self, totals):
+        """后台监视的合计变化，显示当前可释放空间"""
+        if self.scanning or not self.watch_checkbox.isChecked():
+            return
+        total_size = sum(total['size'] for total in totals.values())
+        file_count = sum(total['count'] for total in totals.values())
+        self.status_label.setText(f"实时监视: 当前可释放空间 {self.format_size(total_size)}（{file_count} 个文件）")
+
+    def closeEvent(self, event):
+        self.cleaner.stop_watch()
+        super().closeEvent(event)
+
     def open_backup_manager(self):
         QMessageBox.information(self, "提示", "'备份管理' 功能暂未实现。")
     
@@ -566,7 +734,9 @@ class CleanerMainWindow(QMainWindow):
         else:
             return f"{size_bytes/(1024*1024*1024):.2f} GB"
 
-if __name__ == "__main__":
+
+def main():
+    """启动图形界面"""
     import logging
     import sys
 
@@ -583,4 +753,10 @@ if __name__ == "__main__":
     main_window = CleanerMainWindow()
     main_window.show()
     logger.info("应用程序已启动。")
-    sys.exit(app.exec_()) 
\ No newline at end of file
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 路径策略
+
+原来的安全检查对每个路径逐一startswith比较受保护目录列表，区分大小写，
+而且扫描大文件时每个文件都要检查一次。这里把允许/禁止规则编译成按路径
+组成部分的前缀树（按Windows规则不区分大小写，"\\" 和 "/" 都视为分隔符）：
+
+- 禁止（deny）：该目录及其整个子树都不扫描、不清理
+- 允许（allow）：在被禁止的子树中重新放行某个子树
+- 只禁止本身（deny_exact）：目录本身不能作为清理项，其中的内容不受影响，
+  如 C:\\Windows 本身不能清理，但 C:\\Windows\\Temp 可以
+- 禁止名称（deny_names）：任意位置上名称匹配的目录（整个子树）和文件，
+  如 node_modules、*.vhdx
+
+路径规则的组成部分可以含通配符（如 C:\\Users\\*\\VirtualBox VMs）。
+
+判断时从根沿前缀树走到最深的匹配节点，最深的子树规则生效。判断结果按目录
+缓存，遍历时每个目录只判断一次，目录中的文件直接继承目录的结果。
+"""
+
+import re
+import fnmatch
+
+ALLOW = 'allow'
+DENY = 'deny'
+
+# 缓存的判断结果超过该数量时清空，避免超大目录树占用过多内存
+MAX_CACHED = 100000
+
+_SEPARATORS = re.compile(r'[\\/]+')
+
+
+def _has_magic(part):
+    return any(c in part for c in '*?[')
+
+
+def _compile(patterns):
+    """把一组通配符编译成一个不区分大小写的正则表达式，没有通配符时返回None"""
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern.lower()) for pattern in patterns))
+
+
+def split_path(path):
+    """把路径拆成小写的组成部分，并消去 "." 和 ".."（避免借助 ".." 绕过检查）"""
+    parts = []
+    for part in _SEPARATORS.split(path):
+        if not part or part == '.':
+            continue
+        if part == '..':
+            if parts:
+                parts.pop()
+            continue
+        parts.append(part.lower())
+    return parts
+
+
+class _Node:
+    __slots__ = ('children', 'patterns', 'subtree', 'exact', 'allow_below')
+
+    def __init__(self):
+        self.children = {}
+        self.patterns = []          # 含通配符的组成部分 [(通配符, 编译后的正则, 子节点)]
+        self.subtree = None         # 作用于整个子树的规则：ALLOW/DENY/None
+        self.exact = False          # 只禁止该路径本身
+        self.allow_below = False    # 更深处是否有允许规则
+
+
+class PathPolicy:
+    """编译后的路径策略，判断结果按路径缓存"""
+
+    def __init__(self, deny=(), allow=(), deny_exact=(), deny_names=()):
+        self._root = _Node()
+        self._rules = []
+        self._names = []
+        self._name_re = None
+        self._cache = {}    # 路径 -> (子树规则, 是否只禁止本身, 更深处是否有允许规则)
+        for path in deny:
+            self.add(path, DENY)
+        for path in allow:
+            self.add(path, ALLOW)
+        for path in deny_exact:
+            self.add(path, DENY, exact=True)
+        self.add_names(deny_names)
+
+    def add(self, path, action, exact=False):
+        """添加一条规则；exact为True时只禁止该路径本身"""
+        parts = split_path(path)
+        if not parts:
+            return
+        self._rules.append((path, action, exact))
+        node = self._root
+        for part in parts:
+            if action == ALLOW:
+                node.allow_below = True
+            if _has_magic(part):
+                for pattern, _, child in node.patterns:
+                    if pattern == part:
+                        break
+                else:
+                    child = _Node()
+                    node.patterns.append((part, re.compile(fnmatch.translate(part)), child))
+                node = child
+            else:
+                node = node.children.setdefault(part, _Node())
+        if exact:
+            node.exact = True
+        else:
+            node.subtree = action
+        self._cache.clear()
+
+    def add_names(self, patterns):
+        """禁止名称匹配的目录（整个子树）和文件，patterns为不含路径分隔符的通配符"""
+        patterns = [pattern for pattern in patterns if pattern and pattern not in self._names]
+        if not patterns:
+            return
+        self._names.extend(patterns)
+        self._name_re = _compile(self._names)
+        self._cache.clear()
+
+    def derive(self, deny=(), allow=(), deny_names=()):
+        """返回在本策略基础上追加规则的新策略（如某个扫描器自己的排除目录）"""
+        policy = PathPolicy(deny_names=self._names)
+        for path, action, exact in self._rules:
+            policy.add(path, action, exact)
+        for path in deny:
+            policy.add(path, DENY)
+        for path in allow:
+            policy.add(path, ALLOW)
+        policy.add_names(deny_names)
+        return policy
+
+    @property
+    def rules(self):
+        """已添加的规则 [(路径, 规则, 是否只禁止本身)]"""
+        return list(self._rules)
+
+    @property
+    def names(self):
+        """禁止的名称通配符"""
+        return list(self._names)
+
+    @property
+    def filters_names(self):
+        """是否有按名称禁止的规则（有时需要逐个检查文件名）"""
+        return self._name_re is not None
+
+    def _decide(self, path):
+        decision = self._cache.get(path)
+        if decision is not None:
+            return decision
+        nodes = [self._root]
+        name_re = self._name_re
+        subtree = ALLOW
+        for part in split_path(path):
+            # 同一层上可能同时匹配字面部分和通配部分，禁止优先
+            matched = []
+            for node in nodes:
+                child = node.children.get(part)
+                if child is not None:
+                    matched.append(child)
+                for _, regex, child in node.patterns:
+                    if regex.match(part):
+                        matched.append(child)
+            nodes = matched
+            rules = {node.subtree for node in nodes}
+            if DENY in rules or (name_re is not None and name_re.match(part)):
+                subtree = DENY
+            elif ALLOW in rules:
+                subtree = ALLOW
+        exact = any(node.exact for node in nodes)
+        allow_below = any(node.allow_below for node in nodes)
+        if len(self._cache) >= MAX_CACHED:
+            self._cache.clear()
+        decision = self._cache[path] = (subtree, exact, allow_below)
+        return decision
+
+    def allows(self, path):
+        """路径本身能否作为扫描根目录或清理项"""
+        subtree, exact, _ = self._decide(path)
+        return subtree == ALLOW and not exact
+
+    def allows_files(self, dir_path):
+        """目录中的文件能否扫描或清理（不含按名称禁止的文件，见allows_file_name）"""
+        return self._decide(dir_path)[0] == ALLOW
+
+    def allows_file_name(self, name):
+        """文件名是否未被按名称禁止"""
+        return self._name_re is None or not self._name_re.match(name.lower())
+
+    def enters(self, dir_path):
+        """遍历时是否需要进入该目录：整个子树都被禁止时不进入"""
+        subtree, _, allow_below = self._decide(dir_path)
+        return subtree == ALLOW or allow_below
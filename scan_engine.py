@@ -0,0 +1,1063 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 统一遍历引擎
+
+各扫描器不再各自遍历目录，而是向引擎登记遍历规则（根目录 + 文件回调）。
+引擎把互相嵌套的根目录合并为遍历组，每个根目录只遍历一次，
+遍历到的每个文件分发给所有覆盖该位置的规则。
+
+目录遍历基于os.scandir，文件的大小和修改时间直接取自DirEntry缓存的
+stat数据，不再对每个文件单独调用isfile/getsize/getmtime。
+
+耗时很长的单个子树用ParallelWalker遍历：多个线程以工作窃取方式并发枚举，
+结果仍按串行遍历的顺序交付，扫描结果与单线程遍历完全一致。
+"""
+
+import os
+import stat
+import time
+import logging
+import threading
+import collections
+
+from worker_pool import AdaptivePool, ConcurrencyController, probe_storage
+
+logger = logging.getLogger('CCleaner')
+
+# Windows下DirEntry.stat()直接使用目录枚举时返回的数据，不产生额外的系统调用；
+# 其他平台第一次调用时需要一次stat
+_DIRENTRY_STAT_CACHED = os.name == 'nt'
+
+# 目录联接（junction）的重解析标记；os.walk会进入联接目录，这里与符号链接一样不进入
+_IO_REPARSE_TAG_MOUNT_POINT = getattr(stat, 'IO_REPARSE_TAG_MOUNT_POINT', 0xA0000003)
+
+# 枚举单个目录时每隔多少个条目检查一次取消标记，保证超大目录也能及时停止
+CANCEL_CHECK_INTERVAL = 256
+
+# 估计耗时至少达到该值（秒）且超过平均份额的遍历组才由多个线程并行遍历
+SPLIT_MIN_SECONDS = 0.5
+
+
+def _norm(path):
+    """规范化路径，用作比较键（Windows下不区分大小写）"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _is_under(key, parent_key):
+    """判断key是否等于parent_key或位于其下"""
+    if key == parent_key:
+        return True
+    prefix = parent_key if parent_key.endswith(os.sep) else parent_key + os.sep
+    return key.startswith(prefix)
+
+
+def canonical_path(path):
+    """返回 (真实路径, 比较键)
+
+    真实路径解析了符号链接、目录联接（junction）和8.3短文件名，
+    比较键在此基础上按文件系统规则统一大小写。指向同一位置的不同写法
+    （如 %TEMP% 的短文件名形式与 %LOCALAPPDATA%\\Temp）得到相同的比较键。
+    """
+    real = os.path.realpath(path)
+    return real, os.path.normcase(real)
+
+
+def _is_junction(entry):
+    """DirEntry是否为Windows目录联接（取自枚举时的数据，不产生系统调用）"""
+    if os.name != 'nt':
+        return False
+    return getattr(entry.stat(follow_symlinks=False), 'st_reparse_tag', 0) == _IO_REPARSE_TAG_MOUNT_POINT
+
+
+def _depth(key, root_key):
+    """key相对于root_key的目录层数（root_key本身为0）"""
+    if key == root_key:
+        return 0
+    return key[len(root_key):].strip(os.sep).count(os.sep) + 1
+
+
+class WalkStats:
+    """遍历统计，用于核对每个文件的stat开销"""
+
+    __slots__ = ('dirs', 'files', 'scandir_calls', 'stat_calls', 'errors', 'index_hits')
+
+    def __init__(self):
+        self.dirs = 0           # 访问的目录数
+        self.files = 0          # 访问的文件数
+        self.scandir_calls = 0  # 目录枚举次数
+        self.stat_calls = 0     # 实际产生系统调用的stat次数
+        self.errors = 0         # 无法访问的目录/文件数
+        self.index_hits = 0     # 直接从扫描索引取得内容的目录数
+
+    def merge(self, other):
+        """累加另一份统计"""
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def copy(self):
+        other = WalkStats()
+        other.merge(self)
+        return other
+
+    def delta(self, since):
+        """返回自since（copy()得到的快照）以来的增量"""
+        other = WalkStats()
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name) - getattr(since, name))
+        return other
+
+
+class ScannerStats:
+    """单个扫描器的统计
+
+    多个扫描器共享同一次遍历时，一个目录的枚举开销（目录数、stat次数、错误数）
+    计入每个在该目录上生效的扫描器，因此各扫描器之和可能大于总遍历统计。
+    """
+
+    __slots__ = ('wall_time', 'planning_time', 'dirs', 'files', 'bytes', 'errors', 'stat_calls', 'scandir_calls')
+
+    def __init__(self):
+        self.wall_time = 0.0      # 规划耗时 + 从遍历开始到该扫描器全部规则完成的时间（秒）
+        self.planning_time = 0.0  # 规划阶段（登记规则、单文件检查）耗时（秒）
+        self.dirs = 0           # 访问的目录数
+        self.files = 0          # 访问的文件数
+        self.bytes = 0          # 访问的文件总大小
+        self.errors = 0         # 无法访问的目录/文件数
+        self.stat_calls = 0     # stat系统调用次数
+        self.scandir_calls = 0  # 目录枚举次数
+
+    def add_walk(self, walk):
+        """累加一段遍历统计（WalkStats）中的目录开销"""
+        self.errors += walk.errors
+        self.stat_calls += walk.stat_calls
+        self.scandir_calls += walk.scandir_calls
+
+    def merge(self, other):
+        for name in self.__slots__:
+            if name not in ('wall_time', 'planning_time'):
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CancelToken:
+    """协作式取消标记
+
+    遍历循环在每个目录（超大目录中每隔CANCEL_CHECK_INTERVAL个条目）检查一次，
+    取消后各遍历线程在处理完当前目录条目后即退出。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+
+class FileEntry:
+    """遍历得到的文件：名称、路径、大小、修改时间和文件ID"""
+
+    __slots__ = ('path', 'name', 'size', 'mtime', 'ino', 'tags')
+
+    def __init__(self, path, name, size, mtime, ino=0):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.ino = ino      # inode/文件ID，0表示未知（Windows上scandir的stat结果和索引中都没有）
+        self.tags = None    # 文件类型标签，由FileTypeMatcher第一次匹配时填入
+
+
+def stat_path(path, stats=None):
+    """对单个路径做一次stat，不存在或无法访问时返回None"""
+    if stats is not None:
+        stats.stat_calls += 1
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+    except OSError:
+        if stats is not None:
+            stats.errors += 1
+        return None
+
+
+def file_entry(path, stats=None):
+    """获取单个文件的FileEntry（一次stat），不是普通文件时返回None"""
+    st = stat_path(path, stats)
+    if st is None or not stat.S_ISREG(st.st_mode):
+        return None
+    return FileEntry(path, os.path.basename(path), st.st_size, st.st_mtime, st.st_ino)
+
+
+def list_dir(dir_path, dir_mtime, stats, index=None, cancel=None):
+    """枚举单个目录，返回 (子目录名列表, 文件列表, {子目录名: 修改时间ns})
+
+    子目录名列表中不含符号链接目录和目录联接。目录无法访问时抛出OSError，
+    枚举到一半被取消时返回None（不写入索引）。
+
+    目录修改时间未变化、命中扫描索引时既不枚举也不stat其中的文件，大小和修改
+    时间取自索引（文件ID未记录，为0）。就地改写或追加文件不会更新目录修改时间，
+    这样的变化要到目录本身变化或索引记录过期（见ScanIndex的max_age）后才反映
+    出来；清理前clean_selected仍会逐项stat校验（见ScanItem.matches）。
+    """
+    listing = None
+    if index is not None:
+        if dir_mtime is None:
+            stats.stat_calls += 1
+            try:
+                dir_mtime = os.stat(dir_path).st_mtime_ns
+            except OSError as e:
+                if not isinstance(e, FileNotFoundError):
+                    stats.errors += 1
+                raise
+        listing = index.lookup(dir_path, dir_mtime)
+
+    child_mtimes = {}
+    if listing is not None:
+        stats.index_hits += 1
+        dirs, links, rows = listing
+        join = os.path.join
+        files = [FileEntry(join(dir_path, name), name, size, mtime, 0) for name, size, mtime in rows]
+    else:
+        dirs = []
+        links = set()
+        files = []
+        stats.scandir_calls += 1
+        try:
+            with os.scandir(dir_path) as it:
+                for count, entry in enumerate(it, 1):
+                    if (cancel is not None and count % CANCEL_CHECK_INTERVAL == 0
+                            and cancel.is_cancelled()):
+                        return None
+                    try:
+                        if entry.is_dir():
+                            dirs.append(entry.name)
+                            if entry.is_symlink() or _is_junction(entry):
+                                links.add(entry.name)
+                            elif index is not None:
+                                if not _DIRENTRY_STAT_CACHED:
+                                    stats.stat_calls += 1
+                                child_mtimes[entry.name] = entry.stat().st_mtime_ns
+                        elif entry.is_file():
+                            if not _DIRENTRY_STAT_CACHED or entry.is_symlink():
+                                stats.stat_calls += 1
+                            st = entry.stat()
+                            files.append(FileEntry(entry.path, entry.name, st.st_size, st.st_mtime, st.st_ino))
+                    except OSError:
+                        stats.errors += 1
+        except OSError:
+            stats.errors += 1
+            raise
+        if index is not None:
+            index.record(dir_path, dir_mtime, dirs, links,
+                         [(f.name, f.size, f.mtime) for f in files])
+
+    if links:
+        dirs = [name for name in dirs if name not in links]
+
+    stats.dirs += 1
+    stats.files += len(files)
+    return dirs, files, child_mtimes
+
+
+def walk_entries(top, stats=None, index=None, cancel=None, onerror=None):
+    """基于os.scandir的自顶向下遍历
+
+    与os.walk一样生成 (目录路径, 子目录名列表, 文件列表)，调用方可以原地修改
+    子目录名列表来跳过子目录；文件列表中是FileEntry，大小和修改时间来自
+    DirEntry缓存的stat数据。与os.walk(followlinks=False)一样不进入符号链接目录，
+    并且符号链接目录不列在子目录名列表中；Windows目录联接（junction）同样处理，
+    避免经由联接重复遍历同一目录。
+
+    传入index（ScanIndex）时，修改时间与索引记录一致的目录直接使用索引中的
+    内容而不枚举，其余目录枚举后写回索引。
+
+    传入cancel（CancelToken）时，取消后遍历立即结束；枚举到一半的目录
+    既不生成也不写入索引。onerror与os.walk相同，目录无法访问时以OSError调用。
+    """
+    if stats is None:
+        stats = WalkStats()
+    stack = [(top, None)]
+    while stack:
+        if cancel is not None and cancel.is_cancelled():
+            return
+        dir_path, dir_mtime = stack.pop()
+        try:
+            listing = list_dir(dir_path, dir_mtime, stats, index, cancel)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            continue
+        if listing is None:
+            return
+        dirs, files, child_mtimes = listing
+        yield dir_path, dirs, files
+
+        for name in reversed(dirs):
+            stack.append((os.path.join(dir_path, name), child_mtimes.get(name)))
+
+
+class _WalkNode:
+    """并行遍历中的一个目录，枚举结果在按顺序交付之前暂存在这里"""
+
+    __slots__ = ('path', 'mtime', 'data', 'parent', 'index', 'dirs', 'files', 'cost', 'error',
+                 'children', 'listed')
+
+    def __init__(self, path, mtime, data, parent=None, index=0):
+        self.path = path
+        self.mtime = mtime
+        self.data = data
+        self.parent = parent
+        self.index = index      # 在父目录children中的位置
+        self.dirs = None
+        self.files = None
+        self.cost = None        # 枚举该目录的开销（WalkStats增量）
+        self.error = None
+        self.children = None    # 要进入的子目录（_WalkNode列表）
+        self.listed = False
+
+
+class ParallelWalker:
+    """多线程目录遍历：工作窃取调度，结果按串行遍历的顺序交付
+
+    workers个线程并发枚举目录。每个线程把新发现的子目录压入自己的双端队列
+    并从同一端取出（深度优先，局部性好）；自己的队列空了就从其他线程队列的
+    另一端窃取最早压入的目录（通常是较浅、较大的子树），因此任意深度上的
+    大子树都能分散到多个线程，不会让一个线程独自遍历。
+
+    迭代时与walk_entries一样生成 (目录路径, 子目录名列表, 文件列表, data)，
+    顺序与walk_entries完全相同（先序），与线程调度无关。不同之处：
+    进入哪些子目录在枚举后立即由工作线程调用 expand(目录路径, 子目录名列表, data)
+    决定，它返回 [(子目录名, 子目录的data)]，迭代时修改子目录名列表不再生效；
+    未传入expand时进入所有子目录，data原样继承。data是调用方附在目录上的值，
+    根目录为root_data。目录无法访问时在它的交付位置调用 onerror(OSError, data)。
+
+    每个工作线程的统计在worker_stats中（可在遍历过程中读取），cost是最近
+    交付的目录的枚举开销。expand抛出的异常在迭代方重新抛出。
+    """
+
+    def __init__(self, top, workers=4, index=None, cancel=None, onerror=None, expand=None, root_data=None):
+        self.top = top
+        self.workers = max(1, workers)
+        self.index = index
+        self.cancel = cancel
+        self.onerror = onerror
+        self.expand = expand
+        self.root_data = root_data
+        self.worker_stats = [WalkStats() for _ in range(self.workers)]
+        self.cost = None
+        self.steals = 0             # 从其他线程队列窃取的目录数
+        self._cond = threading.Condition()
+        self._deques = [collections.deque() for _ in range(self.workers)]
+        self._outstanding = 0       # 已入队但尚未枚举完的目录数
+        self._stopped = False
+        self._failure = None
+
+    @property
+    def stats(self):
+        """各工作线程统计之和"""
+        total = WalkStats()
+        for stats in self.worker_stats:
+            total.merge(stats)
+        return total
+
+    def __iter__(self):
+        root = _WalkNode(self.top, None, self.root_data)
+        self._deques[0].append(root)
+        self._outstanding = 1
+        threads = [threading.Thread(target=self._worker, args=(slot,), daemon=True)
+                   for slot in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            node = root
+            while node is not None:
+                if self.cancel is not None and self.cancel.is_cancelled():
+                    break
+                with self._cond:
+                    while not node.listed and not self._stopped:
+                        self._cond.wait()
+                if not node.listed:
+                    break
+                self.cost = node.cost
+                if node.error is not None:
+                    if self.onerror is not None:
+                        self.onerror(node.error, node.data)
+                else:
+                    yield node.path, node.dirs, node.files, node.data
+                node.files = None
+                node = self._next(node)
+            if self._failure is not None:
+                raise self._failure
+        finally:
+            self._stop()
+            for thread in threads:
+                thread.join()
+
+    @staticmethod
+    def _next(node):
+        """先序遍历中的下一个目录；已交付完的子树不再保留"""
+        if node.children:
+            return node.children[0]
+        while node.parent is not None:
+            siblings = node.parent.children
+            siblings[node.index] = None
+            if node.index + 1 < len(siblings):
+                return siblings[node.index + 1]
+            node = node.parent
+        return None
+
+    def _stop(self, failure=None):
+        with self._cond:
+            if failure is not None and self._failure is None:
+                self._failure = failure
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _take(self, slot):
+        """取出下一个要枚举的目录（调用时持有self._cond）：先取自己队列的末端，再窃取"""
+        own = self._deques[slot]
+        if own:
+            return own.pop()
+        for offset in range(1, self.workers):
+            victim = self._deques[(slot + offset) % self.workers]
+            if victim:
+                self.steals += 1
+                return victim.popleft()
+        return None
+
+    def _worker(self, slot):
+        stats = self.worker_stats[slot]
+        cond = self._cond
+        while True:
+            with cond:
+                node = None
+                while not self._stopped and self._outstanding:
+                    node = self._take(slot)
+                    if node is not None:
+                        break
+                    cond.wait()
+                if node is None:
+                    return
+            if self.cancel is not None and self.cancel.is_cancelled():
+                self._stop()
+                return
+
+            snapshot = stats.copy()
+            children = []
+            try:
+                listing = list_dir(node.path, node.mtime, stats, self.index, self.cancel)
+                if listing is None:
+                    self._stop()
+                    return
+                node.dirs, node.files, child_mtimes = listing
+                if self.expand is not None:
+                    kept = self.expand(node.path, node.dirs, node.data)
+                else:
+                    kept = [(name, node.data) for name in node.dirs]
+                children = [_WalkNode(os.path.join(node.path, name), child_mtimes.get(name), data, node, i)
+                            for i, (name, data) in enumerate(kept)]
+            except OSError as e:
+                node.error = e
+            except Exception as exc:
+                self._stop(exc)
+                return
+            node.cost = stats.delta(snapshot)
+
+            with cond:
+                node.children = children
+                # 逆序压入，从末端取出时先处理第一个子目录
+                self._deques[slot].extend(reversed(children))
+                self._outstanding += len(children) - 1
+                node.listed = True
+                cond.notify_all()
+
+
+class DirSizes:
+    """目录子树大小缓存
+
+    遍历引擎自底向上汇总每个已遍历目录的子树大小和文件数，按规范化路径保存
+    (大小, 文件数, 是否完整)。子树中有目录未进入（被跳过、无法访问、超时或取消）
+    时记录为不完整。同一次扫描/清理会话中，模拟清理直接使用这里的结果，
+    不再重复遍历。这里是目录的实际大小；按目录汇总的扫描项使用规则独占的
+    部分（见ScanRule.size）。
+    """
+
+    def __init__(self):
+        self._sizes = {}
+
+    def put(self, path, size, file_count, complete):
+        self._sizes[_norm(path)] = (size, file_count, complete)
+
+    def get(self, path):
+        """返回 (大小, 文件数, 是否完整)，未遍历过时返回None"""
+        return self._sizes.get(_norm(path))
+
+    def complete_size(self, path):
+        """返回完整遍历过的目录的子树大小，否则返回None"""
+        totals = self._sizes.get(_norm(path))
+        if totals is None or not totals[2]:
+            return None
+        return totals[0]
+
+    def invalidate(self, path):
+        """路径内容发生变化（如已被清理）：删除该路径、其子目录以及各上级目录的记录"""
+        key = _norm(path)
+        for stale in [k for k in self._sizes if _is_under(k, key)]:
+            del self._sizes[stale]
+        parent = os.path.dirname(key)
+        while parent != key:
+            self._sizes.pop(parent, None)
+            key, parent = parent, os.path.dirname(parent)
+
+    def clear(self):
+        self._sizes.clear()
+
+
+class ScanRule:
+    """遍历规则：某个扫描器对一个根目录下文件的兴趣"""
+
+    def __init__(self, name, root, on_file, on_finish=None, prune=None, max_depth=None, min_size=0, policy=None,
+                 shared=False):
+        self.name = name            # 所属扫描器名称（用于日志）
+        self.root = os.path.normpath(root)
+        self.key = _norm(root)
+        self.on_file = on_file      # on_file(entry)，entry为FileEntry，返回False表示不接收；None表示只需要目录总大小（见DirSizes）
+        self.on_finish = on_finish  # 该规则的子树遍历完成后调用
+        self.prune = prune          # prune(dir_path) 返回True表示不进入该子目录
+        self.max_depth = max_depth  # 遍历的目录层数（根目录为第1层），None表示不限
+        self.min_size = min_size    # 小于该大小的文件不交给on_file
+        self.policy = policy        # 路径策略（PathPolicy），被禁止的目录不进入、其中的文件不计入
+        self.shared = shared        # 接收根目录下的所有文件，不参与按根目录深度的归属（如大文件的前K个）
+        self.failed = False
+        self.pending = 0            # 已排队但尚未处理、且本规则在其上生效的目录数
+        self.done = False
+        self.deadline = None        # 时间预算截止时刻（time.monotonic()），None表示不限
+        self.truncated = False      # 因超时或取消只遍历了部分子树
+        self.finished_at = None     # 完成时刻（time.monotonic()）
+        # 本规则独占的文件：嵌套在更深的其他规则根目录下的部分、单独登记过的文件不计入
+        self.size = 0
+        self.file_count = 0
+        self.complete = True        # 子树是否全部进入（没有因层数、跳过或无法访问而遗漏的目录）
+
+
+class _Finisher:
+    """依赖多条规则的汇总回调，所有依赖规则完成后调用"""
+
+    def __init__(self, name, callback, rules):
+        self.name = name
+        self.callback = callback
+        self.remaining = len(rules)
+
+
+def _owner_levels(rules):
+    """把一个目录上生效的规则按根目录由深到浅分组"""
+    if len(rules) == 1:
+        return [rules]
+    levels = {}
+    for rule in rules:
+        levels.setdefault(len(rule.key), []).append(rule)
+    return [levels[depth] for depth in sorted(levels, reverse=True)]
+
+
+class _GroupWalk:
+    """一个遍历组的遍历状态
+
+    遍历组作为一个任务遍历。估计耗时较长的组交给ParallelWalker由多个线程
+    并发枚举，但目录仍按先序逐个交付，规则的待处理目录计数、目录大小的
+    自底向上汇总和文件回调都只在该任务的线程中进行，与串行遍历的结果和
+    顺序完全相同，规则的回调无需考虑并发。
+    """
+
+    def __init__(self, engine, top, rules, split=False):
+        self.engine = engine
+        self.top = top
+        self.rules = rules
+        self.split = split      # 是否由多个线程并行遍历（线程数由线程池按并发上限分配）
+
+        # 从某目录开始生效的规则
+        self.starts = {}
+        for rule in rules:
+            self.starts.setdefault(rule.key, []).append(rule)
+
+        # 为了到达嵌套的根目录必须进入的目录
+        self.ancestors = set()
+        for start_key in self.starts:
+            child, parent = start_key, os.path.dirname(start_key)
+            while parent != child and _is_under(parent, top.key) and parent not in self.ancestors:
+                self.ancestors.add(parent)
+                child, parent = parent, os.path.dirname(parent)
+
+        # 自底向上汇总目录大小：key -> [父目录key, 大小, 文件数, 未完成的子目录数, 是否完整]
+        self.nodes = {}
+        self.counts = {}    # 扫描器名称 -> 本组的ScannerStats
+
+    def _add_node(self, key, size, file_count, children, complete):
+        parent = os.path.dirname(key)
+        self.nodes[key] = [parent if parent in self.nodes else None, size, file_count, children, complete]
+        if children == 0:
+            self._close_node(key)
+
+    def _close_node(self, key):
+        # 子树已全部处理，记录大小并计入上级目录
+        nodes = self.nodes
+        while key is not None:
+            parent, size, file_count, _, complete = nodes.pop(key)
+            self.engine.sizes.put(key, size, file_count, complete)
+            if parent is None:
+                return
+            node = nodes[parent]
+            node[1] += size
+            node[2] += file_count
+            node[3] -= 1
+            node[4] = node[4] and complete
+            key = parent if node[3] == 0 else None
+
+    def _fail_node(self, key):
+        # 无法访问的子目录：上级目录的汇总不再完整
+        parent = self.nodes.get(os.path.dirname(key))
+        if parent is not None:
+            parent[3] -= 1
+            parent[4] = False
+            if parent[3] == 0:
+                self._close_node(os.path.dirname(key))
+
+    def _finish(self, rules):
+        # 子树中已没有待处理目录的规则即已完成
+        for rule in rules:
+            rule.pending -= 1
+            if rule.pending == 0:
+                self.engine._rule_done(rule)
+
+    def finalize(self):
+        """遍历任务结束后调用：遍历被取消时，未处理完的目录按已汇总的部分记录为不完整"""
+        nodes = self.nodes
+        for key in sorted(nodes, key=len, reverse=True):
+            if key in nodes:
+                nodes[key][3] = 0
+                nodes[key][4] = False
+                self._close_node(key)
+
+    def _charge(self, rules, cost, file_list, size):
+        """把一个目录的开销计入在该目录上生效的各扫描器（每个扫描器只计一次）"""
+        counts = self.counts
+        for name in {rule.name for rule in rules}:
+            scanner_stats = counts.get(name)
+            if scanner_stats is None:
+                scanner_stats = counts[name] = ScannerStats()
+            scanner_stats.add_walk(cost)
+            if file_list is not None:
+                scanner_stats.dirs += 1
+                scanner_stats.files += len(file_list)
+                scanner_stats.bytes += size
+
+    def _children(self, dir_path, current, dirs):
+        """决定进入哪些子目录，返回 [(子目录名, 在该子目录上生效的规则)]"""
+        # 超出时间预算的规则不再收集文件，也不再进入子目录
+        now = None
+        for rule in current:
+            if rule.deadline is not None and not rule.truncated:
+                if now is None:
+                    now = time.monotonic()
+                if now > rule.deadline:
+                    rule.truncated = True
+                    logger.warning(f"扫描器 {rule.name} 超出时间预算，{rule.root} 只返回部分结果")
+
+        kept = []
+        for d in dirs:
+            child = os.path.join(dir_path, d)
+            child_key = _norm(child)
+            child_rules = [r for r in current
+                           if not r.failed and not r.truncated
+                           and (r.max_depth is None or _depth(child_key, r.key) < r.max_depth)
+                           and (r.prune is None or not r.prune(child))
+                           and (r.policy is None or r.policy.enters(child))]
+            if len(child_rules) < len(current):
+                for rule in current:
+                    if rule not in child_rules:
+                        rule.complete = False
+            child_rules.extend(self.starts.get(child_key, ()))
+            if child_rules or child_key in self.ancestors:
+                kept.append((d, child_rules))
+        return kept
+
+    def _deliver(self, dir_path, current, dirs, files, kept, cost):
+        """处理一个目录：分发文件、登记要进入的子目录、汇总大小并完成规则"""
+        dir_key = _norm(dir_path)
+        own_size = sum(entry.size for entry in files)
+        self._charge(current, cost, files, own_size)
+
+        # 文件只归属根目录最深的规则：嵌套的根目录独占其子树，
+        # 单独登记过的文件（见TraversalEngine.claim）也不再计入所在目录的规则。
+        # 最深的规则按文件类型、年龄等条件不接收的文件交给根目录次深的规则，
+        # 依此类推，与各规则分别遍历时一样计入外层规则的类别。
+        # 共享规则不参与归属，接收目录中的所有文件
+        owners_rules = current
+        if any(rule.shared for rule in current):
+            owners_rules = [rule for rule in current if not rule.shared]
+            for rule in current:
+                if rule.shared:
+                    self._deliver_to(rule, dir_path, files)
+        owned = files
+        claimed = self.engine.claimed_files.get(dir_key)
+        if claimed:
+            owned = [entry for entry in files if os.path.normcase(entry.name) not in claimed]
+        for owners in _owner_levels(owners_rules) if owners_rules else ():
+            refused = None
+            for rule in owners:
+                rule_refused = self._deliver_to(rule, dir_path, owned)
+                refused = rule_refused if refused is None else [entry for entry in refused if entry in rule_refused]
+            if not refused:
+                break
+            owned = refused
+        for _, child_rules in kept:
+            for rule in child_rules:
+                rule.pending += 1
+        if cost.errors:
+            for rule in current:
+                rule.complete = False
+        complete = len(kept) == len(dirs) and cost.errors == 0
+        self._add_node(dir_key, own_size, len(files), len(kept), complete)
+        self._finish(current)
+
+    def _deliver_to(self, rule, dir_path, files):
+        """把文件交给一条规则并计入其大小，返回规则不接收的文件"""
+        policy = rule.policy
+        if policy is not None:
+            if not policy.allows_files(dir_path):
+                return []
+            if policy.filters_names:
+                files = [entry for entry in files if policy.allows_file_name(entry.name)]
+        refused = []
+        if rule.on_file is not None and not rule.failed and not rule.truncated:
+            refused = self.engine._dispatch_files(rule, files)
+        rule.size += sum(entry.size for entry in files) - sum(entry.size for entry in refused)
+        rule.file_count += len(files) - len(refused)
+        return refused
+
+    def _fail(self, error, failed, cost):
+        # 无法访问的目录：开销计入相关扫描器，并视为已处理
+        self._charge(failed, cost, None, 0)
+        for rule in failed:
+            rule.complete = False
+        if error.filename:
+            self._fail_node(_norm(error.filename))
+        self._finish(failed)
+
+    def walk(self, workers=1):
+        """遍历整个组（顶层目录上生效的规则已计入待处理目录数），返回本组的WalkStats
+
+        workers为并行遍历的线程数，由线程池按本任务占用的并发名额传入，与其他
+        遍历任务共用同一个并发上限；只有一个名额时串行遍历。
+        """
+        rules = self.starts.get(self.top.key, [])
+        if workers > 1:
+            return self._walk_parallel(rules, workers)
+        return self._walk_serial(rules)
+
+    def _walk_serial(self, rules):
+        engine = self.engine
+        stats = WalkStats()
+        engine._live_stats.append(stats)
+        snapshot = [stats.copy()]
+
+        def cost_since_snapshot():
+            cost = stats.delta(snapshot[0])
+            snapshot[0] = stats.copy()
+            return cost
+
+        def onerror(error):
+            failed_key = _norm(error.filename) if error.filename else None
+            self._fail(error, active.pop(failed_key, []) if failed_key else [], cost_since_snapshot())
+
+        active = {self.top.key: rules}
+        for dir_path, dirs, files in walk_entries(self.top.root, stats, engine.index, engine.cancel, onerror):
+            current = active.pop(_norm(dir_path), [])
+            cost = cost_since_snapshot()
+            kept = self._children(dir_path, current, dirs)
+            for d, child_rules in kept:
+                active[_norm(os.path.join(dir_path, d))] = child_rules
+            self._deliver(dir_path, current, dirs, files, kept, cost)
+            dirs[:] = [d for d, _ in kept]
+        return stats
+
+    def _walk_parallel(self, rules, workers):
+        engine = self.engine
+
+        def expand(dir_path, dirs, data):
+            # 在工作线程中决定要进入的子目录，结果留给按顺序交付时使用
+            data[1] = self._children(dir_path, data[0], dirs)
+            return [(d, [child_rules, None]) for d, child_rules in data[1]]
+
+        def onerror(error, data):
+            self._fail(error, data[0], walker.cost)
+
+        walker = ParallelWalker(self.top.root, workers, engine.index, engine.cancel, onerror, expand,
+                                [rules, None])
+        engine._live_stats.extend(walker.worker_stats)
+        for dir_path, dirs, files, (current, kept) in walker:
+            self._deliver(dir_path, current, dirs, files, kept, walker.cost)
+        return walker.stats
+
+
+class TraversalEngine:
+    """单次遍历引擎
+
+    每条规则的子树遍历完成后立即调用其on_finish，不必等待同组其他规则
+    或其他遍历组，调用方可以据此尽早推送部分结果。
+
+    cancel（CancelToken）取消后所有遍历组尽快结束；budgets为 {扫描器名称: 秒数}，
+    超出时间预算的扫描器停止收集，已收集的部分结果照常汇总并标记为truncated。
+    max_depth、min_size和policy是各规则默认的深度限制、最小文件大小和路径策略（见ScanRule）。
+
+    传入history（ScanHistory）时，遍历组按以往的耗时从长到短提交，估计耗时
+    远超平均份额的遍历组由ParallelWalker多线程遍历；本次的耗时记录在task_durations中。
+    """
+
+    def __init__(self, index=None, cancel=None, budgets=None, sizes=None, max_depth=None, min_size=0,
+                 history=None, policy=None):
+        self.index = index   # 可选的ScanIndex，用于增量扫描
+        self.cancel = cancel
+        self.sizes = sizes if sizes is not None else DirSizes()   # 目录子树大小，规则汇总时可用
+        self.budgets = budgets or {}
+        self.max_depth = max_depth
+        self.min_size = min_size or 0
+        self.policy = policy
+        self.rules = []
+        self.finishers = []
+        self.stats = WalkStats()
+        self.scanner_stats = {}   # 扫描器名称 -> ScannerStats
+        self.started = None       # 遍历开始时刻（time.monotonic()）
+        self.concurrency = None   # 并发调度统计（磁盘类型、选择的并发数、调整记录）
+        self.history = history    # 可选的ScanHistory，用于最长任务优先调度和并行遍历
+        self.task_durations = {}  # 本次各遍历组的耗时 {规范化根目录: 秒}
+        self.split_min_seconds = SPLIT_MIN_SECONDS
+        self._live_stats = []     # 各遍历组的WalkStats，用于运行中采样吞吐量
+        self.claimed = {}         # 本次扫描已登记的路径 {比较键（见canonical_path）: 登记者}
+        self.claimed_files = {}   # 单独登记的文件 {所在目录的比较键: {文件名的比较键}}
+        self._waiting = {}   # 规则 -> 依赖它的_Finisher列表
+        self._lock = threading.Lock()
+
+    def claim(self, path, owner, is_file=False):
+        """登记本次扫描要处理的路径，返回其真实路径；已被登记过时返回None
+
+        所有扫描器共用这一份登记：同一目录或文件的不同写法（大小写、符号链接、
+        目录联接、短文件名）只有第一个登记者有效，不会被重复遍历或重复计入。
+        单独登记的文件（is_file=True）即使位于其他规则的遍历范围内，也只归属登记者。
+        """
+        real, key = canonical_path(path)
+        with self._lock:
+            first = self.claimed.get(key)
+            if first is None:
+                self.claimed[key] = owner
+                if is_file:
+                    parent, name = os.path.split(key)
+                    self.claimed_files.setdefault(parent, set()).add(name)
+        if first is not None:
+            logger.info(f"{path} 与 {first} 登记的路径相同，跳过")
+            return None
+        return real
+
+    def add_rule(self, name, root, on_file, on_finish=None, prune=None, max_depth=None, min_size=None,
+                 policy=None, shared=False):
+        """登记一条遍历规则
+
+        root应为claim()返回的真实路径。根目录嵌套时，内层根目录下的文件只归属
+        内层的规则；on_file返回False的文件交给外层的规则。on_file为None的规则不接收文件，on_finish中通过rule.size、
+        rule.file_count取得其独占部分的总大小和文件数。shared=True的规则不参与归属，
+        接收根目录下的所有文件（含嵌套根目录下和单独登记过的文件）。
+        policy（PathPolicy）按目录判断一次：整个子树被禁止的目录不进入，
+        被禁止目录中的文件、按名称禁止的文件不交给on_file、也不计入大小。
+        max_depth/min_size/policy为None时使用引擎的默认值。
+        """
+        rule = ScanRule(name, root, on_file, on_finish, prune,
+                        self.max_depth if max_depth is None else max_depth,
+                        self.min_size if min_size is None else min_size,
+                        self.policy if policy is None else policy, shared)
+        self.rules.append(rule)
+        return rule
+
+    def add_finisher(self, name, callback, rules):
+        """登记一个依赖多条规则的汇总回调（用于跨多个根目录的扫描器）"""
+        finisher = _Finisher(name, callback, rules)
+        self.finishers.append(finisher)
+        for rule in rules:
+            self._waiting.setdefault(rule, []).append(finisher)
+
+    def scanner(self, name):
+        """取得某个扫描器的统计，不存在时创建"""
+        with self._lock:
+            scanner_stats = self.scanner_stats.get(name)
+            if scanner_stats is None:
+                scanner_stats = self.scanner_stats[name] = ScannerStats()
+            return scanner_stats
+
+    def scanner_report(self):
+        """各扫描器的统计，wall_time包含从遍历开始到其最后一条规则完成的时间"""
+        for scanner_stats in self.scanner_stats.values():
+            scanner_stats.wall_time = scanner_stats.planning_time
+        for rule in self.rules:
+            if rule.finished_at is not None and self.started is not None:
+                scanner_stats = self.scanner(rule.name)
+                scanner_stats.wall_time = max(scanner_stats.wall_time,
+                                              scanner_stats.planning_time + rule.finished_at - self.started)
+        return self.scanner_stats
+
+    def plan(self):
+        """把互相嵌套的根目录合并成遍历组，返回 [(顶层规则, 组内规则列表)]"""
+        groups = []
+        for rule in sorted(self.rules, key=lambda r: r.key.split(os.sep)):
+            if groups and _is_under(rule.key, groups[-1][0].key):
+                groups[-1][1].append(rule)
+            else:
+                groups.append((rule, [rule]))
+        return groups
+
+    def run(self, max_workers=None):
+        """并发遍历所有组，每条规则完成时调用其汇总回调
+
+        max_workers为None时按磁盘类型自适应调整并发数（见worker_pool），
+        否则使用固定的并发数。
+        """
+        groups = self.plan()
+        logger.info(f"遍历规则 {len(self.rules)} 条，合并为 {len(groups)} 个遍历组")
+
+        self.started = time.monotonic()
+        for rule in self.rules:
+            budget = self.budgets.get(rule.name)
+            if budget is not None:
+                rule.deadline = self.started + budget
+
+        for finisher in self.finishers:
+            if finisher.remaining == 0:
+                self._call(finisher.name, finisher.callback)
+
+        storage = probe_storage(groups[0][0].root) if groups else 'unknown'
+        controller = ConcurrencyController(storage, fixed=max_workers)
+
+        def progress():
+            return sum(stats.dirs + stats.files for stats in list(self._live_stats))
+
+        pool = AdaptivePool(controller, progress)
+
+        # 最长任务优先：按以往耗时的估计值提交，估计耗时超过平均份额的遍历组由多个线程并行遍历
+        estimates = [self._estimate(top, rules) for top, rules in groups]
+        known = [estimate for estimate in estimates if estimate is not None]
+        split_at = max(self.split_min_seconds, sum(known) / controller.limit) if known else None
+        split_count = 0
+        for (top, rules), estimate in zip(groups, estimates):
+            split = split_at is not None and estimate is not None and estimate >= split_at
+            split_count += split
+            walk = _GroupWalk(self, top, rules, split)
+            for rule in walk.starts.get(top.key, []):
+                rule.pending += 1
+            self._submit(pool, walk, estimate or 0.0)
+
+        queue_stats = pool.run()
+        self.concurrency = controller.to_dict()
+        self.concurrency.update(queue_stats)
+        self.concurrency['split_groups'] = split_count
+        logger.info(f"遍历并发: 磁盘类型 {storage}, 初始 {controller.initial}, "
+                    f"最终 {controller.limit}, 最高 {controller.peak}, 并行遍历组 {split_count} 个")
+
+    def _estimate(self, top, rules):
+        """遍历组的估计耗时：以往该组的耗时，否则取组内扫描器以往耗时的最大值，没有记录时返回None"""
+        if self.history is None:
+            return None
+        estimate = self.history.task_estimate(top.key)
+        if estimate is None:
+            known = [self.history.scanner_estimate(rule.name) for rule in rules]
+            known = [seconds for seconds in known if seconds is not None]
+            estimate = max(known) if known else None
+        return estimate
+
+    def _submit(self, pool, walk, priority):
+        """提交一个遍历组任务"""
+        def callback(stats, error, seconds):
+            self._group_done(walk, stats, error, seconds)
+
+        # 并行遍历的组占用当前并发上限内的全部名额，其线程不再叠加在其他任务之上
+        slots = pool.controller.maximum if walk.split else 1
+        pool.submit(walk.walk, callback, priority, slots)
+
+    def _group_done(self, walk, stats, error, seconds):
+        """遍历组任务完成（在调用run()的线程中）：合并统计并收尾"""
+        if error is None:
+            self.stats.merge(stats)
+        else:
+            logger.error(f"遍历 {walk.top.root} 出错: {error}")
+        for name, counts in walk.counts.items():
+            self.scanner(name).merge(counts)
+        walk.finalize()
+        self.task_durations[walk.top.key] = seconds
+        logger.info(f"遍历组 {walk.top.root} 完成")
+        # 根目录不存在、目录无法访问、遍历出错或被取消时，剩余规则在这里收尾
+        cancelled = self.cancelled
+        for rule in walk.rules:
+            if cancelled and not rule.done:
+                rule.truncated = True
+            self._rule_done(rule)
+
+    @property
+    def cancelled(self):
+        return self.cancel is not None and self.cancel.is_cancelled()
+
+    def _rule_done(self, rule):
+        """标记规则完成，调用其汇总回调以及已满足依赖的多规则回调"""
+        ready = []
+        with self._lock:
+            if rule.done:
+                return
+            rule.done = True
+            rule.finished_at = time.monotonic()
+            for finisher in self._waiting.get(rule, ()):
+                finisher.remaining -= 1
+                if finisher.remaining == 0:
+                    ready.append(finisher)
+
+        # 出错的规则只保留出错前收集到的结果
+        if rule.on_finish:
+            self._call(rule.name, rule.on_finish)
+        for finisher in ready:
+            self._call(finisher.name, finisher.callback)
+
+    @staticmethod
+    def _call(name, callback):
+        try:
+            callback()
+        except Exception as exc:
+            logger.error(f"扫描器 {name} 汇总结果出错: {exc}")
+
+    def _dispatch_files(self, rule, files):
+        """把一个目录中的文件分发给规则，小于规则最小文件大小的文件不产生回调
+
+        返回on_file不接收（返回False）的文件。
+        """
+        refused = []
+        min_size = rule.min_size
+        for entry in files:
+            if entry.size >= min_size and self._dispatch(rule, entry) is False:
+                refused.append(entry)
+        return refused
+
+    @staticmethod
+    def _dispatch(rule, entry):
+        """调用规则的文件回调并返回其结果，出错时停用该规则"""
+        if rule.failed or rule.truncated:
+            return None
+        try:
+            return rule.on_file(entry)
+        except Exception as exc:
+            rule.failed = True
+            logger.error(f"规则 {rule.name} ({rule.root}) 处理文件 {entry.path} 出错: {exc}")
+            return None
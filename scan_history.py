@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 扫描耗时记录
+
+保存以往扫描中各扫描器和各遍历组（按根目录）的耗时，下次扫描时
+遍历引擎据此把耗时最长的任务最先提交（最长任务优先），并把耗时远超
+平均份额的遍历组由多个线程并行遍历，缩短整体完成时间。
+
+耗时按指数加权平均更新，目录内容变化后估计值会逐步跟上。
+"""
+
+import os
+import json
+import logging
+
+from scan_index import default_index_path
+
+logger = logging.getLogger('CCleaner')
+
+# 指数加权平均中新测量值的权重
+SMOOTHING = 0.5
+# 最多保留的遍历任务记录数（按耗时保留最长的）
+MAX_TASKS = 2000
+
+
+def default_history_path():
+    """默认位置：与扫描索引同目录下的 scan_history.json"""
+    return os.path.join(os.path.dirname(default_index_path()), 'scan_history.json')
+
+
+class ScanHistory:
+    """以往扫描的耗时记录：scanners为 {扫描器名称: 秒}，tasks为 {遍历组的规范化根目录: 秒}"""
+
+    def __init__(self, path=None):
+        self.path = path or default_history_path()
+        self.scanners = {}
+        self.tasks = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.scanners = dict(data.get('scanners', {}))
+            self.tasks = dict(data.get('tasks', {}))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"无法读取扫描耗时记录，将按默认顺序扫描: {e}")
+
+    def save(self):
+        if len(self.tasks) > MAX_TASKS:
+            longest = sorted(self.tasks.items(), key=lambda kv: kv[1], reverse=True)[:MAX_TASKS]
+            self.tasks = dict(longest)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'scanners': self.scanners, 'tasks': self.tasks}, f, ensure_ascii=False)
+            return True
+        except OSError as e:
+            logger.warning(f"保存扫描耗时记录失败: {e}")
+            return False
+
+    def task_estimate(self, key, default=None):
+        return self.tasks.get(key, default)
+
+    def scanner_estimate(self, name, default=None):
+        return self.scanners.get(name, default)
+
+    def record_task(self, key, seconds):
+        self.tasks[key] = _smooth(self.tasks.get(key), seconds)
+
+    def record_scanner(self, name, seconds):
+        self.scanners[name] = _smooth(self.scanners.get(name), seconds)
+
+
+def _smooth(old, new):
+    if old is None:
+        return round(new, 4)
+    return round(old + SMOOTHING * (new - old), 4)
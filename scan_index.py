@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 持久化扫描索引
+
+用SQLite记录每个已遍历目录的修改时间、子目录列表以及其中文件的大小和
+修改时间。再次扫描时，修改时间未变化的目录直接从索引取出内容，不再枚举；
+只有修改时间变化的目录才重新列出。
+
+目录的修改时间只在其中的条目被新建、删除或重命名时更新，就地改写或追加
+已有文件（如日志）不会更新。命中索引的目录中的文件不再逐个stat，大小和修改
+时间直接取自索引（见scan_engine.list_dir），这正是增量扫描省下的开销；代价是
+这类就地变化要到目录本身变化或记录超过 max_age 秒（默认一天）重新枚举后才
+反映在结果中。清理前clean_selected会逐项stat校验，不会按过期的大小清理；
+需要与完整扫描完全一致时可先调用 CleanerLogic.clear_scan_index()，或关闭
+scan_index 选项（命令行 --no-index）。
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger('CCleaner')
+
+# 目录修改时间与记录时间相差小于该值（纳秒）时，认为记录可能不完整（同一时间
+# 粒度内的后续修改不会改变目录修改时间），下次扫描仍重新枚举
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    scanned_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL,
+    links TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    dir_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (dir_id, name)
+) WITHOUT ROWID;
+"""
+
+
+def _now_ns():
+    return int(time.time() * 1e9)
+
+
+def default_index_path():
+    """默认索引位置：%LOCALAPPDATA%\\CCleaner\\scan_index.db"""
+    base = os.environ.get('LOCALAPPDATA') or tempfile.gettempdir()
+    return os.path.join(base, 'CCleaner', 'scan_index.db')
+
+
+class ScanIndex:
+    """目录级扫描索引
+
+    lookup() 在遍历线程中调用（加锁读取）；record() 先缓存在内存中，
+    flush() 时在一个事务中统一写入。
+    """
+
+    def __init__(self, path=None, max_age=24 * 3600):
+        self.path = path or default_index_path()
+        self.max_age_ns = int(max_age * 1e9) if max_age else None
+        import sqlite3    # 只有扫描时才需要，不拖慢启动
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._now_ns = _now_ns()
+
+    @staticmethod
+    def _key(dir_path):
+        return os.path.normcase(os.path.normpath(dir_path))
+
+    def lookup(self, dir_path, mtime_ns):
+        """目录修改时间与记录一致时返回 (子目录名列表, 符号链接子目录名集合, [(文件名, 大小, 修改时间)])，否则返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, mtime_ns, scanned_ns, subdirs, links FROM dirs WHERE path = ?",
+                (self._key(dir_path),)
+            ).fetchone()
+            if row is None:
+                return None
+            dir_id, stored_mtime, scanned_ns, subdirs, links = row
+            if stored_mtime != mtime_ns or scanned_ns - mtime_ns < RACY_WINDOW_NS:
+                return None
+            if self.max_age_ns is not None and self._now_ns - scanned_ns > self.max_age_ns:
+                return None
+            files = self._conn.execute(
+                "SELECT name, size, mtime FROM files WHERE dir_id = ?", (dir_id,)
+            ).fetchall()
+        return json.loads(subdirs), set(json.loads(links)), files
+
+    def record(self, dir_path, mtime_ns, subdirs, links, files):
+        """缓存一个目录的枚举结果，files为 [(文件名, 大小, 修改时间)]"""
+        self._pending.append((self._key(dir_path), mtime_ns, _now_ns(), list(subdirs), sorted(links), files))
+
+    def flush(self):
+        """把缓存的目录记录写入数据库，并删除已消失的子目录记录"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        with self._lock, self._conn:
+            for key, mtime_ns, scanned_ns, subdirs, links, files in pending:
+                row = self._conn.execute("SELECT id, subdirs FROM dirs WHERE path = ?", (key,)).fetchone()
+                if row is None:
+                    cur = self._conn.execute(
+                        "INSERT INTO dirs (path, mtime_ns, scanned_ns, subdirs, links) VALUES (?, ?, ?, ?, ?)",
+                        (key, mtime_ns, scanned_ns, json.dumps(subdirs), json.dumps(links))
+                    )
+                    dir_id = cur.lastrowid
+                else:
+                    dir_id, old_subdirs = row
+                    self._conn.execute(
+                        "UPDATE dirs SET mtime_ns = ?, scanned_ns = ?, subdirs = ?, links = ? WHERE id = ?",
+                        (mtime_ns, scanned_ns, json.dumps(subdirs), json.dumps(links), dir_id)
+                    )
+                    self._conn.execute("DELETE FROM files WHERE dir_id = ?", (dir_id,))
+                    current = {os.path.normcase(name) for name in subdirs}
+                    for name in json.loads(old_subdirs):
+                        if os.path.normcase(name) not in current:
+                            self._delete_subtree(os.path.join(key, os.path.normcase(name)))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files (dir_id, name, size, mtime) VALUES (?, ?, ?, ?)",
+                    ((dir_id, name, size, mtime) for name, size, mtime in files)
+                )
+        logger.info(f"扫描索引已更新 {len(pending)} 个目录")
+
+    def _delete_subtree(self, key):
+        """删除某目录及其所有子目录的记录"""
+        prefix = key + os.sep
+        upper = key + chr(ord(os.sep) + 1)
+        where = "path = ? OR (path >= ? AND path < ?)"
+        self._conn.execute(
+            f"DELETE FROM files WHERE dir_id IN (SELECT id FROM dirs WHERE {where})",
+            (key, prefix, upper)
+        )
+        self._conn.execute(f"DELETE FROM dirs WHERE {where}", (key, prefix, upper))
+
+    def clear(self):
+        """清空索引，下次扫描重新枚举所有目录"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM dirs")
+
+    def close(self):
+        self.flush()
+        self._conn.close()
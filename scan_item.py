@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 扫描项目
+
+扫描得到的每个可清理项目用ScanItem表示：固定的几个槽位，修改时间为整数秒，
+类别名称经过驻留，数十万个临时/缓存文件也只占很少的内存。
+
+每个项目同时记录扫描时的 (大小, 修改时间, 文件ID)，清理前用一次stat
+即可判断项目是否已变化（见matches），不必重新扫描。
+
+ScanItem同时提供只读的字典接口（item['path']、item.get('modified')、
+dict(item)），仍按字典使用扫描结果的代码无需修改。
+"""
+
+import os
+import sys
+import stat
+import datetime
+
+
+class ScanItem:
+    """可清理项目：路径、大小、类别，以及可选的修改时间、子类型等信息"""
+
+    __slots__ = ('path', 'size', 'type', 'mtime', 'subtype', 'file_count', 'truncated', 'ino', 'tree_size')
+
+    def __init__(self, path, size, type, mtime=0, subtype=None, file_count=None, truncated=False, ino=0,
+                 tree_size=None):
+        self.path = path
+        self.size = size
+        self.type = sys.intern(type)    # 同一类别的所有项目共享同一个字符串
+        self.mtime = int(mtime)         # 修改时间（秒），0表示未知（如按目录汇总的项目）
+        self.subtype = subtype
+        self.file_count = file_count
+        self.truncated = truncated      # 因超时或取消只统计了部分内容
+        self.ino = ino                  # inode/文件ID，0表示未知
+        # 按目录汇总的项目：扫描时完整统计的整个子树的实际大小（含嵌套的其他规则根目录），
+        # 清理时删除的是整个子树；None表示未知
+        self.tree_size = tree_size
+
+    def matches(self, st):
+        """当前的stat结果与扫描时记录的快照是否一致
+
+        比较修改时间（秒）和文件ID（双方都已知时）；文件还比较大小。目录的大小
+        是整个子树的汇总，只能按目录自身的修改时间判断（只反映直接子项的增删）。
+        """
+        if self.ino and st.st_ino and st.st_ino != self.ino:
+            return False
+        if int(st.st_mtime) != self.mtime:
+            return False
+        return stat.S_ISDIR(st.st_mode) or st.st_size == self.size
+
+    @property
+    def modified(self):
+        """格式化的修改时间，只在需要显示时生成"""
+        return datetime.datetime.fromtimestamp(self.mtime).strftime('%Y-%m-%d %H:%M:%S')
+
+    @property
+    def extension(self):
+        _, ext = os.path.splitext(self.path)
+        return ext.lower() if ext else ''
+
+    def keys(self):
+        """字典视图中的键，与原先字典形式的扫描项目一致"""
+        keys = ['path', 'size', 'type']
+        if self.type == 'large_files':
+            keys += ['modified', 'extension']
+        if self.subtype is not None:
+            keys.append('subtype')
+        if self.file_count is not None:
+            keys.append('file_count')
+        if self.truncated:
+            keys.append('truncated')
+        return keys
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.keys() else default
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"ScanItem({self.path!r}, {self.size}, {self.type!r})"
+
+
+def as_scan_item(item):
+    """把字典形式的扫描项目转换为ScanItem，已是ScanItem时原样返回"""
+    if isinstance(item, ScanItem):
+        return item
+    return ScanItem(
+        item['path'],
+        item.get('size', 0),
+        item.get('type', 'unknown'),
+        item.get('mtime', 0),
+        subtype=item.get('subtype'),
+        file_count=item.get('file_count'),
+        truncated=item.get('truncated', False),
+        ino=item.get('ino', 0),
+        tree_size=item.get('tree_size')
+    )
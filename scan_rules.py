@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 清理规则注册表
+
+每个清理类别由一条或多条声明式规则描述：扫描路径（来自config.py，支持
+%环境变量%、~ 和通配符）、文件类型（config.CLEANABLE_FILE_TYPES中的标签）、
+最小文件年龄、项目粒度（逐文件或按目录汇总）以及默认是否选中。
+CleanerLogic.scan_system 把所有规则一起交给遍历引擎规划，共享的根目录只遍历
+一次；新增类别只需在这里登记规则，不会增加一次完整遍历。
+"""
+
+import os
+import re
+import glob
+
+import config
+
+# 结果中的类别（按界面显示顺序）及其默认是否选中
+CATEGORIES = [
+    # 基本清理
+    ('temp', True),             # 临时文件
+    ('recycle', True),          # 回收站
+    ('cache', True),            # 浏览器缓存
+    ('logs', True),             # 系统日志
+    ('updates', True),          # Windows更新缓存
+    ('thumbnails', True),       # 缩略图缓存
+
+    # 扩展清理
+    ('prefetch', True),         # 预读取文件
+    ('old_windows', True),      # 旧Windows文件
+    ('error_reports', True),    # 错误报告
+    ('service_packs', True),    # 服务包备份
+    ('memory_dumps', True),     # 内存转储文件
+    ('font_cache', True),       # 字体缓存
+    ('disk_cleanup', True),     # 磁盘清理备份
+
+    # 新增安全清理项
+    ('app_cache', True),        # 应用程序缓存
+    ('media_cache', True),      # 媒体播放器缓存
+    ('search_index', True),     # 搜索索引临时文件
+    ('backup_temp', True),      # 备份临时文件
+    ('update_temp', True),      # 更新临时文件
+    ('driver_backup', True),    # 驱动备份
+    ('app_crash', True),        # 应用程序崩溃转储
+    ('app_logs', True),         # 应用程序日志
+    ('recent_items', True),     # 最近使用的文件列表缓存
+    ('notification', True),     # Windows通知缓存
+    ('dns_cache', True),        # DNS缓存
+    ('printer_temp', True),     # 打印机临时文件
+    ('device_temp', True),      # 设备临时文件
+    ('windows_defender', True), # Windows Defender缓存
+    ('store_cache', True),      # Windows Store缓存
+    ('onedrive_cache', True),   # OneDrive缓存
+
+    # 新增用户请求的清理项
+    ('downloads', False),       # 下载文件夹(安全版)
+    ('installer_cache', True),  # 安装程序缓存(安全版)
+    ('delivery_opt', True),     # Windows传递优化缓存
+
+    # 大文件扫描
+    ('large_files', False),     # 大文件
+]
+
+DEFAULT_SELECTION = dict(CATEGORIES)
+
+# 项目粒度
+ITEM_FILES = 'files'          # 目录中每个符合条件的文件是一个项目；路径本身是文件时即为一个项目
+ITEM_DIR_TOTAL = 'dir_total'  # 整个目录按总大小作为一个项目
+ITEM_ENTRY = 'entry'          # 路径是文件时为文件项目，是目录时按目录总大小汇总
+
+_ENV_VAR = re.compile(r'%([^%]+)%')
+
+
+class CleanupRule:
+    """一条声明式清理规则"""
+
+    def __init__(self, name, category, paths=(), item=ITEM_FILES, file_type=None, min_age_days=None,
+                 subtype=None, count_files=False, planner=None, enabled=True):
+        self.name = name                  # 规则名称（扫描统计、时间预算使用）
+        self.category = category          # 结果中的类别
+        self.paths = list(paths)          # 扫描路径模板
+        self.item = item                  # 项目粒度：ITEM_FILES / ITEM_DIR_TOTAL / ITEM_ENTRY
+        self.file_type = file_type        # 文件类型标签（config.CLEANABLE_FILE_TYPES）
+        self.min_age_days = min_age_days  # 最小文件年龄（天）
+        # 同时设置file_type和min_age_days时，满足任一条件即可；
+        # subtype为字符串，或 (按类型命中时的子类型, 仅按年龄命中时的子类型)
+        self.subtype = subtype
+        self.count_files = count_files    # 按目录汇总的项目是否记录文件数
+        self.planner = planner            # 无法声明式描述的规则：CleanerLogic上的规划方法名
+        self.enabled = enabled
+
+    @property
+    def filtered(self):
+        """是否需要逐文件判断"""
+        return self.file_type is not None or self.min_age_days is not None or self.subtype is not None
+
+    def patterns(self):
+        """展开环境变量后仍含通配符的路径"""
+        patterns = []
+        for template in self.paths:
+            path = expand_path(template)
+            if path is not None and glob.has_magic(path):
+                patterns.append(path)
+        return patterns
+
+    def expand_paths(self, expansions=None):
+        """展开路径模板：环境变量、~、路径分隔符和通配符；引用了未设置的环境变量的路径被跳过
+
+        expansions为GlobPlanner.expand()的结果时，通配符直接取其中的匹配结果。
+        """
+        paths = []
+        for template in self.paths:
+            path = expand_path(template)
+            if path is None:
+                continue
+            if glob.has_magic(path):
+                if expansions is not None and path in expansions:
+                    paths.extend(expansions[path])
+                else:
+                    paths.extend(sorted(glob.glob(path)))
+            else:
+                paths.append(path)
+        return paths
+
+
+def expand_path(template):
+    """展开 %变量%、~ 并统一路径分隔符，变量未设置或为空时返回None"""
+    missing = []
+
+    def replace(match):
+        value = os.environ.get(match.group(1))
+        if not value:
+            missing.append(match.group(1))
+            return ''
+        return value
+
+    path = _ENV_VAR.sub(replace, template)
+    if missing:
+        return None
+    path = path.replace('\\', os.sep)
+    return os.path.expanduser(path)
+
+
+RULES = [
+    CleanupRule('temp_files', 'temp', config.TEMP_PATHS),
+    CleanupRule('recycle_bin', 'recycle', config.RECYCLE_BIN_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('browser_cache', 'cache', config.BROWSER_CACHE_PATHS.values(), item=ITEM_DIR_TOTAL),
+    CleanupRule('system_logs', 'logs', config.SYSTEM_LOG_PATHS, file_type='logs'),
+    CleanupRule('windows_updates', 'updates', config.WINDOWS_UPDATE_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('thumbnails_cache', 'thumbnails', config.THUMBNAIL_CACHE_PATHS),
+    CleanupRule('prefetch', 'prefetch', config.PREFETCH_PATHS, file_type='prefetch'),
+    CleanupRule('old_windows', 'old_windows', config.OLD_WINDOWS_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('error_reports', 'error_reports', config.ERROR_REPORT_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('service_packs', 'service_packs', config.SERVICE_PACK_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('memory_dumps', 'memory_dumps', config.MEMORY_DUMP_PATHS, item=ITEM_ENTRY),
+    CleanupRule('font_cache', 'font_cache', config.FONT_CACHE_PATHS, item=ITEM_ENTRY),
+    CleanupRule('disk_cleanup_backup', 'disk_cleanup', config.DISK_CLEANUP_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('app_cache', 'app_cache', config.APP_CACHE_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('media_cache', 'media_cache', config.MEDIA_CACHE_PATHS, item=ITEM_ENTRY),
+    CleanupRule('search_index', 'search_index', config.SEARCH_INDEX_PATHS, file_type='search_index_temp'),
+    CleanupRule('backup_temp', 'backup_temp', config.BACKUP_TEMP_PATHS, min_age_days=31),
+    CleanupRule('update_temp', 'update_temp', config.UPDATE_TEMP_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('driver_backup', 'driver_backup', config.DRIVER_BACKUP_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('app_crash', 'app_crash', config.APP_CRASH_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('app_logs', 'app_logs', config.APP_LOG_PATHS, min_age_days=30),
+    CleanupRule('recent_items', 'recent_items', config.RECENT_ITEMS_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('notification_cache', 'notification', config.NOTIFICATION_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('dns_cache', 'dns_cache', config.DNS_CACHE_PATHS, item=ITEM_ENTRY),
+    CleanupRule('printer_temp', 'printer_temp', config.PRINTER_TEMP_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('device_temp', 'device_temp', config.DEVICE_TEMP_PATHS, item=ITEM_ENTRY),
+    CleanupRule('windows_defender', 'windows_defender', config.WINDOWS_DEFENDER_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('store_cache', 'store_cache', config.STORE_CACHE_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('onedrive_cache', 'onedrive_cache', config.ONEDRIVE_CACHE_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('downloads', 'downloads', config.DOWNLOADS_PATHS, item=ITEM_DIR_TOTAL, count_files=True),
+    CleanupRule('installer_cache_safe', 'installer_cache', config.SAFE_INSTALLER_CACHE_PATHS,
+                file_type='installer_temp', min_age_days=30,
+                subtype=('temp_installer', 'very_old_installer')),
+    CleanupRule('windows_installer_cache', 'installer_cache', config.WINDOWS_INSTALLER_PATHS,
+                file_type='windows_installer_temp', subtype='windows_installer_cache'),
+    CleanupRule('delivery_optimization', 'delivery_opt', config.DELIVERY_OPTIMIZATION_PATHS, item=ITEM_DIR_TOTAL),
+    CleanupRule('large_files', 'large_files', planner='_scan_large_files'),
+
+    # 以下规则默认未启用（结果中没有对应类别）
+    CleanupRule('old_downloads', 'downloads', config.DOWNLOADS_PATHS,
+                file_type='download_temp', min_age_days=30, enabled=False),
+    CleanupRule('hibernation_file', 'hibernation', config.HIBERNATION_PATHS, item=ITEM_ENTRY, enabled=False),
+    CleanupRule('network_cache', 'network_cache', config.NETWORK_CACHE_PATHS, item=ITEM_ENTRY, enabled=False),
+    CleanupRule('old_installer_cache', 'installer_cache', config.INSTALLER_CACHE_PATHS,
+                min_age_days=90, enabled=False),
+]
+
+
+def enabled_rules():
+    """启用的规则（按登记顺序）"""
+    return [rule for rule in RULES if rule.enabled]
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 扫描结果快照
+
+把scan_system的结果保存为紧凑的流式文件，之后不必重新扫描即可载入、
+审阅并交给clean_selected清理（如在空闲时段扫描，确认后再清理）。
+
+文件为JSONL（路径以 .gz 结尾时用gzip压缩），每行一个JSON对象：
+
+    {"format": "ccleaner-scan-snapshot", "version": 1, ...}   头部：创建时间、类别顺序等
+    {"dirs": [目录前缀, ...]}                                追加到目录表中的新目录（含末尾的分隔符）
+    {"c": 类别, "d": [目录序号], "n": [名称], "s": [大小], "m": [修改时间], ...}
+    {"end": true, "items": 项目总数}                          结束标记，缺少时视为文件不完整
+
+项目按类别分块、按列存放，每个目录在目录表中只出现一次，路径由目录前缀和名称
+直接拼接；子类型、文件数、部分统计标记、文件ID、目录子树大小等可选列全部为默认值
+时省略。载入时每块只解析一次JSON，直接按列构造ScanItem，不为每个项目生成中间字典。
+"""
+
+import os
+import gc
+import gzip
+import json
+import time
+import zlib
+import threading
+
+from scan_item import ScanItem
+
+FORMAT = 'ccleaner-scan-snapshot'
+VERSION = 1
+
+# 每块的项目数
+CHUNK_SIZE = 10000
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+class SnapshotWriter:
+    """流式写入快照：可以直接作为scan_system的update_callback，每个类别完成即写入
+
+        with SnapshotWriter(path) as writer:
+            cleaner.scan_system(writer)
+
+    也可以用add(类别, 项目列表)写入已有的结果。close(summary)时写入结束标记，
+    summary中的信息（如扫描是否被取消）随结束标记保存，载入时合并到头部字典中。
+
+    scan_system在各遍历线程中推送完成的类别，写入时加锁：目录表的序号分配和
+    目录记录、块记录的写入作为一个整体，不同类别的记录不会交错。
+    """
+
+    def __init__(self, path, info=None, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._dirs = {}     # 目录前缀 -> 目录表中的序号
+        self._lock = threading.Lock()
+        self._file = _open(path, 'w')
+        header = {'format': FORMAT, 'version': VERSION, 'created': round(time.time(), 3)}
+        header.update(info or {})
+        self._file.write(_dumps(header))
+
+    def emit(self, partial):
+        for category, items in partial.items():
+            self.add(category, items)
+
+    def add(self, category, items):
+        with self._lock:
+            for start in range(0, len(items), self.chunk_size):
+                self._write_chunk(category, items[start:start + self.chunk_size])
+
+    def _write_chunk(self, category, items):
+        dirs = self._dirs
+        new_dirs = []
+        dir_column, names, sizes, mtimes = [], [], [], []
+        subtypes, file_counts, truncated, inos, tree_sizes = [], [], [], [], []
+        split = os.path.split
+        for item in items:
+            path = item.path
+            name = split(path)[1]
+            prefix = path[:len(path) - len(name)]
+            index = dirs.get(prefix)
+            if index is None:
+                index = dirs[prefix] = len(dirs)
+                new_dirs.append(prefix)
+            dir_column.append(index)
+            names.append(name)
+            sizes.append(item.size)
+            mtimes.append(item.mtime)
+            subtypes.append(item.subtype)
+            file_counts.append(item.file_count)
+            truncated.append(1 if item.truncated else 0)
+            inos.append(item.ino)
+            tree_sizes.append(item.tree_size)
+
+        if new_dirs:
+            self._file.write(_dumps({'dirs': new_dirs}))
+        chunk = {'c': category, 'd': dir_column, 'n': names, 's': sizes, 'm': mtimes}
+        if any(subtype is not None for subtype in subtypes):
+            chunk['t'] = subtypes
+        if any(file_count is not None for file_count in file_counts):
+            chunk['f'] = file_counts
+        if any(truncated):
+            chunk['x'] = truncated
+        if any(inos):
+            chunk['i'] = inos
+        if any(tree_size is not None for tree_size in tree_sizes):
+            chunk['z'] = tree_sizes
+        self._file.write(_dumps(chunk))
+        self.count += len(items)
+
+    def close(self, summary=None):
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                end = dict(summary or {})
+                end.update({'end': True, 'items': self.count})
+                self._file.write(_dumps(end))
+            finally:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_snapshot(path, results, info=None):
+    """把扫描结果 {类别: 项目列表} 保存为快照，返回写入的项目数"""
+    writer = SnapshotWriter(path, info)
+    try:
+        for category, items in results.items():
+            if items:
+                writer.add(category, items)
+    finally:
+        writer.close()
+    return writer.count
+
+
+def iter_snapshot(path):
+    """逐块读取快照，先生成头部字典，之后生成 (类别, ScanItem列表)
+
+    格式或版本不符、文件不完整或损坏时抛出ValueError。读完后结束标记中的信息合并到头部字典中。
+    """
+    try:
+        with _open(path, 'r') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = None
+            if not isinstance(header, dict) or header.get('format') != FORMAT:
+                raise ValueError(f"不是扫描结果快照: {path}")
+            if header.get('version') != VERSION:
+                raise ValueError(f"不支持的快照版本: {header.get('version')}")
+            yield header
+
+            dirs = []
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if 'c' in record:
+                    category = record['c']
+                    columns = (record['d'], record['n'], record['s'], record['m'])
+                    if 't' in record or 'f' in record or 'x' in record or 'i' in record or 'z' in record:
+                        count = len(record['n'])
+                        optional = (record.get('t') or [None] * count, record.get('f') or [None] * count,
+                                    record.get('x') or [0] * count, record.get('i') or [0] * count,
+                                    record.get('z') or [None] * count)
+                        items = [ScanItem(dirs[d] + name, size, category, mtime, subtype, file_count, bool(partial), ino,
+                                          tree_size)
+                                 for d, name, size, mtime, subtype, file_count, partial, ino, tree_size
+                                 in zip(*columns, *optional)]
+                    else:
+                        items = [ScanItem(dirs[d] + name, size, category, mtime) for d, name, size, mtime in zip(*columns)]
+                    yield category, items
+                elif 'dirs' in record:
+                    dirs.extend(record['dirs'])
+                elif record.pop('end', False):
+                    header.update(record)
+                    return
+            raise ValueError(f"快照文件不完整: {path}")
+    except (EOFError, zlib.error, IndexError, KeyError, TypeError) as e:
+        # 压缩流被截断、块中缺列或目录序号越界等
+        raise ValueError(f"快照文件损坏: {path}（{e}）") from e
+
+
+def load_snapshot(path):
+    """载入整个快照，返回 (头部字典, {类别: 项目列表})；类别按头部中记录的顺序排列"""
+    # 一次性创建大量对象时，分代垃圾回收会被反复触发却回收不到任何东西，载入期间暂停
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        chunks = iter_snapshot(path)
+        header = next(chunks)
+        results = {category: [] for category in header.get('categories', [])}
+        for category, items in chunks:
+            results.setdefault(category, []).extend(items)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return header, results
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name="c-drive-cleaner",
@@ -10,15 +10,23 @@ setup(
     author="Your Name",
     author_email="your.email@example.com",
     url="https://github.com/yourusername/c-drive-cleaner",
-    packages=find_packages(),
+    py_modules=[
+        "main", "cli", "backup_manager", "cleaner_logic", "config", "exclusions", "file_rules", "glob_planner",
+        "path_policy", "scan_engine", "scan_history", "scan_index", "scan_item", "scan_rules", "scan_snapshot",
+        "watcher", "worker_pool",
+    ],
     install_requires=[
         "PyQt5>=5.15.0",
         "psutil>=5.9.0",
         "send2trash>=1.8.0",
     ],
     entry_points={
+        # 命令行版本不加载PyQt5，适合计划任务；图形界面单独提供入口
         "console_scripts": [
-            "c-drive-cleaner=main:main",
+            "c-drive-cleaner=cli:main",
+        ],
+        "gui_scripts": [
+            "c-drive-cleaner-gui=main:main",
         ],
     },
     classifiers=[
@@ -28,12 +36,11 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: Microsoft :: Windows",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Topic :: System :: Systems Administration",
         "Topic :: Utilities",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
 )
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+"""测试配置：各模块位于仓库根目录（见setup.py中的py_modules），测试时加入导入路径"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+"""冷启动预算：新进程中导入cli并构造CleanerLogic（测量方式见benchmark.startup_benchmark）"""
+
+import benchmark
+
+
+def test_startup_within_budget_and_lazy():
+    elapsed, loaded, eager = benchmark.startup_benchmark()
+    assert loaded == [], f"冷启动时加载了 {', '.join(loaded)}"
+    assert eager == [], f"构造CleanerLogic时提前初始化了 {', '.join(eager)}"
+    assert elapsed <= benchmark.STARTUP_BUDGET, \
+        f"冷启动 {elapsed * 1000:.1f} 毫秒，超出预算 {benchmark.STARTUP_BUDGET * 1000:.0f} 毫秒"
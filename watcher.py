@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 后台监视
+
+监视模式先对各扫描根目录做一次初始遍历，之后持续跟踪其中文件的创建和删除，
+实时维护各类别可清理空间的合计，界面和命令行不必重新完整扫描即可显示当前数字。
+
+- 变化来源可以替换：PollingBackend在任意平台可用，按目录修改时间的快照找出
+  有文件增删的目录，只重新枚举这些目录；WindowsChangeBackend使用
+  ReadDirectoryChangesW由系统推送变化。default_backend()选择当前平台可用的实现。
+- SizeTree在内存中保存每个目录中的文件大小及子树按类别的合计，每个变化事件
+  只沿上级目录更新合计，耗时与目录深度成正比，不重新枚举目录。
+
+变化来源产生的事件：
+    ('file', 路径, 大小, 修改时间)   文件被创建或修改
+    ('remove', 路径)                 文件或目录（整个子树）被删除
+    ('rescan', 根目录)               丢失了部分通知（如缓冲区溢出），清空该根目录，之后重新遍历的结果随后到达
+"""
+
+import os
+import re
+import stat
+import queue
+import struct
+import fnmatch
+import logging
+import threading
+
+from scan_engine import FileEntry, WalkStats, list_dir, walk_entries
+
+logger = logging.getLogger('CCleaner')
+
+# 轮询间隔（秒）
+POLL_INTERVAL = 2.0
+
+# ReadDirectoryChangesW的通知缓冲区大小（网络路径上不能超过64KB）
+NOTIFY_BUFFER_SIZE = 64 * 1024
+
+_FILE_LIST_DIRECTORY = 0x0001
+_FILE_SHARE_ALL = 0x1 | 0x2 | 0x4
+_OPEN_EXISTING = 3
+_FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+# FILE_NOTIFY_CHANGE_FILE_NAME | DIR_NAME | SIZE | LAST_WRITE
+_NOTIFY_FILTER = 0x1 | 0x2 | 0x8 | 0x10
+_FILE_ACTION_ADDED = 1
+_FILE_ACTION_REMOVED = 2
+_FILE_ACTION_MODIFIED = 3
+_FILE_ACTION_RENAMED_OLD_NAME = 4
+_FILE_ACTION_RENAMED_NEW_NAME = 5
+
+
+def _key(path):
+    """规范化路径，用作比较键（Windows下不区分大小写）"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def name_filter(pattern, accept=None):
+    """生成只接收文件名匹配pattern（不区分大小写）且accept也接收的文件的判断函数"""
+    regex = re.compile(fnmatch.translate(pattern.lower()))
+
+    def match(entry):
+        return regex.match(entry.name.lower()) is not None and (accept is None or accept(entry))
+
+    return match
+
+
+def walk_events(top, recursive, enters):
+    """遍历一个监视目录，为其中每个文件生成 'file' 事件；enters(目录)为False的子目录不进入"""
+    for dir_path, dirs, files in walk_entries(top):
+        if recursive:
+            dirs[:] = [name for name in dirs if enters(os.path.join(dir_path, name))]
+        else:
+            dirs[:] = []
+        for entry in files:
+            yield ('file', entry.path, entry.size, entry.mtime)
+
+
+class WatchRoot:
+    """一个监视根目录及归属它的类别
+
+    members为 [(类别, accept, 是否包括子目录)]：accept(FileEntry)为True的文件计入
+    该类别，accept为None时计入所有文件；不包括子目录的成员只接收根目录中直接的文件。
+    同一目录上的多个成员（如Explorer目录中的thumbcache_*.db和iconcache*）按顺序
+    判断，第一个接收的成员生效。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.key = _key(path)
+        self.members = []
+
+    @property
+    def recursive(self):
+        return any(recursive for _, _, recursive in self.members)
+
+    def add(self, category, accept=None, recursive=True):
+        self.members.append((category, accept, recursive))
+
+    def classify(self, entry, direct):
+        """文件所属的类别，不计入任何类别时返回None；direct表示文件直接位于根目录中"""
+        for category, accept, recursive in self.members:
+            if (recursive or direct) and (accept is None or accept(entry)):
+                return category
+        return None
+
+
+class _SizeNode:
+    __slots__ = ('parent', 'children', 'files', 'totals')
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.children = {}      # 子目录比较键 -> _SizeNode
+        self.files = {}         # 文件名（比较键） -> (大小, 类别)
+        self.totals = {}        # 类别 -> [字节数, 文件数]，包括整个子树；不计入任何类别的文件记在None下
+
+
+class SizeTree:
+    """内存中的目录大小树
+
+    每个目录节点保存其中的文件以及整个子树按类别的合计。文件的创建、修改和
+    删除只沿上级目录更新合计，耗时与目录深度成正比；删除目录时一次从上级目录中
+    减去整个子树的合计。根目录节点没有上级，嵌套的根目录各自独立统计。
+    """
+
+    def __init__(self):
+        self._nodes = {}        # 目录比较键 -> _SizeNode
+        self.totals = {}        # 类别 -> [字节数, 文件数]，所有根目录的合计
+
+    def add_root(self, key):
+        if key not in self._nodes:
+            self._nodes[key] = _SizeNode(None)
+
+    def _ensure(self, key):
+        """返回目录节点，不存在时沿上级目录一直创建到已有的节点"""
+        node = self._nodes.get(key)
+        if node is None:
+            parent_key = os.path.dirname(key)
+            if parent_key == key:
+                raise KeyError(key)
+            parent = self._ensure(parent_key)
+            node = self._nodes[key] = _SizeNode(parent)
+            parent.children[key] = node
+        return node
+
+    def _add(self, node, category, size, count):
+        while node is not None:
+            total = node.totals.get(category)
+            if total is None:
+                total = node.totals[category] = [0, 0]
+            total[0] += size
+            total[1] += count
+            node = node.parent
+        total = self.totals.get(category)
+        if total is None:
+            total = self.totals[category] = [0, 0]
+        total[0] += size
+        total[1] += count
+
+    def set_file(self, dir_key, name, size, category):
+        """记录文件（创建或修改）的大小和类别，返回合计是否变化"""
+        node = self._ensure(dir_key)
+        record = (size, category)
+        old = node.files.get(name)
+        if old == record:
+            return False
+        node.files[name] = record
+        if old is not None:
+            self._add(node, old[1], -old[0], -1)
+        self._add(node, category, size, 1)
+        return True
+
+    def remove(self, key):
+        """删除文件或目录（整个子树），返回合计是否变化；根目录被删除时只清空"""
+        node = self._nodes.get(key)
+        if node is None:
+            dir_key, name = os.path.split(key)
+            parent = self._nodes.get(dir_key)
+            old = parent.files.pop(name, None) if parent is not None else None
+            if old is None:
+                return False
+            self._add(parent, old[1], -old[0], -1)
+            return True
+
+        changed = any(count for _, count in node.totals.values())
+        parent = node.parent
+        if parent is not None:
+            for category, (size, count) in node.totals.items():
+                self._add(parent, category, -size, -count)
+            del parent.children[key]
+            del self._nodes[key]
+        else:
+            for category, (size, count) in node.totals.items():
+                total = self.totals[category]
+                total[0] -= size
+                total[1] -= count
+        # 释放子树中的节点（只是回收内存，不再涉及合计）
+        stack = list(node.children.items())
+        while stack:
+            child_key, child = stack.pop()
+            del self._nodes[child_key]
+            stack.extend(child.children.items())
+        node.children = {}
+        node.files = {}
+        node.totals = {}
+        return changed
+
+    def size(self, key, category=None):
+        """目录子树中某个类别的字节数，category为None时返回全部文件的字节数"""
+        node = self._nodes.get(key)
+        if node is None:
+            return 0
+        if category is not None:
+            return node.totals.get(category, (0, 0))[0]
+        return sum(size for size, _ in node.totals.values())
+
+
+class PollingBackend:
+    """可移植的变化来源：按目录修改时间的快照轮询
+
+    创建、删除或重命名文件会更新所在目录的修改时间。每轮只对已知目录各做一次
+    stat，修改时间变化的目录才重新枚举，并与快照比较得出增删的文件和子目录。
+    原地修改文件内容不改变目录的修改时间，这类大小变化要等该目录下次有增删时才能发现。
+    """
+
+    name = 'polling'
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.stats = WalkStats()
+        self._snapshots = {}    # 目录路径 -> (修改时间ns, 是否包括子目录, {子目录名}, {文件名: (大小, 修改时间)})
+        self._roots = []
+        self._enters = None
+        self._stop = threading.Event()
+
+    def start(self, roots, enters):
+        """建立快照，返回初始遍历的事件；roots为 [(目录, 是否包括子目录)]"""
+        self._roots = list(roots)
+        self._enters = enters
+        self._stop.clear()
+        events = []
+        for path, recursive in self._roots:
+            self._snapshot_tree(path, recursive, events)
+        return events
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self):
+        """等待一个轮询间隔后检查所有已知目录，返回这期间的变化事件"""
+        if self._stop.wait(self.interval):
+            return []
+        events = []
+        for path, recursive in self._roots:
+            # 启动时不存在或之后被删除的根目录，每轮检查是否已（重新）出现
+            if path not in self._snapshots:
+                self._snapshot_tree(path, recursive, events)
+        for dir_path in list(self._snapshots):
+            if self._stop.is_set():
+                break
+            snapshot = self._snapshots.get(dir_path)
+            if snapshot is not None:    # 已随上级目录一起删除的跳过
+                self._check(dir_path, snapshot, events)
+        return events
+
+    def _list(self, dir_path):
+        """先取目录修改时间再枚举，枚举期间的变化下一轮仍能发现；目录不存在或无法访问时返回None"""
+        self.stats.stat_calls += 1
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+            dirs, files, _ = list_dir(dir_path, None, self.stats)
+        except OSError:
+            return None
+        return mtime, dirs, files
+
+    def _snapshot_tree(self, top, recursive, events):
+        stack = [top]
+        while stack:
+            dir_path = stack.pop()
+            listing = self._list(dir_path)
+            if listing is None:
+                continue
+            mtime, dirs, files = listing
+            dirs = [name for name in dirs if self._enters(os.path.join(dir_path, name))] if recursive else []
+            self._snapshots[dir_path] = (mtime, recursive, set(dirs),
+                                         {entry.name: (entry.size, entry.mtime) for entry in files})
+            events.extend(('file', entry.path, entry.size, entry.mtime) for entry in files)
+            stack.extend(os.path.join(dir_path, name) for name in reversed(dirs))
+
+    def _forget(self, dir_path):
+        """删除目录及其子树的快照"""
+        stack = [dir_path]
+        while stack:
+            path = stack.pop()
+            snapshot = self._snapshots.pop(path, None)
+            if snapshot is not None:
+                stack.extend(os.path.join(path, name) for name in snapshot[2])
+
+    def _check(self, dir_path, snapshot, events):
+        mtime, recursive, old_dirs, old_files = snapshot
+        self.stats.stat_calls += 1
+        try:
+            if os.stat(dir_path).st_mtime_ns == mtime:
+                return
+        except OSError:
+            pass
+        listing = self._list(dir_path)
+        if listing is None:
+            # 目录已被删除或无法再访问
+            self._forget(dir_path)
+            events.append(('remove', dir_path))
+            return
+        mtime, dirs, files = listing
+        files = {entry.name: entry for entry in files}
+        dirs = {name for name in dirs if self._enters(os.path.join(dir_path, name))} if recursive else set()
+        # 先删除再添加：同名的文件和目录互相替换时结果仍然正确
+        for name in sorted(old_files.keys() - files.keys()):
+            events.append(('remove', os.path.join(dir_path, name)))
+        for name in sorted(old_dirs - dirs):
+            child = os.path.join(dir_path, name)
+            self._forget(child)
+            events.append(('remove', child))
+        for entry in files.values():
+            if old_files.get(entry.name) != (entry.size, entry.mtime):
+                events.append(('file', entry.path, entry.size, entry.mtime))
+        self._snapshots[dir_path] = (mtime, recursive, dirs,
+                                     {entry.name: (entry.size, entry.mtime) for entry in files.values()})
+        for name in sorted(dirs - old_dirs):
+            self._snapshot_tree(os.path.join(dir_path, name), True, events)
+
+
+def _parse_notifications(data):
+    """解析FILE_NOTIFY_INFORMATION记录，生成 (动作, 相对路径)"""
+    offset = 0
+    while True:
+        next_offset, action, length = struct.unpack_from('<III', data, offset)
+        yield action, data[offset + 12:offset + 12 + length].decode('utf-16-le')
+        if not next_offset:
+            return
+        offset += next_offset
+
+
+class WindowsChangeBackend:
+    """Windows变化来源：对每个监视目录调用ReadDirectoryChangesW，由系统推送变化
+
+    每个目录一个线程阻塞等待通知，解析和stat在调用poll()的线程中进行。
+    通知缓冲区溢出（丢失了部分通知）时重新遍历该目录。启动时不存在的目录不监视。
+    """
+
+    name = 'windows'
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                         wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        kernel32.ReadDirectoryChangesW.restype = wintypes.BOOL
+        kernel32.ReadDirectoryChangesW.argtypes = [wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD, wintypes.BOOL,
+                                                   wintypes.DWORD, ctypes.POINTER(wintypes.DWORD),
+                                                   wintypes.LPVOID, wintypes.LPVOID]
+        kernel32.CancelIoEx.argtypes = [wintypes.HANDLE, wintypes.LPVOID]
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._kernel32 = kernel32
+        self._queue = queue.Queue()
+        self._handles = []
+        self._threads = []
+        self._enters = None
+        self._stop = threading.Event()
+
+    def start(self, roots, enters):
+        """开始接收通知后再做初始遍历（遍历期间的变化不会丢失），返回初始遍历的事件"""
+        self._enters = enters
+        self._stop.clear()
+        invalid = self._wintypes.HANDLE(-1).value
+        for path, recursive in roots:
+            handle = self._kernel32.CreateFileW(path, _FILE_LIST_DIRECTORY, _FILE_SHARE_ALL, None,
+                                                _OPEN_EXISTING, _FILE_FLAG_BACKUP_SEMANTICS, None)
+            if handle is None or handle == invalid:
+                continue
+            self._handles.append(handle)
+            thread = threading.Thread(target=self._read, args=(handle, path, recursive), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        events = []
+        for path, recursive in roots:
+            events.extend(walk_events(path, recursive, enters))
+        return events
+
+    def stop(self):
+        self._stop.set()
+        for handle in self._handles:
+            self._kernel32.CancelIoEx(handle, None)
+            self._kernel32.CloseHandle(handle)
+        for thread in self._threads:
+            thread.join(1.0)
+        self._handles = []
+        self._threads = []
+        self._queue.put(None)   # 唤醒poll()
+
+    def _read(self, handle, root, recursive):
+        ctypes = self._ctypes
+        buffer = ctypes.create_string_buffer(NOTIFY_BUFFER_SIZE)
+        returned = self._wintypes.DWORD()
+        while not self._stop.is_set():
+            ok = self._kernel32.ReadDirectoryChangesW(handle, buffer, len(buffer), recursive, _NOTIFY_FILTER,
+                                                      ctypes.byref(returned), None, None)
+            if not ok:
+                if not self._stop.is_set():
+                    # 目录被删除等情况：重新遍历（目录已不存在时即清空该根目录）
+                    logger.warning(f"停止监视目录 {root}: {ctypes.WinError(ctypes.get_last_error())}")
+                    self._queue.put(('rescan', root, recursive))
+                return
+            if returned.value == 0:
+                self._queue.put(('rescan', root, recursive))
+            else:
+                self._queue.put(('changes', root, recursive, buffer.raw[:returned.value]))
+
+    def poll(self, timeout=POLL_INTERVAL):
+        """等待通知（最多timeout秒），返回转换后的变化事件"""
+        try:
+            items = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        events = []
+        for item in items:
+            if item is None:
+                continue
+            if item[0] == 'rescan':
+                _, root, recursive = item
+                events.append(('rescan', root))
+                events.extend(walk_events(root, recursive, self._enters))
+                continue
+            _, root, recursive, data = item
+            for action, name in _parse_notifications(data):
+                path = os.path.join(root, name)
+                if action in (_FILE_ACTION_REMOVED, _FILE_ACTION_RENAMED_OLD_NAME):
+                    events.append(('remove', path))
+                    continue
+                try:
+                    st = os.stat(path, follow_symlinks=False)
+                except OSError:
+                    continue    # 已被删除，随后会收到删除通知
+                if stat.S_ISREG(st.st_mode):
+                    events.append(('file', path, st.st_size, st.st_mtime))
+                elif (stat.S_ISDIR(st.st_mode) and action != _FILE_ACTION_MODIFIED
+                      and self._enters(path)):
+                    # 新建或移入的目录：移入时其中的文件不会单独通知，遍历一次
+                    events.extend(walk_events(path, True, self._enters))
+        return events
+
+
+def default_backend(interval=POLL_INTERVAL):
+    """当前平台可用的变化来源：Windows下使用ReadDirectoryChangesW，其他平台或初始化失败时轮询"""
+    if os.name == 'nt':
+        try:
+            return WindowsChangeBackend()
+        except (OSError, AttributeError) as e:
+            logger.warning(f"无法使用系统的目录变化通知，改为轮询: {e}")
+    return PollingBackend(interval)
+
+
+class Watcher:
+    """后台监视：初始遍历后按变化事件实时维护各类别的可清理空间合计
+
+    文件归属与扫描相同：由包含它的最深的根目录决定。policy（PathPolicy）禁止的
+    目录不进入，其中的文件和按名称排除的文件不计入。callback（如pyqtSignal）
+    不为空时，初始遍历完成及之后每次合计变化时 emit(totals)。
+    """
+
+    def __init__(self, roots, backend=None, policy=None, callback=None):
+        self.roots = {root.key: root for root in roots}
+        self.backend = backend if backend is not None else default_backend()
+        self.policy = policy
+        self.callback = callback
+        self.tree = SizeTree()
+        for key in self.roots:
+            self.tree.add_root(key)
+        self.ready = threading.Event()  # 初始遍历完成（或出错停止）
+        self.events = 0                 # 已处理的变化事件数
+        self.error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self.backend.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def totals(self):
+        """各类别当前的合计 {类别: {'size': 字节数, 'count': 文件数}}"""
+        with self._lock:
+            return {category: {'size': size, 'count': count}
+                    for category, (size, count) in self.tree.totals.items()
+                    if category is not None and count}
+
+    def _watch_dirs(self):
+        """交给变化来源的目录：位于其他包括子目录的根目录之下的根目录已被覆盖，不再单独监视"""
+        covering = [root.key for root in self.roots.values() if root.recursive]
+        dirs = []
+        for root in self.roots.values():
+            if not any(root.key.startswith(key.rstrip(os.sep) + os.sep) for key in covering):
+                dirs.append((root.path, root.recursive))
+        return dirs
+
+    def _enters(self, dir_path):
+        return self.policy is None or self.policy.enters(dir_path)
+
+    def _run(self):
+        try:
+            events = self.backend.start(self._watch_dirs(), self._enters)
+            self._apply(events)
+            self.ready.set()
+            self._notify()
+            while not self._stop.is_set():
+                events = self.backend.poll()
+                if events and self._apply(events):
+                    self._notify()
+        except Exception as e:
+            self.error = e
+            logger.error(f"后台监视出错，已停止: {e}")
+        finally:
+            self.ready.set()
+
+    def _notify(self):
+        if self.callback is not None and not self._stop.is_set():
+            self.callback.emit(self.totals())
+
+    def _owners(self, dir_key):
+        """由深到浅生成包含该目录中文件的根目录 (根目录, 文件是否直接位于根目录中)"""
+        key = dir_key
+        direct = True
+        while True:
+            root = self.roots.get(key)
+            if root is not None and (direct or root.recursive):
+                yield root, direct
+            parent = os.path.dirname(key)
+            if parent == key:
+                return
+            key = parent
+            direct = False
+
+    def _apply(self, events):
+        """应用一批变化事件，返回合计是否变化"""
+        changed = False
+        with self._lock:
+            for event in events:
+                key = _key(event[1])
+                if event[0] == 'file':
+                    changed |= self._set_file(key, event[1], event[2], event[3])
+                else:
+                    changed |= self.tree.remove(key)
+                self.events += 1
+        return changed
+
+    def _set_file(self, key, path, size, mtime):
+        dir_key, name = os.path.split(key)
+        owners = list(self._owners(dir_key))
+        if not owners:
+            return False
+        dir_path, file_name = os.path.split(path)
+        if self.policy is not None and not (self.policy.allows_files(dir_path)
+                                            and self.policy.allows_file_name(file_name)):
+            return False
+        # 最深的根目录中没有类别接收的文件交给外层的根目录，与扫描时一致
+        entry = FileEntry(path, file_name, size, mtime)
+        category = None
+        for root, direct in owners:
+            category = root.classify(entry, direct)
+            if category is not None:
+                break
+        return self.tree.set_file(dir_key, name, size, category)
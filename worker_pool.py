@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+C盘清理工具 - 自适应遍历线程池
+
+遍历任务的开销相差很大，固定的并发数对SSD偏低、对机械硬盘又偏高。
+这里先探测扫描路径所在磁盘是否有寻道开销（Windows: IOCTL_STORAGE_QUERY_PROPERTY
+的StorageDeviceSeekPenaltyProperty；Linux: /sys/block/*/queue/rotational），
+据此选择初始并发数和上下限，运行中按吞吐量（每秒处理的目录和文件数）
+做爬山调整：提高并发后吞吐量上升就继续，下降就回退。
+
+任务内部再开的线程（如并行遍历的遍历组，见AdaptivePool.submit的slots）同样
+计入并发上限。选择的并发数和调整记录写入扫描统计报告。
+"""
+
+import os
+import time
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger('CCleaner')
+
+# 各类磁盘的 (初始并发数, 最小并发数, 最大并发数, 每次调整的步长)
+STORAGE_PROFILES = {
+    'ssd': (16, 4, 32, 4),      # 并行的元数据读取可以扩展
+    'hdd': (2, 1, 4, 1),        # 并发过高会导致磁头来回寻道
+    'unknown': (8, 2, 16, 2),
+}
+
+# 吞吐量采样间隔（秒）
+SAMPLE_INTERVAL = 0.25
+# 吞吐量变化超过该比例才视为提升或下降
+SIGNIFICANT_CHANGE = 0.05
+
+_storage_cache = {}
+
+
+def _probe_windows(path):
+    """查询卷所在磁盘是否有寻道开销，返回True/False，无法确定时返回None"""
+    import ctypes
+    from ctypes import wintypes
+
+    drive = os.path.splitdrive(os.path.abspath(path))[0]
+    if not drive or not drive.endswith(':'):
+        return None
+
+    class STORAGE_PROPERTY_QUERY(ctypes.Structure):
+        _fields_ = [('PropertyId', wintypes.DWORD),
+                    ('QueryType', wintypes.DWORD),
+                    ('AdditionalParameters', ctypes.c_byte * 1)]
+
+    class DEVICE_SEEK_PENALTY_DESCRIPTOR(ctypes.Structure):
+        _fields_ = [('Version', wintypes.DWORD),
+                    ('Size', wintypes.DWORD),
+                    ('IncursSeekPenalty', wintypes.BOOLEAN)]
+
+    IOCTL_STORAGE_QUERY_PROPERTY = 0x2D1400
+    StorageDeviceSeekPenaltyProperty = 7
+    PropertyStandardQuery = 0
+    FILE_SHARE_READ_WRITE = 0x1 | 0x2
+    OPEN_EXISTING = 3
+
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    handle = kernel32.CreateFileW(f"\\\\.\\{drive}", 0, FILE_SHARE_READ_WRITE, None, OPEN_EXISTING, 0, None)
+    if handle is None or handle == wintypes.HANDLE(-1).value:
+        return None
+    try:
+        query = STORAGE_PROPERTY_QUERY(StorageDeviceSeekPenaltyProperty, PropertyStandardQuery)
+        descriptor = DEVICE_SEEK_PENALTY_DESCRIPTOR()
+        returned = wintypes.DWORD()
+        ok = kernel32.DeviceIoControl(handle, IOCTL_STORAGE_QUERY_PROPERTY,
+                                      ctypes.byref(query), ctypes.sizeof(query),
+                                      ctypes.byref(descriptor), ctypes.sizeof(descriptor),
+                                      ctypes.byref(returned), None)
+        if not ok:
+            return None
+        return bool(descriptor.IncursSeekPenalty)
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _probe_sysfs(path):
+    """根据 /sys/dev/block/主:次/ 下的 queue/rotational 判断，分区取其所属磁盘"""
+    st_dev = os.stat(path).st_dev
+    block = os.path.realpath(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+    for candidate in (block, os.path.dirname(block)):
+        try:
+            with open(os.path.join(candidate, 'queue', 'rotational')) as f:
+                return f.read().strip() == '1'
+        except OSError:
+            continue
+    return None
+
+
+def probe_storage(path):
+    """返回路径所在磁盘的类型：'ssd'、'hdd' 或 'unknown'（结果按磁盘缓存）"""
+    try:
+        key = os.path.splitdrive(os.path.abspath(path))[0].upper() if os.name == 'nt' else os.stat(path).st_dev
+    except OSError:
+        return 'unknown'
+    kind = _storage_cache.get(key)
+    if kind is not None:
+        return kind
+    try:
+        seek_penalty = _probe_windows(path) if os.name == 'nt' else _probe_sysfs(path)
+    except Exception as e:
+        logger.warning(f"无法探测磁盘类型 {path}: {e}")
+        seek_penalty = None
+    kind = 'unknown' if seek_penalty is None else ('hdd' if seek_penalty else 'ssd')
+    _storage_cache[key] = kind
+    return kind
+
+
+class ConcurrencyController:
+    """爬山法调整并发上限：沿当前方向调整后吞吐量明显下降时反向"""
+
+    def __init__(self, storage='unknown', fixed=None):
+        initial, minimum, maximum, step = STORAGE_PROFILES.get(storage, STORAGE_PROFILES['unknown'])
+        if fixed is not None:
+            initial = minimum = maximum = max(1, fixed)
+        self.storage = storage
+        self.limit = initial
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self.peak = initial
+        self.samples = 0
+        self.history = []       # 并发上限的调整记录 [(距开始的秒数, 新的并发上限, 调整前的吞吐量)]
+        self._direction = 1
+        self._last_throughput = None
+        self._last_units = 0
+        self._last_time = None
+        self._started = None
+
+    @property
+    def adaptive(self):
+        return self.minimum != self.maximum
+
+    def start(self, now):
+        self._started = self._last_time = now
+
+    def due(self, now):
+        """距上次采样是否已超过采样间隔"""
+        return now - self._last_time >= SAMPLE_INTERVAL
+
+    def sample(self, units, now, backlog):
+        """记录一次吞吐量采样，backlog为仍在排队的任务数；队列为空时不调整"""
+        elapsed = now - self._last_time
+        if elapsed <= 0:
+            return
+        throughput = (units - self._last_units) / elapsed
+        self._last_units = units
+        self._last_time = now
+        self.samples += 1
+        if not self.adaptive or backlog == 0:
+            return
+        last = self._last_throughput
+        self._last_throughput = throughput
+        if last is not None and throughput < last * (1 - SIGNIFICANT_CHANGE):
+            self._direction = -self._direction
+        elif last is not None and throughput <= last * (1 + SIGNIFICANT_CHANGE):
+            return
+        limit = min(self.maximum, max(self.minimum, self.limit + self._direction * self.step))
+        if limit != self.limit:
+            self.limit = limit
+            self.peak = max(self.peak, limit)
+            self.history.append((round(now - self._started, 3), limit, round(throughput, 1)))
+
+    def to_dict(self):
+        return {
+            'storage': self.storage,
+            'adaptive': self.adaptive,
+            'initial': self.initial,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'final': self.limit,
+            'peak': self.peak,
+            'samples': self.samples,
+            'history': self.history
+        }
+
+
+class AdaptivePool:
+    """按优先级执行任务的线程池，同时运行的任务数不超过controller.limit
+
+    任务按优先级从高到低执行（最长任务优先时优先级即估计耗时），优先级相同的
+    按提交顺序执行。任务执行过程中可以继续提交新任务。
+    完成回调 callback(result, error, seconds) 在调用run()的线程中按完成顺序执行。
+    progress() 返回目前为止处理的工作量，用于采样吞吐量。
+    """
+
+    def __init__(self, controller, progress):
+        self.controller = controller
+        self.progress = progress
+        self._lock = threading.Condition()
+        self._queue = []          # 最小堆：(-优先级, 提交序号, 名额数, 任务, 回调)
+        self._seq = 0
+        self._running = 0
+        self._outstanding = 0     # 已提交但尚未执行完的任务数
+        self._completed = []
+        self._tasks = 0
+
+    def submit(self, task, callback=None, priority=0.0, slots=1):
+        """提交任务；slots大于1的任务内部还会开线程，占用 min(slots, 并发上限) 个名额，
+
+        有足够的空闲名额时才开始执行，并以实际占用的名额数调用 task(名额数)。
+        排在队首的任务名额不足时，后面的任务也等待，不会越过它。
+        """
+        with self._lock:
+            heapq.heappush(self._queue, (-priority, self._seq, slots, task, callback))
+            self._seq += 1
+            self._outstanding += 1
+            self._lock.notify_all()
+
+    def _worker(self):
+        lock = self._lock
+        while True:
+            with lock:
+                while self._outstanding and (not self._queue or self._running + self._slots() > self.controller.limit):
+                    lock.wait()
+                if not self._outstanding:
+                    return
+                slots = self._slots()
+                _, _, requested, task, callback = heapq.heappop(self._queue)
+                self._running += slots
+                self._tasks += 1
+            start = time.monotonic()
+            result = error = None
+            try:
+                result = task(slots) if requested > 1 else task()
+            except Exception as exc:
+                error = exc
+            seconds = time.monotonic() - start
+            with lock:
+                self._running -= slots
+                self._outstanding -= 1
+                self._completed.append((callback, result, error, seconds))
+                lock.notify_all()
+
+    def _slots(self):
+        # 队首任务要占用的名额数（调用时持有self._lock且队列非空）
+        return min(self._queue[0][2], self.controller.limit)
+
+    def run(self):
+        """执行所有任务（包括执行期间提交的任务），返回 {'tasks': 执行的任务数}"""
+        controller = self.controller
+        controller.start(time.monotonic())
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(controller.maximum)]
+        for thread in threads:
+            thread.start()
+
+        lock = self._lock
+        while True:
+            with lock:
+                if not self._completed and self._outstanding:
+                    lock.wait(SAMPLE_INTERVAL)
+                finished, self._completed = self._completed, []
+                backlog = len(self._queue)
+                done = not self._outstanding
+            now = time.monotonic()
+            if controller.due(now):
+                controller.sample(self.progress(), now, backlog)
+                with lock:
+                    lock.notify_all()
+            for callback, result, error, seconds in finished:
+                if callback is not None:
+                    callback(result, error, seconds)
+            if done and not finished:
+                break
+
+        for thread in threads:
+            thread.join()
+
+        return {'tasks': self._tasks}